@@ -1,23 +1,83 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Dict, Optional
-from services.chat_service import chat_with_multi_agent
+from typing import Dict, List, Optional
+from core.admission import Overloaded, user_rate_limiter
+from core.clients import get_llm
+from core.config import settings
+from core.llm_pool import LLMPool
+from services.chat_service import chat_batch, chat_with_multi_agent, prepare_chat_context, stream_chat_with_multi_agent
+from services.job_service import job_queue
+from services.prefetch_service import search_prefetcher
+from services.search_service import search_cache_stats
+from services.profile_service import get_user_profile_view
+from services.session_service import ChatSession, create_session, delete_session, describe_session, get_session
+from services.usage_service import usage_ledger, user_tier
+import json
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
-class ChatRequest(BaseModel):
+class ChatItem(BaseModel):
     user_id: int = Field(..., description="User ID from profile submission", example=1)
     question: str = Field(..., description="User's question about studying abroad", example="What are the best universities in Germany for Computer Science?")
 
 
+class ChatRequest(ChatItem):
+    session_id: Optional[str] = Field(None, description="Conversation ID from /chat/sessions for multi-turn chat")
+
+
+class ChatBatchRequest(BaseModel):
+    items: List[ChatItem] = Field(..., description="(user_id, question) pairs to answer")
+    concurrency: Optional[int] = Field(None, description="Max items processed at once (capped by the server)", example=8)
+
+
 class ChatResponse(BaseModel):
     response: str = Field(..., description="AI-generated personalized response")
     profile_used: Optional[Dict] = Field(None, description="Summary of user profile used")
     search_results: Optional[Dict] = Field(None, description="Web search results summary")
+    session_id: Optional[str] = Field(None, description="Conversation ID, if the question was part of a session")
     error: Optional[str] = Field(None, description="Error message if any")
 
 
+class ChatJobResponse(BaseModel):
+    job_id: str = Field(..., description="Poll GET /chat/jobs/{job_id} for the result")
+    status: str = Field(..., description="queued, running, done or failed")
+    wait_seconds: float = Field(..., description="Time spent queued so far")
+    run_seconds: Optional[float] = Field(None, description="Time spent answering so far")
+    result: Optional[ChatResponse] = Field(None, description="The answer, once status is done")
+    error: Optional[str] = Field(None, description="Why the job failed")
+
+
+class SessionCreateRequest(BaseModel):
+    user_id: int = Field(..., description="User ID from profile submission", example=1)
+
+
+def resolve_session(request: ChatRequest) -> Optional[ChatSession]:
+    """Look up the request's session, checking it belongs to the same user"""
+    if not request.session_id:
+        return None
+    session = get_session(request.session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired. Start a new one at /chat/sessions.")
+    if session.user_id != request.user_id:
+        raise HTTPException(status_code=403, detail="Session belongs to a different user")
+    return session
+
+
+def overload_error(error: Overloaded) -> HTTPException:
+    """429 (caller too fast) or 503 (upstreams saturated) with a Retry-After hint"""
+    return HTTPException(status_code=error.status_code, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+
+
+def check_rate_limit(user_id: int):
+    """Per-user token bucket on chat questions (call after the cheap 4xx checks)"""
+    try:
+        user_rate_limiter.check(user_id)
+    except Overloaded as e:
+        raise overload_error(e)
+
+
 @router.post(
     "/ask",
     response_model=ChatResponse,
@@ -38,11 +98,21 @@ async def chat_with_ai(request: ChatRequest):
     if not request.question or not request.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
     
+    # Existence checks first: a typo'd user_id or expired session must not spend the rate limit
+    if not get_user_profile_view(request.user_id):
+        raise HTTPException(status_code=404, detail=f"Profile not found for user_id: {request.user_id}")
+    session = resolve_session(request)
+    check_rate_limit(request.user_id)
+
     # Call multi-agent orchestrator
-    result = chat_with_multi_agent(
-        user_id=request.user_id,
-        question=request.question.strip()
-    )
+    try:
+        result = await chat_with_multi_agent(
+            user_id=request.user_id,
+            question=request.question.strip(),
+            session=session
+        )
+    except Overloaded as e:
+        raise overload_error(e)
     
     # Check for errors
     if result.get("error"):
@@ -51,10 +121,221 @@ async def chat_with_ai(request: ChatRequest):
     return ChatResponse(
         response=result["response"],
         profile_used=result.get("profile_used"),
-        search_results=result.get("search_results")
+        search_results=result.get("search_results"),
+        session_id=request.session_id
     )
 
 
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post(
+    "/ask/stream",
+    summary="Ask the AI Study Abroad Advisor (streaming)",
+    description="Same as /chat/ask, but streams the answer as Server-Sent Events: a `metadata` event, then `token` events, then `done` or `error`."
+)
+async def chat_with_ai_stream(request: ChatRequest, http_request: Request):
+    """
+    Streaming Multi-Agent Chat Endpoint
+
+    Profile and search metadata are sent as soon as they are ready, then
+    LLM tokens are forwarded as they arrive. If the client goes away, the
+    upstream LLM stream is closed so it stops generating tokens.
+    """
+    if not request.question or not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+    # Existence checks first: a typo'd user_id or expired session must not spend the rate limit
+    if not get_user_profile_view(request.user_id):
+        raise HTTPException(status_code=404, detail=f"Profile not found for user_id: {request.user_id}")
+    session = resolve_session(request)
+    check_rate_limit(request.user_id)
+    context = await prepare_chat_context(
+        user_id=request.user_id,
+        question=request.question.strip(),
+        session=session
+    )
+    if context.get("error"):
+        raise HTTPException(status_code=404, detail=context["error"])
+
+    # The first event waits for an LLM slot, so overload is still a plain HTTP error
+    events = stream_chat_with_multi_agent(context)
+    try:
+        first = await events.__anext__()
+    except Overloaded as e:
+        raise overload_error(e)
+
+    async def event_stream():
+        try:
+            yield format_sse(*first)
+            async for event, data in events:
+                if await http_request.is_disconnected():
+                    break
+                yield format_sse(event, data)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/ask/batch",
+    summary="Ask many questions at once (NDJSON stream)",
+    description="Runs many (user_id, question) pairs with bounded concurrency. Each line of the response is one item's result, in completion order, tagged with its `index` in the request."
+)
+async def chat_with_ai_batch(request: ChatBatchRequest):
+    """
+    Batch Multi-Agent Chat Endpoint
+
+    Identical search queries across the batch are fetched once. One failing
+    item produces an error line and does not fail the batch.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(status_code=400, detail=f"Batch too large. Maximum is {settings.batch_max_items} items.")
+
+    concurrency = min(request.concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency)
+    items = [(item.user_id, item.question) for item in request.items]
+
+    async def ndjson_stream():
+        results = chat_batch(items, concurrency=concurrency)
+        try:
+            async for result in results:
+                yield json.dumps(result) + "\n"
+        finally:
+            await results.aclose()
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/jobs",
+    response_model=ChatJobResponse,
+    status_code=202,
+    summary="Ask in the background",
+    description="Queue a question and return a job_id at once; fetch the answer with GET /chat/jobs/{job_id}. Send an `Idempotency-Key` header to make retries return the original job instead of asking again."
+)
+async def submit_chat_job(
+    request: ChatRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, description="Client-chosen key; resubmits with the same key return the same job"),
+):
+    """Chat Job Submission Endpoint"""
+    if not request.question or not request.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+    existing = job_queue.find(request.user_id, idempotency_key) if idempotency_key else None
+    if existing is not None:
+        response.status_code = 200
+        return existing.describe()
+
+    if not get_user_profile_view(request.user_id):
+        raise HTTPException(status_code=404, detail=f"Profile not found for user_id: {request.user_id}")
+    session = resolve_session(request)
+    check_rate_limit(request.user_id)
+    try:
+        job, _ = job_queue.submit(request.user_id, request.question.strip(), session=session, idempotency_key=idempotency_key)
+    except Overloaded as e:
+        raise overload_error(e)
+    response.headers["Location"] = f"/chat/jobs/{job.job_id}"
+    return job.describe()
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=ChatJobResponse,
+    summary="Get a background answer",
+    description="Status and, once done, the answer of a chat job. With `wait`, the call long-polls: it returns as soon as the job finishes, or after `wait` seconds with the current status."
+)
+async def get_chat_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Seconds to wait for the job to finish (capped by the server)"),
+):
+    """Chat Job Polling Endpoint"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    await job_queue.wait(job, min(wait, settings.chat_job_max_poll_seconds))
+    return job.describe()
+
+
+@router.post(
+    "/sessions",
+    status_code=201,
+    summary="Start a conversation",
+    description="Create a multi-turn chat session. Pass the returned session_id to /chat/ask or /chat/ask/stream."
+)
+async def start_session(request: SessionCreateRequest):
+    """Create a chat session for a user"""
+    if not get_user_profile_view(request.user_id):
+        raise HTTPException(status_code=404, detail=f"Profile not found for user_id: {request.user_id}")
+    return describe_session(create_session(request.user_id))
+
+
+@router.get(
+    "/sessions/{session_id}",
+    summary="Get a conversation",
+    description="Rolling summary and recent turns of a chat session"
+)
+async def get_chat_session(session_id: str):
+    """Retrieve a chat session"""
+    session = get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return describe_session(session)
+
+
+@router.delete(
+    "/sessions/{session_id}",
+    status_code=204,
+    summary="End a conversation"
+)
+async def end_chat_session(session_id: str):
+    """Delete a chat session"""
+    if not delete_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
+
+@router.get(
+    "/usage/{user_id}",
+    summary="Token Usage",
+    description="Prompt and completion tokens a user's questions consumed over the rolling usage window, per bucket and in total"
+)
+async def get_token_usage(user_id: int):
+    """Per-user token usage"""
+    if not get_user_profile_view(user_id):
+        raise HTTPException(status_code=404, detail=f"Profile not found for user_id: {user_id}")
+    return {**usage_ledger.usage(user_id), "tier": user_tier(user_id)}
+
+
+@router.get(
+    "/search-cache",
+    summary="Search Cache Stats",
+    description="Hit/miss/eviction counters for the Tavily search result cache, and whether search prefetching on profile submit pays off (`prefetch.hit_rate`: share of live searches answered with prefetched sources)"
+)
+async def search_cache_info():
+    """Search cache statistics"""
+    return {**search_cache_stats(), "prefetch": search_prefetcher.stats()}
+
+
+@router.get(
+    "/providers",
+    summary="LLM Provider Health",
+    description="Circuit breaker state, hedge delay and recent error rate of each configured LLM provider"
+)
+async def llm_provider_info():
+    """LLM provider pool status"""
+    llm = get_llm()
+    return {"providers": llm.status() if isinstance(llm, LLMPool) else []}
+
+
 @router.get(
     "/",
     summary="Chat API Info",
@@ -71,7 +352,11 @@ async def chat_info():
         ],
         "usage": {
             "step_1": "Submit profile at /profile/submit to get user_id",
-            "step_2": "Send questions to /chat/ask with user_id"
+            "step_2": "Send questions to /chat/ask with user_id",
+            "streaming": "POST /chat/ask/stream for Server-Sent Events",
+            "sessions": "POST /chat/sessions, then pass session_id to /chat/ask for multi-turn chat",
+            "jobs": "POST /chat/jobs returns a job_id at once; long-poll GET /chat/jobs/{job_id}?wait=20 for the answer",
+            "usage": "GET /chat/usage/{user_id} for the tokens a user consumed recently"
         },
         "model": "millat/study-abroad-guidance-ai (HuggingFace)"
     }
\ No newline at end of file
@@ -1,28 +1,74 @@
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException, status
-from typing import List, Optional
-from schemas.profile import UserInfoCreate, UserInfoResponse, COUNTRIES, PHONE_COUNTRY_CODES
-from services.profile_service import save_user_profile, get_user_profile
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from typing import Optional
+from core.config import settings
+from schemas.profile import UserInfoCreate, UserInfoResponse, COUNTRY_SET, PHONE_COUNTRY_CODE_SET
+from services.prefetch_service import search_prefetcher
+from services.profile_import_service import import_profiles
+from services.profile_service import format_name, normalize_country_input, render_user_profile, save_user_profile
+from services.resume_service import parse_resume, upload_too_large
 import json
 
-router = APIRouter(prefix="/profile", tags=["User Profile"])
-
-def format_name(name: Optional[str]) -> Optional[str]:
-    if not name:
-        return name
-    name = name.strip().lower()
-    prefixes = ["md.", "mr.", "mrs.", "dr.", "prof."]
-    for prefix in prefixes:
-        name = name.replace(prefix.replace(".", ""), prefix)
-    name = name.title()
-    name = name.replace("Md.", "Md. ").replace("Mr.", "Mr. ").replace("Mrs.", "Mrs. ")
-    return name.strip()
-
-def normalize_country_input(value: str) -> List[str]:
-    """Handle comma-separated or single country input"""
-    if not value:
-        return []
-    items = [item.strip().title() for item in value.split(",") if item.strip()]
-    return items
+# Room for the non-file form fields sent alongside a resume
+_FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class _UploadCappedRoute(APIRoute):
+    """
+    Route that refuses oversized multipart bodies before the form is parsed
+
+    Without this the whole upload is spooled to disk before the handler
+    can look at the resume's size. A Content-Length over the cap is
+    rejected up front; a body sent without one is counted as it is read.
+    Other content types (e.g. the NDJSON of /profile/bulk) are not capped.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def capped_handler(request: Request) -> Response:
+            if not request.headers.get("content-type", "").startswith("multipart/"):
+                return await handler(request)
+            max_body = settings.resume_max_bytes + _FORM_OVERHEAD_BYTES
+            length = request.headers.get("content-length", "")
+            if length.isdigit() and int(length) > max_body:
+                raise upload_too_large(settings.resume_max_bytes)
+
+            received = 0
+
+            async def counting_receive():
+                nonlocal received
+                message = await request.receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > max_body:
+                        raise upload_too_large(settings.resume_max_bytes)
+                return message
+
+            return await handler(Request(request.scope, counting_receive))
+
+        return capped_handler
+
+
+router = APIRouter(prefix="/profile", tags=["User Profile"], route_class=_UploadCappedRoute)
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose generator still reads the request body
+
+    The stock class listens for client disconnects on `receive` while it
+    streams, which would swallow body chunks the generator has not read
+    yet. Here the body reader sees the disconnect itself
+    (request.stream() raises ClientDisconnect).
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
 
 @router.post(
     "/submit",
@@ -62,11 +108,11 @@ async def submit_profile(
 
     # Validation
     all_countries = nationality + current_living_country + preferred_countries
-    invalid = [c for c in all_countries if c not in COUNTRIES]
+    invalid = [c for c in all_countries if c not in COUNTRY_SET]
     if invalid:
         raise HTTPException(status_code=400, detail=f"Invalid countries: {', '.join(invalid)}")
 
-    if phone_country_code and phone_country_code not in PHONE_COUNTRY_CODES:
+    if phone_country_code and phone_country_code not in PHONE_COUNTRY_CODE_SET:
         raise HTTPException(status_code=400, detail="Invalid phone country code")
 
     # Education
@@ -75,8 +121,9 @@ async def submit_profile(
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid education JSON")
 
-    # Resume
+    # Resume (parsed off the event loop)
     resume_filename = resume.filename if resume else None
+    resume_text = await parse_resume(resume) if resume else None
 
     # Full phone
     full_phone = f"{phone_country_code}{phone_number.strip()}" if phone_country_code and phone_number else None
@@ -98,12 +145,16 @@ async def submit_profile(
         budget_max_bdt=budget_max_bdt,
         preferred_currency=preferred_currency,
         preferred_intake=preferred_intake,
-        resume_filename=resume_filename
+        resume_filename=resume_filename,
+        resume_text=resume_text
     )
     
     # Save to cache and get user_id
     user_id = save_user_profile(profile)
 
+    # Warm searches for the questions this student will probably ask first
+    search_prefetcher.schedule(profile.dict())
+
     return UserInfoResponse(
         **profile.dict(),
         id=user_id,
@@ -113,14 +164,61 @@ async def submit_profile(
     )
 
 
+@router.post(
+    "/bulk",
+    summary="Bulk Import Profiles (NDJSON)",
+    description="Request body is NDJSON: one JSON object per line with the /profile/submit form fields (country fields may be lists or comma-separated strings, `education` a list). The response streams one NDJSON line per input line, `{line, user_id}` or `{line, error}`, followed by a `{done, imported, failed}` summary."
+)
+async def bulk_import_profiles(request: Request):
+    """
+    Bulk Profile Import Endpoint
+
+    The body is read and validated in batches as it arrives, each batch is
+    saved in one transaction, and its results are streamed back before the
+    next batch is read. An invalid line produces an error line and does not
+    stop the import.
+    """
+    async def ndjson_stream():
+        results = import_profiles(request.stream())
+        try:
+            async for result in results:
+                yield json.dumps(result) + "\n"
+        finally:
+            await results.aclose()
+
+    return _DuplexStreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
 @router.get(
     "/get/{user_id}",
     summary="Get User Profile",
-    description="Retrieve a user profile by ID"
+    description="Retrieve a user profile by ID. Responses carry an `ETag`; send it back in `If-None-Match` to get `304 Not Modified` while the profile is unchanged. `?fields=full_name,preferred_countries` returns only those profile fields (e.g. to leave out `resume_text`)."
 )
-async def get_profile(user_id: int):
+async def get_profile(
+    user_id: int,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated profile fields to return (default: all)"),
+):
     """Retrieve user profile by ID"""
-    profile = get_user_profile(user_id)
-    if not profile:
+    requested = tuple(sorted({field.strip() for field in fields.split(",") if field.strip()})) if fields else None
+    try:
+        rendered = render_user_profile(user_id, requested or None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if rendered is None:
         raise HTTPException(status_code=404, detail=f"Profile not found for user_id: {user_id}")
-    return {"user_id": user_id, "profile": profile}
+
+    etag, body = rendered
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
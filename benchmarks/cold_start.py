@@ -0,0 +1,136 @@
+# Benchmark - import time and cold-start latency of the Worker entrypoint
+#
+# Each measurement runs in a fresh interpreter: import main, then serve one
+# request straight through the ASGI app. Reports the import time, the first
+# request's latency and which heavy stacks (langchain, OpenAI, PyMuPDF,
+# httpx) were loaded by then; /health and /profile/get should load none of
+# them. Also lists the slowest modules from `python -X importtime` so
+# startup regressions can be traced to a module.
+#
+# The Cloudflare runtime modules (`workers`, `asgi`) only exist inside a
+# Worker; when they are missing, empty modules stand in for them so main.py
+# can be imported locally.
+#
+# Usage:
+#   python -m benchmarks.cold_start --runs 5 --top 15
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ("langchain_core", "langchain_openai", "openai", "fitz", "httpx")
+REQUESTS = (None, "/health", "/profile/get/1", "/chat/providers")
+
+CHILD = r"""
+import asyncio, json, sys, time, types
+HEAVY = {heavy!r}
+PATH = {path!r}
+
+started = time.perf_counter()
+for name in ("workers", "asgi"):
+    try:
+        __import__(name)
+    except ImportError:
+        stand_in = sys.modules[name] = types.ModuleType(name)
+        stand_in.WorkerEntrypoint = object
+import main
+result = {{"import_seconds": time.perf_counter() - started}}
+result["loaded_after_import"] = [m for m in HEAVY if m in sys.modules]
+
+async def call(path):
+    scope = {{
+        "type": "http", "asgi": {{"version": "3.0"}}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }}
+    status = None
+
+    async def receive():
+        return {{"type": "http.request", "body": b"", "more_body": False}}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await main.app(scope, receive, send)
+    return status
+
+if PATH:
+    started = time.perf_counter()
+    result["status"] = asyncio.run(call(PATH))
+    result["first_request_seconds"] = time.perf_counter() - started
+    result["loaded_after_request"] = [m for m in HEAVY if m in sys.modules]
+print(json.dumps(result))
+"""
+
+
+def run_child(path, env: dict, importtime: bool = False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + [
+        "-c", CHILD.format(heavy=HEAVY_MODULES, path=path)
+    ]
+    done = subprocess.run(command, env=env, cwd=env["BENCH_CWD"], capture_output=True, text=True, check=True)
+    return json.loads(done.stdout.strip().splitlines()[-1]), done.stderr
+
+
+def slowest_modules(importtime_log: str, top: int) -> list:
+    """(cumulative us, self us, module) for the slowest imports"""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per request")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "TAVILY_API_KEY": os.environ.get("TAVILY_API_KEY", "bench"),
+            "GITHUB_TOKEN": os.environ.get("GITHUB_TOKEN", "bench"),
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            "SEARCH_INDEX_PATH": os.path.join(tmp, "search_index.db"),
+            "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])),
+            "BENCH_CWD": tmp,
+        }
+
+        results = []
+        print(f"{'request':<18}{'import ms':>11}{'request ms':>12}{'status':>8}  heavy modules loaded")
+        for path in REQUESTS:
+            runs = [run_child(path, env)[0] for _ in range(args.runs)]
+            row = {
+                "request": path or "(import only)",
+                "import_ms": round(statistics.median(r["import_seconds"] for r in runs) * 1000, 1),
+                "request_ms": round(statistics.median(r["first_request_seconds"] for r in runs) * 1000, 1) if path else None,
+                "status": runs[-1].get("status"),
+                "heavy_loaded": runs[-1].get("loaded_after_request", runs[-1]["loaded_after_import"]),
+            }
+            results.append(row)
+            request_ms = f"{row['request_ms']:.1f}" if path else "-"
+            print(f"{row['request']:<18}{row['import_ms']:>11.1f}{request_ms:>12}{row['status'] or '-':>8}  "
+                  f"{', '.join(row['heavy_loaded']) or 'none'}")
+
+        _, log = run_child(None, env, importtime=True)
+        print("\nslowest imports for `import main` (cumulative / self, ms)")
+        for cumulative, own, module in slowest_modules(log, args.top):
+            print(f"  {cumulative / 1000:8.1f} {own / 1000:8.1f}  {module}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
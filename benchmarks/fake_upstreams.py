@@ -0,0 +1,260 @@
+# Fake upstreams - local stand-ins for the OpenAI-compatible chat API and Tavily
+#
+# A dependency-free asyncio HTTP/1.1 server (keep-alive, chunked streaming)
+# that answers:
+#   POST /chat/completions   OpenAI chat completion, plain or streamed (SSE)
+#   POST /search             Tavily search
+# with configurable latency, jitter and error rates, so the real clients in
+# core/clients.py can be exercised without calling paid APIs. Point the app
+# at it with LLM_BASE_URL / TAVILY_BASE_URL.
+#
+# Usage:
+#   python -m benchmarks.fake_upstreams --port 8900 --llm-latency 0.8 --search-latency 1.5
+#   LLM_BASE_URL=http://127.0.0.1:8900 TAVILY_BASE_URL=http://127.0.0.1:8900 uvicorn main:app
+
+from typing import Dict, Optional, Tuple
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+
+WORDS = (
+    "Based on your profile, Germany offers tuition-free public universities with strong computer science "
+    "programs. Budget for the blocked account and living costs, apply for DAAD scholarships early, and "
+    "prepare your documents before the intake deadline. Next steps: shortlist universities, draft your SOP, "
+    "and book your IELTS test."
+).split()
+
+_REASONS = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class FakeUpstreamConfig:
+    """Latency and failure behaviour of the fake upstreams (seconds, rates in 0..1)"""
+
+    def __init__(self, llm_latency: float = 0.5, llm_jitter: float = 0.1, llm_error_rate: float = 0.0,
+                 llm_tokens: int = 200, token_interval: float = 0.005, search_latency: float = 1.0,
+                 search_jitter: float = 0.2, search_error_rate: float = 0.0, basic_search_factor: float = 0.4,
+                 seed: Optional[int] = None):
+        self.llm_latency = llm_latency  # Time to first token
+        self.llm_jitter = llm_jitter
+        self.llm_error_rate = llm_error_rate
+        self.llm_tokens = llm_tokens  # Completion length (capped by the request's max_tokens)
+        self.token_interval = token_interval  # Per-token time, streamed or not
+        self.search_latency = search_latency  # Advanced-depth search
+        self.search_jitter = search_jitter
+        self.search_error_rate = search_error_rate
+        self.basic_search_factor = basic_search_factor  # Basic depth takes this fraction of the latency
+        self.seed = seed
+
+    @classmethod
+    def add_arguments(cls, parser: argparse.ArgumentParser):
+        defaults = cls()
+        parser.add_argument("--llm-latency", type=float, default=defaults.llm_latency, help="LLM time to first token (s)")
+        parser.add_argument("--llm-jitter", type=float, default=defaults.llm_jitter, help="+/- uniform jitter (s)")
+        parser.add_argument("--llm-error-rate", type=float, default=defaults.llm_error_rate, help="Share of LLM calls answered 500")
+        parser.add_argument("--llm-tokens", type=int, default=defaults.llm_tokens, help="Completion tokens per answer")
+        parser.add_argument("--token-interval", type=float, default=defaults.token_interval, help="Seconds per completion token")
+        parser.add_argument("--search-latency", type=float, default=defaults.search_latency, help="Advanced search latency (s)")
+        parser.add_argument("--search-jitter", type=float, default=defaults.search_jitter, help="+/- uniform jitter (s)")
+        parser.add_argument("--search-error-rate", type=float, default=defaults.search_error_rate, help="Share of searches answered 500")
+        parser.add_argument("--seed", type=int, default=None, help="Random seed for jitter and errors")
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "FakeUpstreamConfig":
+        return cls(
+            llm_latency=args.llm_latency, llm_jitter=args.llm_jitter, llm_error_rate=args.llm_error_rate,
+            llm_tokens=args.llm_tokens, token_interval=args.token_interval, search_latency=args.search_latency,
+            search_jitter=args.search_jitter, search_error_rate=args.search_error_rate, seed=args.seed,
+        )
+
+
+class FakeUpstreamServer:
+    """Serves the fake chat completion and search APIs on one port"""
+
+    def __init__(self, config: FakeUpstreamConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.requests = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening; returns the bound port"""
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=1024)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def _delay(self, base: float, jitter: float) -> float:
+        return max(0.0, base + self._random.uniform(-jitter, jitter))
+
+    # HTTP plumbing
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests += 1
+                await self._dispatch(method, path.split("?", 1)[0], body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\ncontent-type: application/json\r\n"
+            f"content-length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter):
+        if method != "POST":
+            return await self._respond(writer, 405, {"error": "method not allowed"})
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = {}
+        if path.endswith("/chat/completions"):
+            return await self._chat(payload, writer)
+        if path.endswith("/search"):
+            return await self._search(payload, writer)
+        return await self._respond(writer, 404, {"error": f"no route for {path}"})
+
+    # Tavily
+
+    async def _search(self, payload: Dict, writer: asyncio.StreamWriter):
+        config = self.config
+        latency = self._delay(config.search_latency, config.search_jitter)
+        if payload.get("search_depth") == "basic":
+            latency *= config.basic_search_factor
+        await asyncio.sleep(latency)
+        if self._random.random() < config.search_error_rate:
+            return await self._respond(writer, 500, {"detail": {"error": "fake upstream failure"}})
+
+        query = payload.get("query", "")
+        results = [
+            {
+                "title": f"Result {i + 1} for {query[:60]}",
+                "url": f"https://example.com/{abs(hash(query)) % 100000}/{i}",
+                "content": " ".join(WORDS[i:] + WORDS[:i]),
+                "score": round(1.0 - i * 0.1, 2),
+            }
+            for i in range(int(payload.get("max_results", 5)))
+        ]
+        await self._respond(writer, 200, {
+            "query": query,
+            "answer": " ".join(WORDS[:30]) if payload.get("include_answer") else None,
+            "results": results,
+            "response_time": round(latency, 3),
+        })
+
+    # OpenAI chat completions
+
+    def _completion_tokens(self, payload: Dict) -> int:
+        limit = payload.get("max_tokens") or payload.get("max_completion_tokens")
+        return min(self.config.llm_tokens, limit) if limit else self.config.llm_tokens
+
+    async def _chat(self, payload: Dict, writer: asyncio.StreamWriter):
+        config = self.config
+        await asyncio.sleep(self._delay(config.llm_latency, config.llm_jitter))
+        if self._random.random() < config.llm_error_rate:
+            return await self._respond(writer, 500, {"error": {"message": "fake upstream failure", "type": "server_error"}})
+
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+        usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": self._completion_tokens(payload)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        words = [WORDS[i % len(WORDS)] for i in range(usage["completion_tokens"])]
+        meta = {"id": f"chatcmpl-fake{self.requests}", "created": int(time.time()), "model": payload.get("model", "fake")}
+
+        if not payload.get("stream"):
+            await asyncio.sleep(config.token_interval * len(words))
+            return await self._respond(writer, 200, {
+                **meta,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\ntransfer-encoding: chunked\r\n\r\n"
+        )
+        chunk = {**meta, "object": "chat.completion.chunk"}
+        for i, word in enumerate(words):
+            delta = {"role": "assistant", "content": word} if i == 0 else {"content": " " + word}
+            await self._write_event(writer, {**chunk, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            await asyncio.sleep(config.token_interval)
+        await self._write_event(writer, {**chunk, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            await self._write_event(writer, {**chunk, "choices": [], "usage": usage})
+        await self._write_chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _write_event(self, writer: asyncio.StreamWriter, data: Dict):
+        await self._write_chunk(writer, f"data: {json.dumps(data)}\n\n".encode())
+
+    async def _write_chunk(self, writer: asyncio.StreamWriter, data: bytes):
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        await writer.drain()
+
+
+def _serve(config: FakeUpstreamConfig, port: int, ready):
+    async def run():
+        server = FakeUpstreamServer(config)
+        bound = await server.start(port=port)
+        if ready is not None:
+            ready.put(bound)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def start_in_process(config: FakeUpstreamConfig, port: int = 0) -> Tuple[multiprocessing.Process, str]:
+    """
+    Run the fake upstreams in a child process, so their work does not
+    share an event loop or CPU with the app being measured
+
+    Returns:
+        (process, base URL); terminate the process when done
+    """
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(config, port, ready), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{ready.get(timeout=10)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible and Tavily upstreams")
+    parser.add_argument("--port", type=int, default=8900)
+    FakeUpstreamConfig.add_arguments(parser)
+    args = parser.parse_args()
+    print(f"Fake upstreams on http://127.0.0.1:{args.port} (POST /chat/completions, POST /search)")
+    _serve(FakeUpstreamConfig.from_args(args), args.port, None)
+
+
+if __name__ == "__main__":
+    main()
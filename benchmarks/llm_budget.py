@@ -0,0 +1,136 @@
+# Benchmark - /chat/ask latency per output token budget
+#
+# Runs the real endpoint against the fake OpenAI-compatible and Tavily
+# servers (benchmarks/fake_upstreams.py), whose model answers with
+# --llm-tokens tokens unless max_tokens is lower, at --token-interval
+# seconds per token. Reports p50/p95 latency and mean completion tokens
+# with no budget (the behaviour before budgets existed) and with each
+# budget in --budgets.
+#
+# A last phase shortens the request deadline below the time a full-length
+# answer takes and compares a fixed budget with the deadline-aware one,
+# which sizes max_tokens to the observed generation speed.
+#
+# Usage:
+#   python -m benchmarks.llm_budget --budgets 1500,800,400 --llm-tokens 1500 --token-interval 0.005
+
+import argparse
+import asyncio
+import itertools
+import os
+import time
+
+from benchmarks.fake_upstreams import FakeUpstreamConfig, start_in_process
+
+UNLIMITED = 1_000_000
+_question_ids = itertools.count()
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run_phase(client, user_id: int, requests: int, concurrency: int) -> dict:
+    """Send unique questions; return latency percentiles and timed-out answers"""
+    from services.usage_service import usage_ledger
+
+    before = usage_ledger.usage(user_id)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, timed_out = [], 0
+
+    async def one():
+        nonlocal timed_out
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/chat/ask", json={
+                "user_id": user_id,
+                "question": f"What does a masters in Germany cost? (#{next(_question_ids)})",
+            })
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+            if response.json()["response"].startswith("Error"):
+                timed_out += 1
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    after = usage_ledger.usage(user_id)
+    calls = after["calls"] - before["calls"]
+    return {
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "completion_tokens": (after["completion_tokens"] - before["completion_tokens"]) / calls if calls else 0.0,
+        "timed_out": timed_out,
+    }
+
+
+def configure(budget: int, deadline_aware: bool = True):
+    from core.config import settings
+    from services.usage_service import output_rate
+
+    settings.llm_output_tokens = f"ask={budget}"
+    settings.llm_output_tokens_max = max(budget, 2000)
+    output_rate.min_samples = 10 if deadline_aware else UNLIMITED
+
+
+async def run(args):
+    # Imported after the environment points the settings at the fake upstreams
+    import httpx
+    from benchmarks.load_chat import build_app
+    from benchmarks.load_suite import profile_form
+    from core.clients import upstream
+    from core.config import settings
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        user_id = (await client.post("/profile/submit", data=profile_form(1))).json()["user_id"]
+        configure(UNLIMITED)
+        await run_phase(client, user_id, 1, 1)  # Warm-up: client creation and first imports
+
+        print(f"{args.requests} requests at concurrency {args.concurrency}; the model's natural answer is "
+              f"{args.llm_tokens} tokens at {args.token_interval * 1000:.1f} ms/token")
+        print(f"{'budget':<22}{'p50 ms':>10}{'p95 ms':>10}{'tokens':>9}{'timed out':>11}")
+        phases = [("none (before)", UNLIMITED)] + [(str(budget), budget) for budget in args.budgets]
+        for label, budget in phases:
+            configure(budget)
+            row = await run_phase(client, user_id, args.requests, args.concurrency)
+            print(f"{label:<22}{row['p50_ms']:>10.0f}{row['p95_ms']:>10.0f}{row['completion_tokens']:>9.0f}{row['timed_out']:>11}")
+
+        settings.chat_deadline_seconds = args.deadline
+        print(f"\nwith a {args.deadline:g}s request deadline, budget {args.llm_tokens}:")
+        for label, aware in (("fixed budget", False), ("deadline-aware", True)):
+            configure(args.llm_tokens, deadline_aware=aware)
+            row = await run_phase(client, user_id, args.requests, args.concurrency)
+            print(f"{label:<22}{row['p50_ms']:>10.0f}{row['p95_ms']:>10.0f}{row['completion_tokens']:>9.0f}{row['timed_out']:>11}")
+    await upstream.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Output token budget benchmark against fake upstreams")
+    parser.add_argument("--budgets", default="1500,800,400", help="Comma-separated max_tokens budgets for /chat/ask")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per budget")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=5.0, help="Request deadline (s) for the last phase")
+    FakeUpstreamConfig.add_arguments(parser)
+    parser.set_defaults(llm_tokens=1500, llm_latency=0.3, search_latency=0.2)
+    args = parser.parse_args()
+    args.budgets = [int(x) for x in args.budgets.split(",")]
+
+    process, base_url = start_in_process(FakeUpstreamConfig.from_args(args))
+    os.environ.update({
+        "LLM_BASE_URL": base_url,
+        "TAVILY_BASE_URL": base_url,
+        "TAVILY_API_KEY": "bench",
+        "GITHUB_TOKEN": "bench",
+        "LLM_PROVIDERS": "github",
+        "DATABASE_URL": "memory://",
+        "SEARCH_INDEX_PATH": "",
+        "USER_RATE_PER_MINUTE": "0",
+    })
+    try:
+        asyncio.run(run(args))
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main()
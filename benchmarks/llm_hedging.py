@@ -0,0 +1,129 @@
+# Benchmark - tail latency of hedged LLM calls
+#
+# Two fake providers: a primary whose latency has a heavy tail (most calls
+# fast, some very slow) and a steadier secondary. Compares calling the
+# primary alone with the hedged pool, for ainvoke and for the first token
+# of astream, and reports how many extra upstream calls hedging costs.
+# A last phase makes the primary fail outright to show the circuit breaker
+# taking it out of rotation.
+#
+# Usage:
+#   python -m benchmarks.llm_hedging --calls 400 --slow-share 0.05
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+
+from core.llm_pool import INVOKE, STREAM, LLMPool, LLMProvider
+
+
+class _FakeChunk:
+    def __init__(self, content: str):
+        self.content = content
+        self.usage_metadata = None
+
+
+class TailLLM:
+    """Fake provider: `fast` seconds usually, `slow` seconds for `slow_share` of calls"""
+
+    def __init__(self, rng: random.Random, fast: float, slow: float, slow_share: float, error_rate: float = 0.0):
+        self.rng = rng
+        self.fast = fast
+        self.slow = slow
+        self.slow_share = slow_share
+        self.error_rate = error_rate
+        self.calls = 0
+
+    async def _wait(self):
+        self.calls += 1
+        await asyncio.sleep(self.slow if self.rng.random() < self.slow_share else self.fast * self.rng.uniform(0.8, 1.2))
+        if self.rng.random() < self.error_rate:
+            raise RuntimeError("fake provider error")
+
+    async def ainvoke(self, messages, **kwargs):
+        await self._wait()
+        return _FakeChunk("answer")
+
+    async def astream(self, messages, **kwargs):
+        await self._wait()
+        for word in ("benchmark", " answer"):
+            yield _FakeChunk(word)
+            await asyncio.sleep(0.001)
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def measure(pool: LLMPool, calls: int, concurrency: int, stream: bool) -> list:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                if stream:
+                    async for _ in pool.astream([]):
+                        latencies.append(time.perf_counter() - started)  # First token
+                        break
+                else:
+                    await pool.ainvoke([])
+                    latencies.append(time.perf_counter() - started)
+            except Exception:
+                pass
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies
+
+
+def report(label: str, latencies: list, upstream_calls: int, calls: int):
+    print(f"  {label:<22} p50 {percentile(latencies, 0.5) * 1000:7.1f} ms   p95 {percentile(latencies, 0.95) * 1000:7.1f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms   upstream calls/request {upstream_calls / calls:.2f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Hedged LLM call benchmark")
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--fast", type=float, default=0.2, help="Usual primary latency (s)")
+    parser.add_argument("--slow", type=float, default=3.0, help="Tail primary latency (s)")
+    parser.add_argument("--slow-share", type=float, default=0.05, help="Share of slow primary calls")
+    parser.add_argument("--secondary", type=float, default=0.35, help="Secondary latency (s)")
+    args = parser.parse_args()
+
+    for stream in (False, True):
+        print("astream (first token)" if stream else "ainvoke")
+        rng = random.Random(1)
+        primary = TailLLM(rng, args.fast, args.slow, args.slow_share)
+        alone = LLMPool([LLMProvider("primary", primary)])
+        report("primary only", await measure(alone, args.calls, args.concurrency, stream), primary.calls, args.calls)
+
+        primary = TailLLM(rng, args.fast, args.slow, args.slow_share)
+        secondary = TailLLM(rng, args.secondary, args.slow, args.slow_share / 5)
+        hedged = LLMPool([LLMProvider("primary", primary), LLMProvider("secondary", secondary)])
+        await measure(hedged, 50, args.concurrency, stream)  # Warm-up: learn the primary's latency percentile
+        primary.calls = secondary.calls = 0
+        latencies = await measure(hedged, args.calls, args.concurrency, stream)
+        report("hedged", latencies, primary.calls + secondary.calls, args.calls)
+        print(f"  {'':<22} hedge delay {hedged.providers[0].health.hedge_delay(STREAM if stream else INVOKE) * 1000:.0f} ms, "
+              f"secondary fired on {secondary.calls / args.calls:.1%} of requests")
+
+    print("circuit breaker (primary starts failing every call)")
+    rng = random.Random(2)
+    primary = TailLLM(rng, args.fast, args.slow, 0.0, error_rate=1.0)
+    secondary = TailLLM(rng, args.secondary, args.slow, 0.0)
+    pool = LLMPool([LLMProvider("primary", primary), LLMProvider("secondary", secondary)])
+    latencies = await measure(pool, args.calls, 1, False)
+    report("failing primary", latencies, primary.calls + secondary.calls, args.calls)
+    print(f"  {'':<22} primary tried {primary.calls} times, circuit open: {pool.providers[0].health.is_open()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
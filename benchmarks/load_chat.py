@@ -0,0 +1,104 @@
+# Load test - /chat/ask throughput vs. concurrency
+#
+# Replaces Tavily and the LLM with fixed-latency async stand-ins so the
+# numbers reflect the orchestration layer only. With a non-blocking
+# pipeline, throughput should grow roughly linearly with concurrency.
+#
+# Usage:
+#   python -m benchmarks.load_chat --latency 0.5 --levels 1,8,32,64
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+os.environ.setdefault("DATABASE_URL", "memory://")
+os.environ.setdefault("USER_RATE_PER_MINUTE", "0")  # One user sends every request
+
+import httpx
+from fastapi import FastAPI
+
+from api.v1.api import router as api_v1_router
+from core.clients import upstream
+from services import chat_service
+from services.profile_service import save_user_profile
+from schemas.profile import UserInfoCreate
+
+
+class _FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeLLM:
+    """Async stand-in for ChatOpenAI with a fixed response latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(self.latency)
+        return _FakeMessage("Benchmark answer")
+
+
+def install_fakes(search_latency: float, llm_latency: float):
+    async def fake_search_web(query: str, max_results: int = 5, **kwargs):
+        await asyncio.sleep(search_latency)
+        return {"answer": "Benchmark summary", "sources": []}
+
+    chat_service.search_web = fake_search_web
+    upstream.start()
+    upstream.llm = FakeLLM(llm_latency)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_v1_router)
+    return app
+
+
+async def run_level(client: httpx.AsyncClient, user_id: int, concurrency: int, requests: int) -> float:
+    """Fire `requests` chat calls with at most `concurrency` in flight; return req/s"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            response = await client.post(
+                "/chat/ask",
+                json={"user_id": user_id, "question": "What does it cost to study in Germany?"},
+            )
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Chat pipeline load test")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per fake upstream call")
+    parser.add_argument("--levels", default="1,8,32,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=4, help="Requests per level = level * rounds")
+    args = parser.parse_args()
+
+    install_fakes(args.latency, args.latency)
+    user_id = save_user_profile(UserInfoCreate(
+        full_name="Bench Student",
+        email="bench@example.com",
+        preferred_countries=["Germany"],
+    ))
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        baseline = None
+        print(f"{'concurrency':>12} {'req/s':>10} {'speedup':>10}")
+        for level in [int(x) for x in args.levels.split(",")]:
+            rps = await run_level(client, user_id, level, level * args.rounds)
+            baseline = baseline or rps
+            print(f"{level:>12} {rps:>10.2f} {rps / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
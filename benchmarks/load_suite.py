@@ -0,0 +1,209 @@
+# Load suite - end-to-end latency and throughput against local fake upstreams
+#
+# Starts the fake OpenAI-compatible and Tavily servers (benchmarks/fake_upstreams.py)
+# in a child process, points the app at them through LLM_BASE_URL and
+# TAVILY_BASE_URL, and drives the real endpoints at increasing concurrency:
+#   profile_submit  POST /profile/submit
+#   profile_get     GET  /profile/get/{id}
+#   chat            POST /chat/ask
+#   chat_stream     POST /chat/ask/stream (read to the end)
+# Every chat question is unique, so the search cache and request coalescing
+# do not hide upstream latency. Reports p50/p95/p99 latency, requests per
+# second and errors per scenario and level.
+#
+# For CI-style runs, save results with --json and compare a later run with
+# --baseline: the run fails if throughput drops or p99 grows by more than
+# --tolerance.
+#
+# Usage:
+#   python -m benchmarks.load_suite --levels 1,8,32,64 --llm-latency 0.5 --search-latency 1.0
+#   python -m benchmarks.load_suite --json new.json --baseline old.json --tolerance 0.25
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+
+from benchmarks.fake_upstreams import FakeUpstreamConfig, start_in_process
+
+SCENARIOS = ("profile_submit", "profile_get", "chat", "chat_stream")
+QUESTIONS = (
+    "What are the tuition fees for a masters in Germany in 2025?",
+    "Which universities in Canada are good for computer science?",
+    "How do I improve my SOP?",
+    "What is the current student visa process for Australia?",
+)
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def profile_form(n: int) -> dict:
+    return {
+        "full_name_raw": f"bench student {n}",
+        "email": f"bench{n}@example.com",
+        "preferred_countries": "Germany,Canada",
+        "budget_min_bdt": "800000",
+        "budget_max_bdt": "2500000",
+        "education_json": json.dumps([{"level": "Bachelor", "field": "Computer Science", "gpa": 3.6}]),
+    }
+
+
+class Scenarios:
+    """One request per scenario; each returns True on success"""
+
+    def __init__(self, client, user_ids: list):
+        self.client = client
+        self.user_ids = user_ids
+        self._counter = itertools.count()
+
+    def _question(self) -> tuple:
+        n = next(self._counter)
+        return self.user_ids[n % len(self.user_ids)], f"{QUESTIONS[n % len(QUESTIONS)]} (request {n})"
+
+    async def profile_submit(self) -> bool:
+        response = await self.client.post("/profile/submit", data=profile_form(next(self._counter)))
+        return response.status_code == 201
+
+    async def profile_get(self) -> bool:
+        user_id = self.user_ids[next(self._counter) % len(self.user_ids)]
+        response = await self.client.get(f"/profile/get/{user_id}")
+        return response.status_code == 200
+
+    async def chat(self) -> bool:
+        user_id, question = self._question()
+        response = await self.client.post("/chat/ask", json={"user_id": user_id, "question": question})
+        return response.status_code == 200 and not response.json()["response"].startswith("Error")
+
+    async def chat_stream(self) -> bool:
+        user_id, question = self._question()
+        ok = False
+        async with self.client.stream("POST", "/chat/ask/stream", json={"user_id": user_id, "question": question}) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    ok = line == "event: done"
+        return response.status_code == 200 and ok
+
+
+async def run_level(run, concurrency: int, requests: int) -> dict:
+    """Fire `requests` calls with at most `concurrency` in flight"""
+    latencies = []
+    errors = 0
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in queue:
+            started = time.perf_counter()
+            try:
+                ok = await run()
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "rps": round(requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "errors": errors,
+    }
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Regressions of throughput or p99 latency beyond the tolerance"""
+    previous = {(row["scenario"], row["concurrency"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        old = previous.get((row["scenario"], row["concurrency"]))
+        if old is None:
+            continue
+        if row["rps"] < old["rps"] * (1 - tolerance):
+            regressions.append(f"{row['scenario']} @ {row['concurrency']}: {old['rps']} -> {row['rps']} req/s")
+        if row["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{row['scenario']} @ {row['concurrency']}: p99 {old['p99_ms']} -> {row['p99_ms']} ms")
+    return regressions
+
+
+async def run_suite(args) -> list:
+    # Imported after the environment points the settings at the fake upstreams
+    import httpx
+    from benchmarks.load_chat import build_app
+    from core.clients import upstream
+
+    transport = httpx.ASGITransport(app=build_app())
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        seeded = [
+            (await client.post("/profile/submit", data=profile_form(-n))).json()["user_id"]
+            for n in range(1, args.profiles + 1)
+        ]
+        scenarios = Scenarios(client, seeded)
+
+        print(f"{'scenario':<16}{'conc':>6}{'reqs':>7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name in args.scenarios.split(","):
+            for level in [int(x) for x in args.levels.split(",")]:
+                row = {"scenario": name, **await run_level(getattr(scenarios, name), level, level * args.rounds)}
+                results.append(row)
+                print(f"{name:<16}{level:>6}{row['requests']:>7}{row['rps']:>10.2f}{row['p50_ms']:>10.1f}"
+                      f"{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['errors']:>8}")
+    await upstream.aclose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load suite against fake upstreams")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated: " + ", ".join(SCENARIOS))
+    parser.add_argument("--levels", default="1,8,32,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=4, help="Requests per level = level * rounds")
+    parser.add_argument("--profiles", type=int, default=50, help="Profiles created before the run")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results file from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    FakeUpstreamConfig.add_arguments(parser)
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    process, base_url = start_in_process(FakeUpstreamConfig.from_args(args))
+    os.environ.update({
+        "LLM_BASE_URL": base_url,
+        "TAVILY_BASE_URL": base_url,
+        "TAVILY_API_KEY": "bench",
+        "GITHUB_TOKEN": "bench",
+        "DATABASE_URL": "memory://",
+        "SEARCH_INDEX_PATH": "",
+        "USER_RATE_PER_MINUTE": "0",
+    })
+    try:
+        results = asyncio.run(run_suite(args))
+    finally:
+        process.terminate()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
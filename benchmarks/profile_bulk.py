@@ -0,0 +1,153 @@
+# Benchmark - bulk NDJSON profile import vs. replaying /profile/submit
+#
+# Generates synthetic partner-agency records (a share of them invalid) and
+# imports them through POST /profile/bulk into a temporary SQLite store,
+# then replays a sample through multipart POST /profile/submit for
+# comparison. The bulk body is fed to the ASGI app chunk by chunk and the
+# response lines are counted and dropped, so the traced peak memory is the
+# server side's; it should stay flat as the upload grows.
+#
+# Usage:
+#   python -m benchmarks.profile_bulk --sizes 10000,100000 --replay 2000
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+
+COUNTRIES = ("Germany", "canada", "Australia", "United Kingdom", "Malaysia", "Sweden", "Finland", "Italy")
+FIELDS = ("Computer Science", "Business", "Civil Engineering", "Public Health", "Economics")
+
+
+def make_record(rng: random.Random, n: int, invalid_share: float) -> dict:
+    record = {
+        "full_name_raw": f"md bench student {n}",
+        "email": f"Bench{n}@Example.com",
+        "phone_country_code": "+880",
+        "phone_number": f"17{n:08d}",
+        "preferred_countries": ",".join(rng.sample(COUNTRIES, 2)),
+        "budget_min_bdt": 500000,
+        "budget_max_bdt": rng.choice((1500000, 2500000, 4000000)),
+        "education": [{"level": "Bachelor", "field": rng.choice(FIELDS), "gpa": round(rng.uniform(2.5, 4.0), 2)}],
+        "preferred_intake": "Fall 2026",
+    }
+    if rng.random() < invalid_share:
+        record[rng.choice(("preferred_countries", "phone_country_code", "budget_max_bdt"))] = "Atlantis"
+    return record
+
+
+async def body_chunks(count: int, invalid_share: float, chunk_bytes: int = 64 * 1024):
+    """NDJSON body generated on the fly, in `chunk_bytes` pieces"""
+    rng = random.Random(count)
+    pending = []
+    size = 0
+    for n in range(count):
+        line = (json.dumps(make_record(rng, n, invalid_share)) + "\n").encode()
+        pending.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield b"".join(pending)
+            pending, size = [], 0
+    if pending:
+        yield b"".join(pending)
+
+
+async def bulk_import(app, count: int, invalid_share: float) -> dict:
+    """POST /profile/bulk straight through the ASGI app; returns counts and timings"""
+    chunks = body_chunks(count, invalid_share).__aiter__()
+    stats = {"lines": 0, "first_result_seconds": None}
+    started = time.perf_counter()
+    partial = b""
+
+    async def receive():
+        try:
+            return {"type": "http.request", "body": await chunks.__anext__(), "more_body": True}
+        except StopAsyncIteration:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal partial
+        if message["type"] == "http.response.start":
+            stats["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if stats["first_result_seconds"] is None:
+                stats["first_result_seconds"] = time.perf_counter() - started
+            *lines, partial = (partial + message["body"]).split(b"\n")
+            stats["lines"] += len(lines)
+            if lines and lines[-1].startswith(b'{"done"'):
+                stats.update(json.loads(lines[-1]))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/profile/bulk", "raw_path": b"/profile/bulk", "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench"), (b"content-type", b"application/x-ndjson")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+async def replay_submit(app, count: int, invalid_share: float) -> float:
+    """Seconds to replay `count` records one multipart /profile/submit call at a time"""
+    import httpx
+
+    rng = random.Random(-count)
+    forms = []
+    for n in range(count):
+        record = make_record(rng, n, invalid_share)
+        record["education_json"] = json.dumps(record.pop("education"))
+        forms.append({key: str(value) for key, value in record.items()})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for form in forms:
+            await client.post("/profile/submit", data=form)
+        return time.perf_counter() - started
+
+
+async def run(args):
+    from benchmarks.load_chat import build_app
+
+    app = build_app()
+    print(f"{'import':<24}{'records':>9}{'seconds':>10}{'records/s':>12}{'first line ms':>15}{'peak MiB':>10}{'failed':>8}")
+    for size in [int(x) for x in args.sizes.split(",")]:
+        stats = await bulk_import(app, size, args.invalid_share)
+        tracemalloc.start()
+        traced = await bulk_import(app, min(size, args.trace_size), args.invalid_share)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        assert stats["status"] == 200 and stats["imported"] + stats["failed"] == size, stats
+        print(f"{'POST /profile/bulk':<24}{size:>9,}{stats['seconds']:>10.2f}{size / stats['seconds']:>12,.0f}"
+              f"{stats['first_result_seconds'] * 1000:>15.1f}{peak:>10.1f}{stats['failed']:>8,}"
+              + (f"   (peak traced over {traced['lines'] - 1:,} lines)" if size > args.trace_size else ""))
+
+    if args.replay:
+        seconds = await replay_submit(app, args.replay, args.invalid_share)
+        print(f"{'POST /profile/submit':<24}{args.replay:>9,}{seconds:>10.2f}{args.replay / seconds:>12,.0f}{'-':>15}{'-':>10}{'-':>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk profile import benchmark")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated record counts")
+    parser.add_argument("--replay", type=int, default=2000, help="Records replayed through /profile/submit (0 skips)")
+    parser.add_argument("--invalid-share", type=float, default=0.02, help="Share of records with a bad field")
+    parser.add_argument("--trace-size", type=int, default=100000, help="Largest import run under tracemalloc")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["SEARCH_INDEX_PATH"] = ""
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
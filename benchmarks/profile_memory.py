@@ -0,0 +1,143 @@
+# Benchmark - memory per profile in the in-process store, dict vs. compact records
+#
+# Fills a plain {user_id: profile dict} map (the layout before compact
+# records) and a MemoryProfileStore with the same synthetic profiles, each
+# in a fresh process, and reports the resident memory growth per profile
+# plus the cost of building and storing a profile and of rebuilding a
+# profile dict on get. Profiles are
+# built the way the form produces them: every country, currency and intake
+# string is a separate object, and a share of profiles carries a
+# multi-page resume text.
+#
+# Usage:
+#   python -m benchmarks.profile_memory --profiles 1000000 --resume-share 0.2
+#
+# At 1M profiles the dict layout needs about 3.5 GB of RAM.
+
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from core.storage import MemoryProfileStore
+
+COUNTRIES = ("germany", "canada", "australia", "united kingdom", "malaysia", "sweden", "finland", "italy")
+FIELDS = ("Computer Science", "Business", "Civil Engineering", "Public Health", "Economics")
+INTAKES = ("Fall 2026", "Spring 2027", "Fall 2027")
+RESUME_LINES = (
+    "Bachelor of Science in Computer Science, CGPA 3.65, 2020 - 2024",
+    "Research assistant: built a data pipeline for air-quality sensors",
+    "IELTS 7.5 (L 8.0, R 7.5, W 7.0, S 7.0)",
+    "Led a team of four on a mobile health app used by 2,000 students",
+    "Volunteer: taught programming to high school students for two years",
+)
+
+
+def make_profile(rng: random.Random, n: int, resume_share: float, resume_chars: int) -> dict:
+    resume_text = None
+    if rng.random() < resume_share:
+        lines = []
+        while sum(len(line) + 1 for line in lines) < resume_chars:
+            lines.append(f"{rng.choice(RESUME_LINES)} [{len(lines)}]")
+        resume_text = "\n".join(lines)
+    return {
+        "full_name": f"Md. Bench Student {n}",
+        "father_name": f"Mr. Bench Father {n}",
+        "mother_name": f"Mrs. Bench Mother {n}",
+        "email": f"bench{n}@example.com",
+        "phone_country_code": "+880"[:],
+        "phone_number": f"17{n:08d}",
+        "full_phone": f"+88017{n:08d}",
+        "nationality": ["bangladesh".title()],
+        "current_living_country": ["bangladesh".title()],
+        "education": [{
+            "level": "hsc".upper(), "institution": "Notre Dame College", "field": "science".title(),
+            "gpa": 5.0, "year_completed": 2020,
+        }, {
+            "level": "bachelor".title(), "institution": f"University {n % 97}", "field": rng.choice(FIELDS).lower().title(),
+            "gpa": round(rng.uniform(2.5, 4.0), 2), "year_completed": 2024,
+        }],
+        "preferred_countries": [country.title() for country in rng.sample(COUNTRIES, 2)],
+        "budget_min_bdt": rng.choice((500000, 800000, 1000000)),
+        "budget_max_bdt": rng.choice((1500000, 2500000, 4000000)),
+        "preferred_currency": "bdt".upper(),
+        "preferred_intake": rng.choice(INTAKES).lower().title(),
+        "resume_filename": "resume.pdf" if resume_text else None,
+        "resume_text": resume_text,
+        "_resume_digest": resume_text[:400] if resume_text else "",
+    }
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux)"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure(layout: str, args) -> dict:
+    """Fill one layout in this process and time gets against it"""
+    rng = random.Random(7)
+    profiles = (make_profile(rng, n, args.resume_share, args.resume_chars) for n in range(args.profiles))
+    gc.collect()
+    before = rss_bytes()
+    started = time.perf_counter()
+    if layout == "dict":
+        kept = {user_id: profile for user_id, profile in enumerate(profiles, 1)}
+        get = kept.__getitem__
+    else:
+        kept = MemoryProfileStore()
+        for profile in profiles:
+            kept.save(profile)
+        get = kept.get
+    fill_seconds = time.perf_counter() - started
+    gc.collect()
+    grown = rss_bytes() - before
+
+    ids = [random.randint(1, args.profiles) for _ in range(args.reads)]
+    started = time.perf_counter()
+    for user_id in ids:
+        get(user_id)
+    return {
+        "bytes": grown,
+        "fill_us": fill_seconds / args.profiles * 1e6,
+        "get_us": (time.perf_counter() - started) / args.reads * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile memory benchmark")
+    parser.add_argument("--profiles", type=int, default=1000000)
+    parser.add_argument("--resume-share", type=float, default=0.2, help="Share of profiles with a resume")
+    parser.add_argument("--resume-chars", type=int, default=6000, help="Resume text length (about 2-3 pages)")
+    parser.add_argument("--reads", type=int, default=100000)
+    parser.add_argument("--layout", choices=("dict", "compact"), help=argparse.SUPPRESS)  # Child process
+    args = parser.parse_args()
+
+    if args.layout:
+        print(json.dumps(measure(args.layout, args)))
+        return
+
+    print(f"{args.profiles:,} profiles, {args.resume_share:.0%} with a {args.resume_chars:,}-char resume")
+    print(f"{'layout':<22}{'total MiB':>11}{'bytes/profile':>15}{'fill us':>10}{'get us':>9}")
+    rows = {}
+    for layout, label in (("dict", "dict (before)"), ("compact", "compact records")):
+        done = subprocess.run(
+            [sys.executable, "-m", "benchmarks.profile_memory", *sys.argv[1:], "--layout", layout],
+            capture_output=True, text=True, check=True,
+        )
+        row = rows[layout] = json.loads(done.stdout.strip().splitlines()[-1])
+        print(f"{label:<22}{row['bytes'] / 2**20:>11.1f}{row['bytes'] / args.profiles:>15,.0f}"
+              f"{row['fill_us']:>10.1f}{row['get_us']:>9.2f}")
+    print(f"compact records use {rows['compact']['bytes'] / rows['dict']['bytes']:.0%} of the dict layout")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Benchmark - profile store read/write latency
+#
+# Compares the process-local dict store with the SQLite store (raw and
+# behind the UserProfileCache read-through layer) at several sizes.
+#
+# Usage:
+#   python -m benchmarks.profile_store --sizes 10000,1000000
+#
+# Filling 1M SQLite rows one autocommit insert at a time takes a few
+# minutes; that is the write latency being measured.
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from core.cache import UserProfileCache
+from core.storage import MemoryProfileStore, SQLiteProfileStore
+
+PROFILE = {
+    "full_name": "Bench Student",
+    "email": "bench@example.com",
+    "nationality": ["Bangladesh"],
+    "current_living_country": ["Bangladesh"],
+    "education": [{"level": "HSC", "institution": "Notre Dame College", "field": "Science", "gpa": 5.0, "year_completed": 2024}],
+    "preferred_countries": ["Germany", "Canada"],
+    "budget_min_bdt": 500000,
+    "budget_max_bdt": 2500000,
+    "preferred_currency": "BDT",
+    "preferred_intake": "Fall 2026",
+    "resume_text": "Experienced student " * 50,
+}
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def summarize(label: str, samples):
+    us = [s * 1e6 for s in samples]
+    print(f"  {label:<28} p50 {percentile(us, 0.50):>8.1f} us   p99 {percentile(us, 0.99):>8.1f} us   mean {statistics.fmean(us):>8.1f} us")
+
+
+def bench(name: str, save, get, size: int, reads: int):
+    print(f"{name} @ {size:,} profiles")
+    writes = []
+    for _ in range(size):
+        started = time.perf_counter()
+        save(PROFILE)
+        writes.append(time.perf_counter() - started)
+    summarize("write", writes)
+
+    ids = [random.randint(1, size) for _ in range(reads)]
+    read_samples = []
+    for user_id in ids:
+        started = time.perf_counter()
+        get(user_id)
+        read_samples.append(time.perf_counter() - started)
+    summarize("read (uniform random)", read_samples)
+
+    hot = [random.randint(1, min(size, 500)) for _ in range(reads)]
+    read_samples = []
+    for user_id in hot:
+        started = time.perf_counter()
+        get(user_id)
+        read_samples.append(time.perf_counter() - started)
+    summarize("read (hot 500 ids)", read_samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile store benchmark")
+    parser.add_argument("--sizes", default="10000,1000000", help="Comma-separated profile counts")
+    parser.add_argument("--reads", type=int, default=20000, help="Read samples per run")
+    args = parser.parse_args()
+
+    for size in [int(x) for x in args.sizes.split(",")]:
+        memory = MemoryProfileStore()
+        bench("dict store", memory.save, memory.get, size, args.reads)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteProfileStore(os.path.join(tmp, "bench.db"))
+            bench("sqlite store", store.save, store.get, size, args.reads)
+            store.close()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cached = UserProfileCache(SQLiteProfileStore(os.path.join(tmp, "bench.db")))
+            bench("sqlite + read-through", cached.save_profile, cached.get_profile, size, args.reads)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Benchmark - profile store throughput with several worker processes on one host
+#
+# Every process opens the same SQLite file through its own UserProfileCache,
+# as uvicorn --workers N does, and runs a mix of submits and reads of
+# profiles created by any process. Reports aggregate operations per second
+# per process count and checks what matters across workers:
+#   - user_ids handed out by different processes never collide
+#   - a profile saved by one process is readable from every other
+#   - an update in one process is seen by the others' read caches
+#
+# Usage:
+#   python -m benchmarks.profile_workers --processes 1,2,4,8 --ops 20000 --write-share 0.1
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from core.cache import UserProfileCache
+from core.storage import SQLiteProfileStore
+
+PROFILE = {
+    "full_name": "Bench Student",
+    "email": "bench@example.com",
+    "nationality": ["Bangladesh"],
+    "preferred_countries": ["Germany", "Canada"],
+    "budget_max_bdt": 2500000,
+    "_resume_digest": "",
+}
+
+
+def worker(path: str, seeded: int, ops: int, write_share: float, seed: int, start, results):
+    cache = UserProfileCache(SQLiteProfileStore(path))
+    rng = random.Random(seed)
+    saved = []
+    start.wait()
+    started = time.perf_counter()
+    for _ in range(ops):
+        if rng.random() < write_share:
+            saved.append(cache.save_profile({**PROFILE, "email": f"worker{seed}-{len(saved)}@example.com"}))
+        elif cache.get_profile(rng.randint(1, seeded)) is None:
+            raise RuntimeError("seeded profile missing")
+    results.put((time.perf_counter() - started, saved))
+
+
+def run_level(path: str, processes: int, args) -> dict:
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(processes)
+    results = context.Queue()
+    children = [
+        context.Process(target=worker, args=(path, args.seed_profiles, args.ops, args.write_share, n, start, results))
+        for n in range(processes)
+    ]
+    for child in children:
+        child.start()
+    outcomes = [results.get() for _ in children]
+    for child in children:
+        child.join()
+    ids = [user_id for _, saved in outcomes for user_id in saved]
+    slowest = max(seconds for seconds, _ in outcomes)
+    return {"ops_per_second": processes * args.ops / slowest, "saved": len(ids), "duplicate_ids": len(ids) - len(set(ids)), "ids": ids}
+
+
+def check_coherence(path: str, ids: list) -> list:
+    """Cross-process visibility and cache invalidation, checked from a fresh process"""
+    problems = []
+    reader = UserProfileCache(SQLiteProfileStore(path))
+    writer = UserProfileCache(SQLiteProfileStore(path))  # Separate store and cache, as in another worker
+    missing = [user_id for user_id in ids if reader.get_profile(user_id) is None]
+    if missing:
+        problems.append(f"{len(missing)} profiles saved by workers are not readable")
+    user_id = ids[0] if ids else 1
+    reader.get_profile(user_id)  # Now cached by the reader
+    new_name = f"Updated Elsewhere {time.time()}"
+    writer.update_profile(user_id, {**PROFILE, "full_name": new_name})
+    if reader.get_profile(user_id)["full_name"] != new_name:
+        problems.append("reader served a stale cached profile after another process updated it")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process profile store benchmark")
+    parser.add_argument("--processes", default="1,2,4,8", help="Comma-separated process counts")
+    parser.add_argument("--ops", type=int, default=20000, help="Operations per process")
+    parser.add_argument("--write-share", type=float, default=0.1, help="Share of operations that submit a profile")
+    parser.add_argument("--seed-profiles", type=int, default=10000, help="Profiles created before the run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        store = SQLiteProfileStore(path)
+        store.save_many([{**PROFILE, "email": f"seed{n}@example.com"} for n in range(args.seed_profiles)])
+        store.close()
+
+        print(f"{'processes':>10}{'ops/s':>12}{'submits':>10}{'duplicate ids':>15}")
+        all_ids = []
+        for processes in [int(x) for x in args.processes.split(",")]:
+            row = run_level(path, processes, args)
+            all_ids += row["ids"]
+            print(f"{processes:>10}{row['ops_per_second']:>12,.0f}{row['saved']:>10,}{row['duplicate_ids']:>15}")
+
+        problems = check_coherence(path, all_ids)
+        if len(all_ids) != len(set(all_ids)):
+            problems.append("user_ids collided across runs")
+        print("cross-process checks: " + ("; ".join(problems) if problems else "ids unique, saves visible, updates invalidate caches"))
+
+
+if __name__ == "__main__":
+    main()
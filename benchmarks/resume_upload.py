@@ -0,0 +1,111 @@
+# Benchmark - /profile/submit latency with multi-page resume uploads
+#
+# Generates a text PDF locally and submits it at increasing concurrency,
+# while probing /health to check the event loop stays responsive. PDF
+# extraction runs in worker processes, so /health latency should stay
+# flat and submit latency should grow only once the workers are saturated.
+#
+# Usage:
+#   python -m benchmarks.resume_upload --pages 10 --levels 1,4,16
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+import fitz  # PyMuPDF
+import httpx
+from fastapi import FastAPI
+
+from api.v1.api import router as api_v1_router
+from services.resume_service import shutdown_resume_workers
+
+LINE = "Built a distributed data pipeline and led a team of four on a research project. "
+
+
+def make_pdf(pages: int) -> bytes:
+    document = fitz.open()
+    for page_num in range(pages):
+        page = document.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 560, 800), f"Page {page_num + 1}\n" + LINE * 40, fontsize=9)
+    content = document.tobytes()
+    document.close()
+    return content
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_v1_router)
+
+    @app.get("/health")
+    def health_check():
+        return {"status": "healthy"}
+
+    return app
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def submit(client: httpx.AsyncClient, pdf: bytes) -> float:
+    started = time.perf_counter()
+    response = await client.post(
+        "/profile/submit",
+        data={"full_name_raw": "bench student", "email": "bench@example.com", "preferred_countries": "Germany"},
+        files={"resume": ("resume.pdf", pdf, "application/pdf")},
+    )
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/health")
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Resume upload benchmark")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per generated PDF")
+    parser.add_argument("--levels", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--rounds", type=int, default=3, help="Uploads per level = level * rounds")
+    args = parser.parse_args()
+
+    pdf = make_pdf(args.pages)
+    print(f"PDF: {args.pages} pages, {len(pdf) / 1024:.0f} KiB")
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await submit(client, pdf)  # Warm up the worker pool
+        print(f"{'concurrency':>12} {'submit p50':>12} {'submit p95':>12} {'health p95':>12}")
+        for level in [int(x) for x in args.levels.split(",")]:
+            semaphore = asyncio.Semaphore(level)
+
+            async def one():
+                async with semaphore:
+                    return await submit(client, pdf)
+
+            stop = asyncio.Event()
+            health = []
+            prober = asyncio.create_task(probe_health(client, stop, health))
+            latencies = await asyncio.gather(*(one() for _ in range(level * args.rounds)))
+            stop.set()
+            await prober
+            print(
+                f"{level:>12} {percentile(latencies, 0.5) * 1000:>10.1f}ms {percentile(latencies, 0.95) * 1000:>10.1f}ms"
+                f" {percentile(health, 0.95) * 1000:>10.1f}ms"
+            )
+
+    shutdown_resume_workers()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,168 @@
+# Benchmark - search context post-processing: CPU cost, prompt size and grounding
+#
+# Builds Tavily-like result sets for study abroad questions: nine sources
+# per question, one of them the same page again with tracking parameters,
+# one a syndicated copy of another, two about a different topic, and page
+# boilerplate mixed into every snippet. Formats each set the old way
+# (every source, snippets cut at 200 characters) and through
+# process_search_results, and reports per request:
+#   - CPU time (process time, so it is what a worker thread pays)
+#   - search context size in characters and estimated tokens
+#   - on-topic share: fraction of the snippet text that answers the question
+#   - question terms covered by the context
+#
+# Usage:
+#   python -m benchmarks.search_context --requests 2000 --max-chars 1200
+
+import argparse
+import os
+import random
+import re
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+
+from core.search_index import query_terms, stemmed_words
+from services.prompt_service import estimate_tokens
+from services.search_service import format_search_results
+
+COUNTRIES = ("Germany", "Canada", "Australia", "the United Kingdom")
+TOPICS = {
+    "tuition": (
+        "What are the tuition fees for a masters in {country}?",
+        [
+            "Tuition fees for international masters students in {country} range from 500 to 30,000 euros per year.",
+            "Public universities in {country} charge lower tuition fees than private institutions.",
+            "Engineering and business masters programs usually have the highest fees.",
+            "Most universities publish their tuition fees for international students on the program page.",
+            "A semester contribution covers administration and a public transport ticket.",
+        ],
+    ),
+    "scholarships": (
+        "Which scholarships can Bangladeshi students get in {country}?",
+        [
+            "Government scholarships in {country} cover tuition and a monthly stipend for international students.",
+            "Bangladeshi applicants are eligible for most merit scholarships offered by universities in {country}.",
+            "Scholarship deadlines usually fall six to nine months before the intake.",
+            "A strong academic record and a clear statement of purpose improve scholarship chances.",
+        ],
+    ),
+    "visa": (
+        "What documents do I need for a student visa for {country}?",
+        [
+            "A student visa for {country} requires an admission letter, proof of funds and a valid passport.",
+            "Visa processing for {country} takes four to twelve weeks, so apply early.",
+            "Applicants must show health insurance and sometimes a blocked account.",
+            "An interview at the embassy may be part of the student visa process.",
+        ],
+    ),
+    "work": (
+        "Can international students work part-time in {country}?",
+        [
+            "International students in {country} may work part-time for up to 20 hours per week during term.",
+            "Full-time work is allowed during semester breaks.",
+            "Typical part-time jobs pay between 12 and 15 per hour.",
+            "After graduation, a post-study work permit lets graduates stay and look for jobs.",
+        ],
+    ),
+}
+BOILERPLATE = (
+    "Subscribe to our newsletter for the latest updates.",
+    "This article was last updated by our editorial team.",
+    "Accept cookies to continue browsing this site.",
+    "Share this page with your friends on social media.",
+    "Related articles you may also like are listed below.",
+)
+
+
+def snippet(rng: random.Random, topic: str, country: str) -> str:
+    sentences = [s.format(country=country) for s in rng.sample(TOPICS[topic][1], 3)]
+    for _ in range(2):
+        sentences.insert(rng.randint(0, len(sentences)), rng.choice(BOILERPLATE))
+    return " ".join(sentences)
+
+
+def make_request(rng: random.Random, n: int):
+    """(question, countries, search_data, on-topic sentences)"""
+    topic = rng.choice(sorted(TOPICS))
+    country = rng.choice(COUNTRIES)
+    question = TOPICS[topic][0].format(country=country)
+    other = rng.choice([t for t in TOPICS if t != topic])
+    sources = []
+    for i in range(5):
+        sources.append({"title": f"{topic.title()} guide {i} for {country}", "url": f"https://www.site{i}.com/{topic}/{n}",
+                        "snippet": snippet(rng, topic, country)})
+    sources.insert(2, {**sources[0], "url": sources[0]["url"] + "?utm_source=newsletter"})
+    sources.insert(4, {**sources[1], "url": f"https://mirror.example.org/{topic}/{n}", "title": sources[1]["title"] + " (reposted)"})
+    for i in range(2):
+        sources.append({"title": f"{other.title()} in {country}", "url": f"https://other{i}.com/{other}/{n}",
+                        "snippet": snippet(rng, other, country)})
+    on_topic = {s.format(country=country) for s in TOPICS[topic][1]}
+    return question, [country], {"answer": "", "sources": sources}, on_topic
+
+
+def on_topic_share(context: str, on_topic: set) -> float:
+    """Characters of snippet text taken from on-topic sentences (whole or cut) over all snippet characters"""
+    useful = total = 0
+    for line in context.splitlines():
+        if not line.startswith("   ") or line.startswith("   URL: "):
+            continue
+        for fragment in re.split(r"(?<=\.) ", line.strip().rstrip(".").rstrip()):
+            fragment = fragment.rstrip(".")
+            total += len(fragment)
+            if any(fragment in sentence for sentence in on_topic):
+                useful += len(fragment)
+    return useful / total if total else 0.0
+
+
+def coverage(context: str, question: str) -> float:
+    terms = set(stemmed_words(" ".join(query_terms(question))))
+    found = terms & set(stemmed_words(context))
+    return len(found) / len(terms) if terms else 1.0
+
+
+def run(label: str, requests: list, process: bool) -> dict:
+    contexts = []
+    started = time.process_time()
+    for question, countries, search_data, _ in requests:
+        if process:
+            contexts.append(format_search_results(search_data, question, countries))
+        else:
+            contexts.append(format_search_results(search_data))
+    cpu = (time.process_time() - started) / len(requests)
+    n = len(requests)
+    return {
+        "label": label,
+        "cpu_us": cpu * 1e6,
+        "chars": sum(len(c) for c in contexts) / n,
+        "tokens": sum(estimate_tokens(c) for c in contexts) / n,
+        "on_topic": sum(on_topic_share(c, r[3]) for c, r in zip(contexts, requests)) / n,
+        "coverage": sum(coverage(c, r[0]) for c, r in zip(contexts, requests)) / n,
+        "sources": sum(c.count("   URL: ") for c in contexts) / n,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search context post-processing benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--max-chars", type=int, default=None, help="Override SEARCH_CONTEXT_MAX_CHARS")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.max_chars:
+        from core.config import settings
+        settings.search_context_max_chars = args.max_chars
+
+    rng = random.Random(args.seed)
+    requests = [make_request(rng, n) for n in range(args.requests)]
+    print(f"{args.requests} requests, 9 sources each (1 tracking-URL duplicate, 1 syndicated copy, 2 off-topic)")
+    print(f"{'context':<22}{'cpu us':>9}{'chars':>8}{'tokens':>8}{'sources':>9}{'on-topic':>10}{'coverage':>10}")
+    for label, process in (("all sources, cut 200", False), ("ranked + extracted", True)):
+        row = run(label, requests, process)
+        print(f"{row['label']:<22}{row['cpu_us']:>9.0f}{row['chars']:>8.0f}{row['tokens']:>8.0f}{row['sources']:>9.1f}"
+              f"{row['on_topic']:>10.0%}{row['coverage']:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Benchmark - local BM25 source index query latency
+#
+# Builds an on-disk index of synthetic sources (Zipf-distributed vocabulary
+# plus study-abroad terms) and measures query latency, including the
+# freshness re-ranking and coverage computation done in Python.
+#
+# Usage:
+#   python -m benchmarks.search_index --sizes 100000,1000000
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+
+from core.search_index import SourceIndex
+
+DOMAIN = (
+    "germany canada australia malaysia sweden finland netherlands france italy poland turkey "
+    "university universities scholarship scholarships visa tuition fees cost living ielts toefl "
+    "masters bachelor phd computer science engineering business admission deadline intake "
+    "part-time work permit blocked account daad erasmus stipend accommodation"
+).split()
+random.Random(7).shuffle(DOMAIN)  # Which topics are common is arbitrary
+FILLER = [f"w{i}" for i in range(20000)]
+QUERIES = [
+    "tuition fees Germany computer science",
+    "scholarships Canada masters",
+    "student visa Australia part-time work",
+    "cost of living Sweden accommodation",
+    "IELTS requirement Netherlands bachelor admission deadline",
+    "DAAD scholarship stipend phd",
+]
+
+
+def zipf(rng: random.Random, vocabulary: list) -> str:
+    return vocabulary[min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1)]
+
+
+def make_doc(rng: random.Random, i: int, now: float) -> dict:
+    words = [zipf(rng, DOMAIN) for _ in range(8)] + [zipf(rng, FILLER) for _ in range(60)]
+    rng.shuffle(words)
+    return {
+        "url": f"https://example.com/source/{i}",
+        "title": " ".join(zipf(rng, DOMAIN) for _ in range(5)),
+        "content": " ".join(words),
+        "fetched_at": now - rng.uniform(0, 90 * 86400),
+    }
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Source index benchmark")
+    parser.add_argument("--sizes", default="100000,1000000", help="Comma-separated document counts")
+    parser.add_argument("--queries", type=int, default=300, help="Queries per size")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for size in [int(x) for x in args.sizes.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.db")
+            index = SourceIndex(path)
+            now = time.time()
+            started = time.perf_counter()
+            batch = 10000
+            for offset in range(0, size, batch):
+                index.add_many(make_doc(rng, i, now) for i in range(offset, min(size, offset + batch)))
+            index.optimize()
+            build = time.perf_counter() - started
+
+            latencies = []
+            for n in range(args.queries):
+                query = QUERIES[n % len(QUERIES)]
+                started = time.perf_counter()
+                index.search(query, limit=5, min_coverage=0.6)
+                latencies.append(time.perf_counter() - started)
+
+            insert_started = time.perf_counter()
+            index.add("https://example.com/new", "Germany visa update", "New blocked account amount for Germany visa")
+            insert = time.perf_counter() - insert_started
+            index.close()
+
+            size_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 1e6
+            print(f"{size:,} documents ({size_mb:.0f} MB, built in {build:.1f}s)")
+            print(f"  query  p50 {percentile(latencies, 0.5) * 1000:.2f} ms   p95 {percentile(latencies, 0.95) * 1000:.2f} ms   p99 {percentile(latencies, 0.99) * 1000:.2f} ms")
+            print(f"  single incremental insert {insert * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
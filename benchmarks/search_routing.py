@@ -0,0 +1,81 @@
+# Benchmark - offline evaluation of the search router
+#
+# Routes every question in a labelled JSONL file ({"question", "route"},
+# where route is the cheapest search that still gives a relevant answer)
+# and reports accuracy, a confusion matrix and the search latency saved
+# against always running an advanced search. Under-routing (less search
+# than the label) is what can hurt answer relevance, so --max-under fails
+# the run when it exceeds the given rate.
+#
+# Usage:
+#   python -m benchmarks.search_routing --file benchmarks/data/search_routes.jsonl --max-under 0.05
+
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+
+from services.routing_service import ROUTES, route_question
+
+DEFAULT_FILE = os.path.join(os.path.dirname(__file__), "data", "search_routes.jsonl")
+
+
+def load(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search router evaluation")
+    parser.add_argument("--file", default=DEFAULT_FILE, help="Labelled questions (JSONL)")
+    parser.add_argument("--basic-ms", type=float, default=1200, help="Typical basic search latency")
+    parser.add_argument("--advanced-ms", type=float, default=3500, help="Typical advanced search latency")
+    parser.add_argument("--max-under", type=float, default=None, help="Fail if the under-routing rate exceeds this")
+    parser.add_argument("--verbose", action="store_true", help="Print every misrouted question")
+    args = parser.parse_args()
+
+    examples = load(args.file)
+    cost = {"none": 0.0, "basic": args.basic_ms, "advanced": args.advanced_ms}
+    confusion = {label: {route: 0 for route in ROUTES} for label in ROUTES}
+    under = over = 0
+    routed_ms = 0.0
+
+    started = time.perf_counter()
+    decisions = [route_question(example["question"]) for example in examples]
+    route_us = (time.perf_counter() - started) / max(1, len(examples)) * 1e6
+
+    for example, decision in zip(examples, decisions):
+        label, route = example["route"], decision["route"]
+        confusion[label][route] += 1
+        routed_ms += cost[route]
+        if ROUTES.index(route) < ROUTES.index(label):
+            under += 1
+        elif ROUTES.index(route) > ROUTES.index(label):
+            over += 1
+        if args.verbose and route != label:
+            print(f"  {label:>8} -> {route:<8} score {decision['score']:>5}  {example['question']}")
+
+    total = len(examples)
+    correct = sum(confusion[route][route] for route in ROUTES)
+    baseline_ms = total * cost["advanced"]
+    print(f"{total} questions, routing {route_us:.1f} us/question")
+    print(f"  accuracy      {correct / total:.1%}")
+    print(f"  under-routed  {under / total:.1%}  (less search than needed)")
+    print(f"  over-routed   {over / total:.1%}  (more search than needed)")
+    print(f"  search time   {routed_ms / total:.0f} ms/question vs {baseline_ms / total:.0f} ms always-advanced "
+          f"({1 - routed_ms / baseline_ms:.0%} saved)")
+    print("  label \\ route " + "".join(f"{route:>10}" for route in ROUTES))
+    for label in ROUTES:
+        print(f"  {label:<14}" + "".join(f"{confusion[label][route]:>10}" for route in ROUTES))
+
+    if args.max_under is not None and under / total > args.max_under:
+        print(f"FAIL: under-routing {under / total:.1%} exceeds {args.max_under:.1%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
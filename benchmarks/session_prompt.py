@@ -0,0 +1,84 @@
+# Benchmark - prompt tokens and latency across a long chat session
+#
+# Runs a 50-turn conversation through chat_with_multi_agent with a session
+# and reports prompt size and latency at selected turns, next to the size a
+# naive "append every turn" history would reach. Uses the prefill-cost fake
+# LLM from benchmarks.prompt_size.
+#
+# Usage:
+#   python -m benchmarks.session_prompt --turns 50
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+os.environ.setdefault("GITHUB_TOKEN", "bench")
+os.environ.setdefault("DATABASE_URL", "memory://")
+
+from benchmarks.prompt_size import PrefillLLM, fake_search_web, make_resume
+from core.clients import upstream
+from schemas.profile import UserInfoCreate
+from services import chat_service
+from services.profile_service import save_user_profile
+from services.prompt_service import estimate_tokens
+from services.session_service import create_session
+
+ANSWER = "Here is a structured plan covering universities, costs, scholarships and next steps. " * 12
+
+
+class LongAnswerLLM(PrefillLLM):
+    """Prefill-cost fake LLM that returns a realistically long answer"""
+
+    async def ainvoke(self, messages, **kwargs):
+        response = await super().ainvoke(messages, **kwargs)
+        response.content = ANSWER
+        return response
+
+
+async def run(turns: int, report: set, llm: PrefillLLM):
+    user_id = save_user_profile(UserInfoCreate(
+        full_name="Bench Student",
+        email="bench@example.com",
+        preferred_countries=["Germany", "Canada"],
+        resume_text=make_resume(2),
+    ))
+    session = create_session(user_id)
+    naive_history = 0
+
+    print(f"{'turn':>6} {'prompt tok':>11} {'naive tok':>10} {'latency ms':>11}")
+    for turn in range(1, turns + 1):
+        question = f"Follow-up question {turn}: what about scholarships and part-time work?"
+        started = time.perf_counter()
+        context = await chat_service.prepare_chat_context(user_id, question, session=session)
+        await chat_service.chat_with_multi_agent(user_id, question, session=session)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0)  # Let background summarization run
+
+        prompt_tokens = estimate_tokens(context["user_prompt"] + context["system_prompt"])
+        if turn == 1:
+            base_tokens = prompt_tokens
+        if turn in report:
+            print(f"{turn:>6} {prompt_tokens:>11} {base_tokens + naive_history:>10} {elapsed * 1000:>11.0f}")
+        naive_history += estimate_tokens(f"Student: {question}\nAdvisor: {ANSWER}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session prompt size benchmark")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=40.0, help="Fake prefill cost")
+    parser.add_argument("--base-ms", type=float, default=50.0, help="Fake fixed LLM latency")
+    args = parser.parse_args()
+
+    llm = LongAnswerLLM(args.base_ms / 1000, args.ms_per_1k_tokens / 1000)
+    chat_service.search_web = fake_search_web
+    upstream.start()
+    upstream.llm = llm
+
+    report = {1, 2, 5, 10, 25, args.turns}
+    asyncio.run(run(args.turns, report, llm))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# Admission control - bounded concurrency for upstream calls and per-user rate limits
+# When upstreams are saturated, callers wait in a short bounded queue or are
+# turned away immediately with a retry hint, instead of piling up behind
+# quota errors.
+
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Hashable
+from threading import Lock
+import asyncio
+import math
+import time
+from core.config import settings
+from core.metrics import counter, gauge, histogram
+
+
+class Overloaded(Exception):
+    """Upstream capacity is exhausted; retry after `retry_after` seconds"""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimited(Overloaded):
+    """The caller exceeded its own request rate"""
+
+    status_code = 429
+
+
+class AdmissionLimiter:
+    """
+    At most `max_concurrency` holders at a time, with a FIFO wait queue
+
+    - A free slot is taken immediately.
+    - Otherwise the caller queues, unless `max_queue` callers already wait,
+      in which case Overloaded is raised right away.
+    - A queued caller that is not admitted within `max_wait` seconds gets
+      Overloaded too.
+    - Released slots are handed straight to the oldest waiter.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_hold = 1.0  # Moving average of seconds a slot is held, for Retry-After
+
+    def queue_depth(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def retry_after(self) -> float:
+        """Rough time until a new caller would be admitted"""
+        return self._avg_hold * (self.queue_depth() + 1) / self.max_concurrency
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTIONS.inc(limiter=self.name, reason=reason)
+        raise Overloaded(f"{self.name} capacity exhausted ({reason.replace('_', ' ')})", self.retry_after())
+
+    async def _acquire(self):
+        if self.try_acquire():
+            return
+        if self.queue_depth() >= self.max_queue:
+            self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # Admitted just as we gave up: pass the slot on
+            else:
+                waiter.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("wait_timeout")
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started, limiter=self.name)
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without queueing (pair with release()); False if none is free"""
+        if self.in_flight < self.max_concurrency and not self.queue_depth():
+            self.in_flight += 1
+            return True
+        return False
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # The slot moves to the waiter; in_flight is unchanged
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one slot for the duration of the block (raises Overloaded)"""
+        await self._acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_hold = 0.9 * self._avg_hold + 0.1 * (time.monotonic() - started)
+            self.release()
+
+
+class UserRateLimiter:
+    """Token bucket per key: `rate_per_minute` sustained, `burst` at once (LRU-bounded key count)"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, list]" = OrderedDict()  # key -> [tokens, updated_at]
+        self._lock = Lock()
+
+    def check(self, key: Hashable):
+        """Take one token for `key`, or raise RateLimited with the time until the next one"""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return
+            wait = (1 - bucket[0]) / self.rate
+        RATE_LIMIT_REJECTIONS.inc()
+        raise RateLimited("Too many questions; please slow down", wait)
+
+
+ADMISSION_REJECTIONS = counter("admission_rejections_total", "Upstream calls turned away", ["limiter", "reason"])
+ADMISSION_WAIT_SECONDS = histogram("admission_wait_seconds", "Time spent queued for an upstream slot", ["limiter"])
+RATE_LIMIT_REJECTIONS = counter("user_rate_limit_rejections_total", "Chat requests rejected by the per-user rate limit")
+
+# Singleton instances
+llm_limiter = AdmissionLimiter(
+    "llm", settings.llm_max_concurrency, settings.llm_max_queue, settings.admission_max_wait_seconds
+)
+search_limiter = AdmissionLimiter(
+    "search", settings.search_max_concurrency, settings.search_max_queue, settings.admission_max_wait_seconds
+)
+user_rate_limiter = UserRateLimiter(
+    settings.user_rate_per_minute, settings.user_rate_burst, settings.user_rate_max_users
+)
+
+gauge(
+    "admission_in_flight", "Upstream calls holding a slot", ["limiter"],
+    function=lambda: {(limiter.name,): limiter.in_flight for limiter in (llm_limiter, search_limiter)},
+)
+gauge(
+    "admission_queue_depth", "Callers waiting for an upstream slot", ["limiter"],
+    function=lambda: {(limiter.name,): limiter.queue_depth() for limiter in (llm_limiter, search_limiter)},
+)
@@ -1,49 +1,227 @@
-# In-memory cache for user profiles
-# This will be replaced with a database later
+# Profile cache - read-through layer over a pluggable storage backend
+# Backends live in core/storage.py; settings.database_url picks one
 
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 from threading import Lock
+import json
+import time
+from core.config import settings
+from core.profile_record import pack, unpack
+from core.storage import ProfileStore, MemoryProfileStore, create_profile_store
+
+class _CacheStripe:
+    """One independently locked slice of the profile LRU"""
+
+    __slots__ = ("entries", "lock")
+
+    def __init__(self):
+        self.entries: "OrderedDict[int, Tuple[object, int, int]]" = OrderedDict()  # user_id -> (packed record, version, store generation)
+        self.lock = Lock()
+
 
 class UserProfileCache:
-    """Thread-safe in-memory storage for user profiles"""
+    """
+    Thread-safe profile access with a small LRU read-through cache in front of the store
+
+    The LRU is split into stripes by user_id, each with its own lock, so
+    concurrent reads of different users do not contend. A cached copy is
+    only served while the store's generation for that user is unchanged,
+    which keeps caches in several worker processes coherent when they
+    share one store file.
+
+    Cached profiles are packed records (core/profile_record.py), like the
+    memory store's. get_profile() always returns a fresh plain dict;
+    get_profile_record() hands out the shared record for read-only use.
+    """
     
-    def __init__(self):
-        self._cache: Dict[int, dict] = {}
-        self._lock = Lock()
-        self._next_id = 1
+    def __init__(self, store: Optional[ProfileStore] = None, max_cached: int = 1024, stripes: int = 16):
+        self._store = store if store is not None else MemoryProfileStore()
+        self.epoch = 0  # Bumped by clear(); caches derived from profiles key on it
+        self._clear_callbacks: List[Callable[[], None]] = []
+        self._stripes = [_CacheStripe() for _ in range(max(1, stripes))]
+        self._max_per_stripe = max(1, max_cached // len(self._stripes))
+    
+    def _stripe(self, user_id: int) -> _CacheStripe:
+        return self._stripes[user_id % len(self._stripes)]
+    
+    def _remember(self, user_id: int, record, version: int, generation: int):
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            stripe.entries[user_id] = (record, version, generation)
+            stripe.entries.move_to_end(user_id)
+            while len(stripe.entries) > self._max_per_stripe:
+                stripe.entries.popitem(last=False)
+    
+    def _forget(self, user_id: int):
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            stripe.entries.pop(user_id, None)
     
     def save_profile(self, profile_data: dict) -> int:
         """Save a user profile and return the user_id"""
-        with self._lock:
-            user_id = self._next_id
-            self._cache[user_id] = profile_data
-            self._next_id += 1
-            return user_id
+        user_id = self._store.save(profile_data)
+        self._remember(user_id, pack(profile_data), 1, self._store.generation(user_id))
+        return user_id
+    
+    def save_profiles(self, profiles: List[dict]) -> List[int]:
+        """
+        Save many profiles in one store transaction and return their user_ids
+
+        Bulk imports skip the LRU layer so they do not evict profiles that
+        are actually being read.
+        """
+        return self._store.save_many(profiles)
     
     def get_profile(self, user_id: int) -> Optional[dict]:
         """Retrieve a user profile by ID"""
-        with self._lock:
-            return self._cache.get(user_id)
+        versioned = self.get_profile_versioned(user_id)
+        return versioned[0] if versioned is not None else None
+    
+    def get_profile_versioned(self, user_id: int) -> Optional[Tuple[dict, int]]:
+        """Retrieve (profile, version) by ID; the version changes on every update"""
+        versioned = self.get_record_versioned(user_id)
+        return (unpack(versioned[0]), versioned[1]) if versioned is not None else None
+    
+    def get_profile_record(self, user_id: int):
+        """
+        Read-only view of a profile: a CompactProfile (or, for partial
+        profiles, a dict) that must not be mutated. Supports get() and []
+        like the profile dict; fields are only expanded when read, and the
+        same object is returned while the profile stays cached.
+        """
+        versioned = self.get_record_versioned(user_id)
+        return versioned[0] if versioned is not None else None
+    
+    def get_record_versioned(self, user_id: int) -> Optional[Tuple[object, int]]:
+        """Retrieve (packed record, version) by ID through the LRU"""
+        generation = self._store.generation(user_id)  # Read before the store, so a racing update is never masked
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            cached = stripe.entries.get(user_id)
+            if cached is not None and cached[2] == generation:
+                stripe.entries.move_to_end(user_id)
+                return cached[0], cached[1]
+        versioned = self._store.get_record_versioned(user_id)
+        if versioned is not None:
+            self._remember(user_id, versioned[0], versioned[1], generation)
+        return versioned
     
     def update_profile(self, user_id: int, profile_data: dict) -> bool:
         """Update an existing profile"""
-        with self._lock:
-            if user_id in self._cache:
-                self._cache[user_id] = profile_data
-                return True
-            return False
+        updated = self._store.update(user_id, profile_data)
+        self._forget(user_id)  # Re-read on next access, with the generation the update produced
+        return updated
     
     def get_all_profiles(self) -> Dict[int, dict]:
         """Get all profiles (for debugging)"""
-        with self._lock:
-            return self._cache.copy()
+        return self._store.all()
     
+    def on_clear(self, callback: Callable[[], None]):
+        """Call `callback` after every clear(), to drop caches derived from profiles"""
+        self._clear_callbacks.append(callback)
+
     def clear(self):
         """Clear all profiles"""
-        with self._lock:
-            self._cache.clear()
-            self._next_id = 1
+        self._store.clear()
+        self.epoch += 1
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.entries.clear()
+        for callback in self._clear_callbacks:
+            callback()
 
 
 # Singleton instance
-profile_cache = UserProfileCache()
+profile_cache = UserProfileCache(
+    create_profile_store(settings.database_url),
+    max_cached=settings.profile_read_cache_size,
+    stripes=settings.profile_read_cache_stripes,
+)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a TTL and a stale-while-revalidate window
+
+    Entries are "fresh" for `ttl` seconds, then "stale" for another
+    `stale_ttl` seconds (still served, but the caller should refresh them),
+    then expired. The cache is bounded by entry count and approximate size
+    in bytes; the least recently used entries are evicted first.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float = 0.0, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Look up a key
+
+        Returns:
+            (value, state) where state is "fresh", "stale" or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            value, size, stored_at = entry
+            age = now - stored_at
+            if age > self.ttl + self.stale_ttl:
+                self._remove(key)
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if age > self.ttl:
+                self.stale_hits += 1
+                return value, "stale"
+            self.hits += 1
+            return value, "fresh"
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting least recently used entries to stay within limits"""
+        size = len(value) if isinstance(value, (bytes, str)) else len(json.dumps(value, default=str))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
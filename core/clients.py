@@ -0,0 +1,141 @@
+# Upstream clients - created once per process and shared by every request
+# Each client is created on first use, so a cold start (e.g. a Cloudflare
+# Worker serving /health) never imports httpx or the langchain/OpenAI stack.
+# The FastAPI lifespan hook in main.py closes them at shutdown.
+
+from typing import TYPE_CHECKING, List, Optional
+from core.config import settings
+from core.llm_pool import LLMPool, LLMProvider, register_pool_gauges
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class TavilySearchClient:
+    """Minimal async Tavily client that reuses one pooled keep-alive connection"""
+
+    def __init__(self, http: "httpx.AsyncClient"):
+        self._http = http
+
+    async def search(self, query: str, **params) -> dict:
+        """
+        POST /search
+
+        Args:
+            query: Search query string
+            **params: Tavily search options (search_depth, max_results, ...)
+
+        Returns:
+            Raw Tavily JSON response
+        """
+        response = await self._http.post("/search", json={"query": query, **params})
+        response.raise_for_status()
+        return response.json()
+
+
+def _pooled_http_client(**kwargs) -> "httpx.AsyncClient":
+    import httpx
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.upstream_max_connections,
+            max_keepalive_connections=settings.upstream_max_keepalive,
+            keepalive_expiry=settings.upstream_keepalive_seconds,
+        ),
+        timeout=httpx.Timeout(settings.chat_deadline_seconds, connect=settings.upstream_connect_timeout_seconds),
+        **kwargs,
+    )
+
+
+class UpstreamClients:
+    """Owns the search and LLM clients and their HTTP connection pools"""
+
+    def __init__(self):
+        self.search: Optional[TavilySearchClient] = None
+        self.llm = None
+        self._http_clients: List["httpx.AsyncClient"] = []
+        self._llm_started = False
+
+    def start(self):
+        """Create every client now instead of on first use (idempotent)"""
+        self.start_search()
+        self.start_llm()
+
+    def start_search(self):
+        """Create the Tavily client (idempotent)"""
+        if self.search is not None:
+            return
+        search_http = _pooled_http_client(
+            base_url=settings.tavily_base_url,
+            headers={"Authorization": f"Bearer {settings.tavily_api_key}"},
+        )
+        self._http_clients.append(search_http)
+        self.search = TavilySearchClient(search_http)
+
+    def start_llm(self):
+        """Create the LLM provider pool (idempotent); imports langchain_openai"""
+        if self._llm_started or self.llm is not None:
+            return
+        self._llm_started = True
+
+        # Initialize the LLM providers (GitHub Models first by default)
+        try:
+            from langchain_openai import ChatOpenAI
+
+            endpoints = {
+                "github": (settings.github_token, settings.llm_base_url, settings.llm_model),
+                "groq": (settings.groq_api_key, settings.groq_base_url, settings.groq_model),
+                "gemini": (settings.gemini_api_key, settings.gemini_base_url, settings.gemini_model),
+            }
+            configured = [
+                (name, *endpoints[name]) for name in (n.strip() for n in settings.llm_providers.split(","))
+                if name in endpoints and endpoints[name][0]
+            ]
+            providers = []
+            for name, api_key, base_url, model in configured:
+                llm_http = _pooled_http_client()
+                self._http_clients.append(llm_http)
+                providers.append(LLMProvider(name, ChatOpenAI(
+                    model=model,
+                    api_key=api_key,
+                    base_url=base_url,
+                    temperature=0.7,
+                    max_tokens=None,
+                    timeout=settings.chat_deadline_seconds,
+                    # With a backup provider, failing over beats retrying the same one
+                    max_retries=2 if len(configured) == 1 else 0,
+                    stream_usage=True,  # Token counts on streamed responses too
+                    http_async_client=llm_http,
+                )))
+            self.llm = LLMPool(providers) if providers else None
+        except Exception as e:
+            print(f"Warning: LLM provider initialization failed: {e}")
+            self.llm = None
+
+    async def aclose(self):
+        """Close every pooled connection"""
+        for client in self._http_clients:
+            await client.aclose()
+        self._http_clients.clear()
+        self.search = None
+        self.llm = None
+        self._llm_started = False
+
+
+# Singleton instance
+upstream = UpstreamClients()
+
+register_pool_gauges(lambda: upstream.llm)
+
+
+def get_search_client() -> TavilySearchClient:
+    """Shared Tavily client"""
+    upstream.start_search()
+    return upstream.search
+
+
+def get_llm():
+    """Shared LLM provider pool (ChatOpenAI interface), or None if no provider is configured"""
+    upstream.start_llm()
+    return upstream.llm
+
@@ -9,7 +9,157 @@ class Settings(BaseSettings):
     github_token: str
     groq_api_key: str = ""
     gemini_api_key: str = ""  # Optional for future use
-    database_url: str = "sqlite:///./goabroadai.db"  # For future use
+    database_url: str = "sqlite:///./goabroadai.db"  # Profile store; "memory://" for a process-local dict
+    profile_read_cache_size: int = 1024  # Profiles kept in the in-memory read-through layer
+    profile_read_cache_stripes: int = 16  # Independently locked slices of that layer
+    profile_body_cache_size: int = 4096  # Serialized /profile/get bodies, keyed by profile version
+    profile_body_cache_max_bytes: int = 32 * 1024 * 1024
+    profile_body_cache_ttl_seconds: float = 60 * 60
+    profile_bulk_batch_size: int = 500  # Lines validated and saved per transaction by /profile/bulk
+    profile_bulk_max_line_bytes: int = 1024 * 1024  # Longer import lines are rejected, not buffered
+
+    # Upstream endpoints
+    llm_base_url: str = "https://models.inference.ai.azure.com"
+    llm_model: str = "gpt-4o-mini"
+    tavily_base_url: str = "https://api.tavily.com"
+
+    # LLM provider pool, in order of preference; providers without an API key are skipped.
+    # Groq and Gemini are reached through their OpenAI-compatible endpoints.
+    llm_providers: str = "github,groq,gemini"
+    groq_base_url: str = "https://api.groq.com/openai/v1"
+    groq_model: str = "llama-3.1-8b-instant"
+    gemini_base_url: str = "https://generativelanguage.googleapis.com/v1beta/openai/"
+    gemini_model: str = "gemini-2.0-flash"
+
+    # Hedging: call the next provider when the current one has not streamed its first token
+    # within its observed first-token percentile, clamped to [min, max] seconds, or has not
+    # answered a non-streamed call within its own full-answer percentile (at least min seconds)
+    llm_hedge_percentile: float = 0.9
+    llm_hedge_min_delay_seconds: float = 0.5
+    llm_hedge_max_delay_seconds: float = 10.0  # Streams only
+    llm_hedge_default_delay_seconds: float = 3.0  # Streams, until a provider has llm_hedge_min_samples; invoke waits for samples
+    llm_hedge_min_samples: int = 20
+
+    # Circuit breaker per provider, over its most recent calls
+    llm_breaker_window: int = 20
+    llm_breaker_min_calls: int = 5
+    llm_breaker_error_rate: float = 0.5
+    llm_breaker_cooldown_seconds: float = 30.0  # Then one trial call decides whether to close it
+
+    # Shared HTTP connection pools (one per upstream)
+    upstream_max_connections: int = 100
+    upstream_max_keepalive: int = 20
+    upstream_keepalive_seconds: float = 30.0
+    upstream_connect_timeout_seconds: float = 5.0
+
+    # Per-request deadline, split between the search and LLM stages
+    chat_deadline_seconds: float = 45.0
+    search_budget_fraction: float = 0.3  # Share of the deadline search may use
+
+    # Answer length (max_tokens) per endpoint, scaled by the user's tier, cut to what the model
+    # usually generates in the time left before the deadline, then clamped to [min, max]
+    llm_output_tokens: str = "ask=800,stream=1000,batch=600,job=1500,summary=300"
+    llm_output_token_tiers: str = "free=0.6,standard=1.0,premium=1.5"  # Tier -> budget multiplier
+    llm_default_tier: str = "standard"
+    llm_user_tiers: str = ""  # Per-user overrides, e.g. "12=premium,40=free"
+    llm_output_tokens_min: int = 128
+    llm_output_tokens_max: int = 2000
+    llm_output_deadline_share: float = 0.8  # Share of the time left an answer may be sized to fill
+    llm_output_tokens_step: int = 128  # Deadline-cut budgets are rounded down to this, so callers still coalesce
+
+    # Per-user token usage (GET /chat/usage/{user_id}), kept for usage_buckets * usage_bucket_seconds
+    usage_bucket_seconds: float = 60 * 60
+    usage_buckets: int = 24
+    usage_max_users: int = 100000  # Least recently active users dropped first
+
+    # Admission control: upstream calls in flight, callers allowed to queue, and how long they may wait
+    llm_max_concurrency: int = 32
+    llm_max_queue: int = 64
+    search_max_concurrency: int = 16
+    search_max_queue: int = 64
+    admission_max_wait_seconds: float = 10.0
+
+    # Per-user rate limit on /chat/ask and /chat/ask/stream (token bucket; 0 disables)
+    user_rate_per_minute: float = 10.0
+    user_rate_burst: int = 5
+    user_rate_max_users: int = 100000  # Buckets kept, least recently used dropped first
+
+    # Chat sessions
+    session_ttl_seconds: float = 60 * 60  # Idle time before a session is dropped
+    session_max_sessions: int = 10000
+    session_max_chars: int = 64 * 1024 * 1024  # Approximate memory cap across all sessions
+    session_recent_turns: int = 3  # Turns kept verbatim; older ones are folded into the summary
+    session_summary_tokens: int = 300
+    session_answer_chars: int = 1500  # Stored answers are trimmed to this length
+
+    # Batch chat
+    batch_max_items: int = 1000
+    batch_max_concurrency: int = 16
+
+    # Chat jobs (POST /chat/jobs, answered in the background)
+    chat_job_workers: int = 8  # Jobs answered at once
+    chat_job_max_queue: int = 256  # Jobs allowed to wait; more are turned away with 503
+    chat_job_result_ttl_seconds: float = 10 * 60  # Finished jobs (and idempotency keys) are kept this long
+    chat_job_max_poll_seconds: float = 30.0  # Longest long-poll on GET /chat/jobs/{job_id}
+
+    # Search routing: questions scoring below the basic threshold skip web search,
+    # those at or above the advanced threshold get an advanced-depth search
+    search_routing_enabled: bool = True  # False sends every question to advanced search
+    search_route_basic_threshold: float = 1.0
+    search_route_advanced_threshold: float = 3.0
+
+    # Local BM25 index of fetched sources ("" disables it)
+    search_index_path: str = "./search_index.db"
+    search_index_min_results: int = 3  # Local sources needed to skip Tavily
+    search_index_min_coverage: float = 0.6  # Fraction of query terms a local source must contain
+    search_index_max_age_hours: float = 72.0  # Older local sources don't count as fresh
+    search_index_half_life_hours: float = 168.0  # Ranking decay with source age
+    search_index_retention_hours: float = 30 * 24.0  # Older sources are deleted (0 keeps them)
+    search_index_max_docs: int = 50000  # Oldest sources beyond this are deleted (0 = no cap)
+
+    # Speculative search prefetch on /profile/submit: template queries per
+    # (preferred country, field of study, budget band), separated by "|"
+    search_prefetch_enabled: bool = True  # Needs the local source index
+    search_prefetch_templates: str = (
+        "{budget} tuition fees and living costs for {field} in {country}"
+        "|scholarships for international students {field} {country}"
+        "|student visa requirements {country}"
+        "|top {budget} universities in {country} for {field}"
+    )
+    search_prefetch_max_countries: int = 3  # Preferred countries prefetched per profile
+    search_prefetch_max_results: int = 5
+    search_prefetch_depth: str = "basic"
+    search_prefetch_rate_per_minute: float = 20.0  # Upstream calls the prefetcher may make (0 or less disables prefetch)
+    search_prefetch_max_search_share: float = 0.5  # Only prefetch while fewer search slots are busy
+    search_prefetch_idle_poll_seconds: float = 1.0  # Recheck interval while live searches are busy
+    search_prefetch_max_pending: int = 1000
+    search_prefetch_dedupe_hours: float = 24.0  # A query is prefetched at most once per window
+
+    # Resume uploads
+    resume_max_bytes: int = 5 * 1024 * 1024
+    resume_max_pages: int = 20  # Later pages are ignored
+    resume_parse_workers: int = 2  # Worker processes for PDF text extraction
+
+    # Prompt assembly (token counts are estimates, ~4 characters per token)
+    prompt_token_budget: int = 3000  # Profile + resume + search sections, excluding the question
+    prompt_profile_share: float = 0.2
+    prompt_resume_share: float = 0.25
+    prompt_search_share: float = 0.4
+    prompt_history_share: float = 0.15  # Session summary + recent turns
+    resume_digest_tokens: int = 600  # Size of the digest stored with each profile
+
+    # Search result cache
+    search_cache_ttl_seconds: float = 6 * 60 * 60  # Served as fresh
+    search_cache_stale_seconds: float = 18 * 60 * 60  # Served while refreshing in background
+    search_cache_max_entries: int = 2048
+    search_cache_max_bytes: int = 32 * 1024 * 1024
+
+    # Search context for the prompt: duplicate sources removed, the rest ranked by overlap with the
+    # question and preferred countries, and only their most relevant sentences kept
+    search_context_max_chars: int = 1200  # Extracted sentences across all sources
+    search_context_max_sources: int = 5
+    search_dedupe_similarity: float = 0.6  # Word-shingle Jaccard at which two sources count as one
+    search_country_weight: float = 0.5  # Weight of preferred-country terms relative to question terms
 
     class Config:
         env_file = ".env"
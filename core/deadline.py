@@ -0,0 +1,26 @@
+# Per-request deadline budgets
+
+import time
+
+
+class Deadline:
+    """A fixed point in time that pipeline stages split between them"""
+
+    def __init__(self, seconds: float):
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        """Seconds since the deadline was set"""
+        return time.monotonic() - self.started_at
+
+    def share(self, fraction: float) -> float:
+        """A fraction of the remaining time, for one stage"""
+        return self.remaining() * fraction
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
@@ -0,0 +1,277 @@
+# LLM pool - hedged calls across several chat model providers
+# The pool has the same ainvoke/astream interface as a single ChatOpenAI
+# client, so callers do not know whether one or several providers serve them.
+
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+import asyncio
+import time
+from core.admission import llm_limiter
+from core.config import settings
+from core.metrics import counter, gauge, histogram
+
+LLM_PROVIDER_CALLS = counter("llm_provider_calls_total", "LLM provider calls by outcome", ["provider", "outcome"])
+LLM_PROVIDER_LATENCY = histogram(
+    "llm_provider_first_token_seconds", "Time to a full response (invoke) or first token (stream)", ["provider", "mode"]
+)
+LLM_HEDGES = counter("llm_hedges_total", "Backup calls fired because a provider was slow or failed", ["provider", "reason"])
+LLM_HEDGES_SKIPPED = counter("llm_hedges_skipped_total", "Backup calls not fired because every LLM slot was busy")
+
+# Call modes, each with its own latency window: a full ainvoke answer and
+# the first chunk of an astream take very different times
+INVOKE, STREAM = "invoke", "stream"
+
+
+class ProviderHealth:
+    """
+    Recent latency and error history of one provider, plus its circuit breaker
+
+    The breaker opens when at least `breaker_min_calls` of the last
+    `breaker_window` calls were recorded and `breaker_error_rate` of them
+    failed. After `breaker_cooldown` seconds one trial call is let through
+    (half-open); it closes the breaker on success and re-opens it on failure.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, Deque[float]] = {INVOKE: deque(maxlen=200), STREAM: deque(maxlen=200)}
+        self.outcomes: Deque[bool] = deque(maxlen=max(1, settings.llm_breaker_window))
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    def hedge_delay(self, mode: str = STREAM) -> Optional[float]:
+        """
+        Seconds to wait for this provider before firing a backup call
+
+        Streams hedge on the time to the first chunk, with a default delay
+        until enough streams were seen. Full (invoke) answers hedge only on
+        their own latency percentile, uncapped, and not at all before
+        `llm_hedge_min_samples` of them were seen (None): a long but healthy
+        answer must not pay for a second one.
+        """
+        latencies = self.latencies[mode]
+        if len(latencies) < settings.llm_hedge_min_samples:
+            return settings.llm_hedge_default_delay_seconds if mode == STREAM else None
+        ordered = sorted(latencies)
+        observed = max(settings.llm_hedge_min_delay_seconds,
+                       ordered[min(len(ordered) - 1, int(len(ordered) * settings.llm_hedge_percentile))])
+        return min(settings.llm_hedge_max_delay_seconds, observed) if mode == STREAM else observed
+
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """Whether a call may be sent (claims the half-open trial if due)"""
+        if self.opened_at is None:
+            return True
+        if not self.probing and time.monotonic() - self.opened_at >= settings.llm_breaker_cooldown_seconds:
+            self.probing = True
+            return True
+        return False
+
+    def record(self, ok: bool, latency: float = None, mode: str = STREAM):
+        if ok and latency is not None:
+            self.latencies[mode].append(latency)
+        if self.opened_at is not None:
+            if self.probing:
+                # Outcome of the half-open trial
+                self.probing = False
+                self.opened_at = None if ok else time.monotonic()
+                self.outcomes.clear()
+            return
+        self.outcomes.append(ok)
+        failures = self.outcomes.count(False)
+        if len(self.outcomes) >= settings.llm_breaker_min_calls and failures / len(self.outcomes) >= settings.llm_breaker_error_rate:
+            self.opened_at = time.monotonic()
+
+
+class LLMProvider:
+    """One chat model endpoint and its health"""
+
+    def __init__(self, name: str, llm):
+        self.name = name
+        self.llm = llm
+        self.health = ProviderHealth()
+
+    def succeeded(self, started: float, mode: str):
+        latency = time.monotonic() - started
+        self.health.record(True, latency, mode)
+        LLM_PROVIDER_LATENCY.observe(latency, provider=self.name, mode=mode)
+        LLM_PROVIDER_CALLS.inc(provider=self.name, outcome="success")
+
+    def failed(self):
+        self.health.record(False)
+        LLM_PROVIDER_CALLS.inc(provider=self.name, outcome="error")
+
+    def abandoned(self):
+        """Lost the race (or the caller left); says nothing about its health"""
+        if self.health.probing:
+            self.health.probing = False  # Let another trial through later
+        LLM_PROVIDER_CALLS.inc(provider=self.name, outcome="cancelled")
+
+
+class LLMPool:
+    """
+    Providers in order of preference, called with hedging
+
+    The first healthy provider is called. If it has not answered (ainvoke)
+    or produced its first token (astream) within its hedge delay, the next
+    healthy provider is called as well, and so on; the first success wins
+    and the other calls are cancelled. A provider that fails hands over to
+    the next one immediately. Providers whose circuit breaker is open are
+    skipped.
+
+    The caller holds one llm_limiter slot for the call; every backup that
+    runs alongside it takes a slot of its own (or is not fired when none
+    is free), so admission control sees the real upstream concurrency.
+    `on_hedge` is called once per backup fired, for usage accounting.
+    """
+
+    def __init__(self, providers: List[LLMProvider]):
+        self.providers = providers
+
+    def _candidates(self) -> List[LLMProvider]:
+        candidates = [provider for provider in self.providers if provider.health.allow()]
+        if not candidates:
+            raise RuntimeError("No LLM provider available: every provider is failing, try again shortly")
+        return candidates
+
+    async def _race(self, start, mode: str,
+                    on_hedge: Optional[Callable[[], None]] = None) -> Tuple[LLMProvider, Any, List[Tuple[LLMProvider, asyncio.Task]]]:
+        """
+        Run start(provider) -> awaitable across the candidates with hedging
+
+        Returns:
+            (winning provider, its result, losing calls still running)
+        """
+        candidates = self._candidates()
+        running: Dict[asyncio.Task, Tuple[LLMProvider, float]] = {}
+        last_error: Optional[BaseException] = None
+        next_index = 0
+        hedging = True
+
+        async def backup(provider: LLMProvider):
+            # Runs alongside the caller's call, in a slot of its own
+            try:
+                return await start(provider)
+            finally:
+                llm_limiter.release()
+
+        def launch(reason: Optional[str]):
+            nonlocal next_index
+            provider = candidates[next_index]
+            next_index += 1
+            if reason:
+                LLM_HEDGES.inc(provider=provider.name, reason=reason)
+                if on_hedge:
+                    on_hedge()
+            call = backup(provider) if running else start(provider)
+            running[asyncio.ensure_future(call)] = (provider, time.monotonic())
+
+        launch(None)
+        try:
+            while running:
+                newest_provider, newest_started = list(running.values())[-1]
+                timeout = None
+                delay = newest_provider.health.hedge_delay(mode)
+                if hedging and delay is not None and next_index < len(candidates):
+                    timeout = max(0.0, delay - (time.monotonic() - newest_started))
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if llm_limiter.try_acquire():
+                        launch("slow")
+                    else:
+                        LLM_HEDGES_SKIPPED.inc()
+                        hedging = False  # Saturated: wait for the calls already running
+                    continue
+                for task in done:
+                    provider, started = running.pop(task)
+                    if task.exception() is None:
+                        provider.succeeded(started, mode)
+                        losers = [(running[t][0], t) for t in running]
+                        running.clear()
+                        return provider, task.result(), losers
+                    provider.failed()
+                    last_error = task.exception()
+                if not running and next_index < len(candidates):
+                    launch("error")  # Takes over the failed call's slot
+            raise last_error
+        finally:
+            # Only reached with tasks left if the caller was cancelled
+            for task, (provider, _) in running.items():
+                task.cancel()
+                provider.abandoned()
+            for provider in candidates[next_index:]:
+                provider.health.probing = False  # Half-open trial claimed but never sent
+
+    async def ainvoke(self, messages, on_hedge: Optional[Callable[[], None]] = None, **kwargs):
+        """Hedged ChatOpenAI.ainvoke"""
+        provider, response, losers = await self._race(lambda p: p.llm.ainvoke(messages, **kwargs), INVOKE, on_hedge)
+        for loser, task in losers:
+            task.cancel()
+            loser.abandoned()
+        return response
+
+    async def astream(self, messages, on_hedge: Optional[Callable[[], None]] = None, **kwargs) -> AsyncIterator[Any]:
+        """Hedged ChatOpenAI.astream; the race is decided by the first chunk"""
+        streams: Dict[str, Any] = {}
+
+        async def first_chunk(provider: LLMProvider):
+            stream = streams[provider.name] = provider.llm.astream(messages, **kwargs)
+            try:
+                return await stream.__anext__()
+            except StopAsyncIteration:
+                return None
+
+        winner = None
+        try:
+            winner, chunk, losers = await self._race(first_chunk, STREAM, on_hedge)
+            for loser, task in losers:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                stream = streams.pop(loser.name, None)
+                if stream is not None:
+                    await stream.aclose()
+                loser.abandoned()
+            if chunk is None:
+                return
+            yield chunk
+            async for chunk in streams[winner.name]:
+                yield chunk
+        except Exception:
+            if winner is not None:
+                winner.failed()  # Broke off mid-stream
+            raise
+        finally:
+            for stream in streams.values():
+                try:
+                    await stream.aclose()
+                except RuntimeError:
+                    pass  # Still inside a cancelled first-chunk call, which closes it
+
+    def status(self) -> List[Dict]:
+        """Per-provider health snapshot"""
+        return [
+            {
+                "provider": provider.name,
+                "circuit_open": provider.health.is_open(),
+                "hedge_delay_seconds": {mode: _round(provider.health.hedge_delay(mode)) for mode in (INVOKE, STREAM)},
+                "recent_error_rate": round(provider.health.outcomes.count(False) / len(provider.health.outcomes), 3)
+                if provider.health.outcomes else 0.0,
+            }
+            for provider in self.providers
+        ]
+
+
+def _round(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds, 3)
+
+
+def register_pool_gauges(get_pool):
+    """Export breaker state for whichever pool get_pool() returns"""
+    def circuit_states():
+        pool = get_pool()
+        if not isinstance(pool, LLMPool):
+            return {}
+        return {(provider.name,): 1.0 if provider.health.is_open() else 0.0 for provider in pool.providers}
+
+    gauge("llm_provider_circuit_open", "1 while a provider's circuit breaker is open", ["provider"], function=circuit_states)
@@ -0,0 +1,216 @@
+# Metrics - minimal in-process Prometheus registry
+# Recording is a dict update (plus a bisect for histograms), cheap enough
+# for the request hot path. GET /metrics renders the text exposition format.
+
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple, Union
+from bisect import bisect_left
+from contextlib import contextmanager
+import time
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+CHAR_BUCKETS = (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}", *self.samples()]
+
+
+class _ValueMetric(_Metric):
+    """One number per label set, stored directly or read from a callback at render time"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 function: Callable[[], Union[float, Dict[LabelValues, float]]] = None):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function = function
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        values = self._values
+        if self._function is not None:
+            result = self._function()
+            values = result if isinstance(result, dict) else {(): result}
+        for key, value in list(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Counter(_ValueMetric):
+    """Monotonically increasing value per label set"""
+
+    type = "counter"
+
+
+class Gauge(_ValueMetric):
+    """Value that can go up and down"""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values per label set"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels) -> Tuple[List[int], float, int]:
+        """(per-bucket counts, sum, count) for one label set"""
+        series = self._series.get(self._key(labels))
+        if series is None:
+            return [0] * (len(self.buckets) + 1), 0.0, 0
+        return list(series[0]), series[1], series[2]
+
+    def samples(self) -> Iterator[str]:
+        for key, (counts, total, count) in list(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class Registry:
+    """Collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = (), function=None) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames, function))
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = (), function=None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labelnames, function))
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+
+# Chat pipeline metrics (stages: profile, search, llm)
+CHAT_STAGE_SECONDS = histogram("chat_stage_duration_seconds", "Time spent in each chat pipeline stage", ["stage"])
+CHAT_STAGE_ERRORS = counter("chat_stage_errors_total", "Errors per chat pipeline stage", ["stage", "error"])
+CHAT_PROMPT_TOKENS = histogram("chat_prompt_tokens", "Prompt tokens per LLM call", buckets=TOKEN_BUCKETS)
+CHAT_COMPLETION_TOKENS = histogram("chat_completion_tokens", "Completion tokens per LLM call", buckets=TOKEN_BUCKETS)
+CHAT_PROMPT_CHARS = histogram("chat_prompt_chars", "Prompt size in characters per LLM call", buckets=CHAR_BUCKETS)
+CHAT_TOKENS_TOTAL = counter("chat_tokens_total", "LLM tokens consumed", ["kind"])
+CHAT_ROUTE_SECONDS = histogram("chat_route_duration_seconds", "End-to-end chat latency by search route", ["route"])
+
+
+def record_stage_error(stage: str, error: Union[BaseException, str]):
+    """Count an error for a pipeline stage, labeled by exception type"""
+    CHAT_STAGE_ERRORS.inc(stage=stage, error=error if isinstance(error, str) else type(error).__name__)
+
+
+def record_token_usage(usage: dict, prompt_chars: int):
+    """Record an LLM call's token usage (langchain usage_metadata) and prompt size"""
+    CHAT_PROMPT_CHARS.observe(prompt_chars)
+    if not usage:
+        return
+    prompt_tokens = usage.get("input_tokens", 0)
+    completion_tokens = usage.get("output_tokens", 0)
+    CHAT_PROMPT_TOKENS.observe(prompt_tokens)
+    CHAT_COMPLETION_TOKENS.observe(completion_tokens)
+    CHAT_TOKENS_TOTAL.inc(prompt_tokens, kind="prompt")
+    CHAT_TOKENS_TOTAL.inc(completion_tokens, kind="completion")
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a pipeline stage; exceptions escaping it are counted as stage errors"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record_stage_error(stage, e)
+        raise
+    finally:
+        CHAT_STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
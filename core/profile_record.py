@@ -0,0 +1,140 @@
+# Compact profile record - memory-lean in-process representation of a profile
+# The in-memory store keeps one CompactProfile per user instead of the nested
+# dicts produced by UserInfoCreate.dict(); to_dict() rebuilds that exact shape.
+# Readers that only need a few fields (prompt building) use the record's
+# get()/[] instead, so a compressed resume is only expanded when asked for.
+
+from typing import Dict, Optional
+import sys
+import zlib
+
+# Internal resume digest added at save time; the leading underscore keeps it
+# out of /profile/get responses
+RESUME_DIGEST_KEY = "_resume_digest"
+
+# Profile keys in UserInfoCreate order, plus the digest added at save time
+FIELDS = (
+    "full_name", "father_name", "mother_name", "email", "phone_country_code", "phone_number",
+    "full_phone", "nationality", "current_living_country", "education", "preferred_countries",
+    "budget_min_bdt", "budget_max_bdt", "preferred_currency", "preferred_intake",
+    "resume_filename", "resume_text", RESUME_DIGEST_KEY,
+)
+_FIELD_SET = frozenset(FIELDS)
+EDUCATION_FIELDS = ("level", "institution", "field", "gpa", "year_completed")
+
+# Low-cardinality values shared by every profile that uses them
+_INTERNED = ("phone_country_code", "preferred_currency", "preferred_intake")
+_COUNTRY_LISTS = ("nationality", "current_living_country", "preferred_countries")
+
+_MAX_SHARED_TUPLES = 65536
+_shared_tuples: Dict[tuple, tuple] = {}
+
+# Resumes shorter than this are kept as plain text (zlib would not pay off)
+_COMPRESS_MIN_CHARS = 256
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _share(items: tuple) -> tuple:
+    """One tuple object per distinct country combination (bounded)"""
+    shared = _shared_tuples.get(items)
+    if shared is not None:
+        return shared
+    if len(_shared_tuples) < _MAX_SHARED_TUPLES:
+        _shared_tuples[items] = items
+    return items
+
+
+def _pack_education(entry):
+    if isinstance(entry, dict) and entry.keys() == set(EDUCATION_FIELDS):
+        return tuple(_intern(entry[key]) if key in ("level", "field") else entry[key] for key in EDUCATION_FIELDS)
+    return entry  # Unexpected shape: kept as is
+
+
+def _unpack_education(entry):
+    return dict(zip(EDUCATION_FIELDS, entry)) if type(entry) is tuple else entry
+
+
+class CompactProfile:
+    """
+    One profile as a slotted record
+
+    - Country lists become shared tuples of interned strings; currency,
+      intake and phone code are interned.
+    - Education entries become tuples in EducationEntry field order.
+    - A long resume_text is zlib-compressed. to_dict() and get("resume_text")
+      return it as plain text; the bytes are only reachable through
+      compressed_resume(). The digest used by prompts stays plain.
+    - Keys outside FIELDS are kept in `extra` so nothing is lost.
+
+    get() and [] read single fields in the to_dict() shape, so read-only
+    callers can use a record where they would use the profile dict.
+    """
+
+    __slots__ = FIELDS + ("extra",)
+
+    @classmethod
+    def from_dict(cls, profile_data: dict) -> "CompactProfile":
+        record = cls()
+        for key in FIELDS:
+            setattr(record, key, profile_data.get(key))
+        for key in _INTERNED:
+            setattr(record, key, _intern(getattr(record, key)))
+        for key in _COUNTRY_LISTS:
+            value = getattr(record, key)
+            if isinstance(value, list) and all(type(item) is str for item in value):
+                setattr(record, key, _share(tuple(sys.intern(item) for item in value)))
+        if isinstance(record.education, list):
+            record.education = tuple(_pack_education(entry) for entry in record.education)
+        resume_text = record.resume_text
+        if type(resume_text) is str and len(resume_text) >= _COMPRESS_MIN_CHARS:
+            record.resume_text = zlib.compress(resume_text.encode("utf-8"))
+        extra = {key: value for key, value in profile_data.items() if key not in FIELDS}
+        record.extra = extra or None
+        return record
+
+    def compressed_resume(self) -> Optional[bytes]:
+        """The zlib-compressed resume_text, or None if it is stored as plain text"""
+        return self.resume_text if type(self.resume_text) is bytes else None
+
+    def get(self, key: str, default=None):
+        """One field as it appears in to_dict() (dict.get semantics)"""
+        if key not in _FIELD_SET:
+            return self.extra.get(key, default) if self.extra else default
+        value = getattr(self, key)
+        if key in _COUNTRY_LISTS and type(value) is tuple:
+            return list(value)
+        if key == "education" and type(value) is tuple:
+            return [_unpack_education(entry) for entry in value]
+        if key == "resume_text" and type(value) is bytes:
+            return zlib.decompress(value).decode("utf-8")
+        return value
+
+    def __getitem__(self, key: str):
+        if key not in _FIELD_SET and not (self.extra and key in self.extra):
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in _FIELD_SET or bool(self.extra and key in self.extra)
+
+    def to_dict(self) -> dict:
+        """The profile dict this record was built from (fresh, safe to mutate)"""
+        profile: Dict = {key: self.get(key) for key in FIELDS}
+        if self.extra:
+            profile.update(self.extra)
+        return profile
+
+
+def pack(profile_data: dict):
+    """CompactProfile for a full profile dict; partial dicts are kept as they are"""
+    if all(key in profile_data for key in FIELDS):
+        return CompactProfile.from_dict(profile_data)
+    return profile_data
+
+
+def unpack(record) -> dict:
+    """Inverse of pack(): always a fresh dict"""
+    return record.to_dict() if type(record) is CompactProfile else dict(record)
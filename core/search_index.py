@@ -0,0 +1,237 @@
+# Search index - local full-text index of previously fetched web sources
+# SQLite FTS5 provides BM25 ranking, incremental inserts and on-disk storage
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+from threading import Lock
+import math
+import re
+import sqlite3
+import time
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or should the to "
+    "what when where which who why will with you your study abroad".split()
+)
+
+
+@lru_cache(maxsize=65536)  # Vocabularies are small; stemming every word again is the main cost
+def _stem(word: str) -> str:
+    """Light plural/suffix folding so coverage roughly agrees with FTS5's porter stemmer"""
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def stemmed_words(text: str) -> List[str]:
+    """Every word of a text, lowercased and stemmed (stopwords kept, order preserved)"""
+    return [_stem(word) for word in _TOKEN.findall(text.lower())]
+
+
+def query_terms(text: str) -> List[str]:
+    """Distinct lowercase terms of a query, without stopwords"""
+    terms = []
+    for term in _TOKEN.findall(text.lower()):
+        if term not in STOPWORDS and len(term) > 1 and term not in terms:
+            terms.append(term)
+    return terms
+
+
+class SourceIndex:
+    """
+    BM25 index over fetched sources with freshness decay
+
+    Documents are keyed by URL; re-inserting a URL replaces its content and
+    fetch time. BM25 candidates come from FTS5, then each score is multiplied
+    by 0.5 ** (age / half_life) so recently fetched sources rank higher.
+
+    Every `prune_every` inserted rows, sources older than `retention_hours`
+    are deleted, then the oldest beyond `max_docs`, so the file stops
+    growing (SQLite reuses the freed pages).
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS source_docs (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            fetched_at REAL NOT NULL
+        )""",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS source_fts USING fts5(
+            title, content, content='source_docs', content_rowid='id', tokenize='porter unicode61'
+        )""",
+        "CREATE INDEX IF NOT EXISTS source_docs_fetched_at ON source_docs (fetched_at)",
+        """CREATE TRIGGER IF NOT EXISTS source_docs_ai AFTER INSERT ON source_docs BEGIN
+            INSERT INTO source_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS source_docs_ad AFTER DELETE ON source_docs BEGIN
+            INSERT INTO source_fts(source_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS source_docs_au AFTER UPDATE ON source_docs BEGIN
+            INSERT INTO source_fts(source_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO source_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END""",
+    )
+    _UPSERT = """
+        INSERT INTO source_docs (url, title, content, fetched_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(url) DO UPDATE SET title = excluded.title, content = excluded.content, fetched_at = excluded.fetched_at
+    """
+    # bm25() is lower-is-better; title matches weigh twice as much as body text
+    _QUERY = """
+        SELECT d.url, d.title, d.content, d.fetched_at, -bm25(source_fts, 2.0, 1.0) AS score
+        FROM source_fts JOIN source_docs d ON d.id = source_fts.rowid
+        WHERE source_fts MATCH ?
+        ORDER BY bm25(source_fts, 2.0, 1.0)
+        LIMIT ?
+    """
+    _DOC_FREQUENCY = "SELECT COUNT(*) FROM source_fts WHERE source_fts MATCH ?"
+    _PRUNE_EXPIRED = "DELETE FROM source_docs WHERE fetched_at < ?"
+    _PRUNE_OLDEST = """
+        DELETE FROM source_docs WHERE id IN (
+            SELECT id FROM source_docs ORDER BY fetched_at DESC LIMIT -1 OFFSET ?
+        )
+    """
+
+    def __init__(self, path: str, half_life_hours: float = 168.0, retention_hours: Optional[float] = None,
+                 max_docs: Optional[int] = None, prune_every: int = 500):
+        self.path = path
+        self.half_life_seconds = half_life_hours * 3600
+        self.retention_seconds = retention_hours * 3600 if retention_hours else None
+        self.max_docs = max_docs
+        self.prune_every = max(1, prune_every)
+        self._rows_since_prune = 0
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = Lock()
+        with self._lock:
+            for statement in self._SCHEMA:
+                self._conn.execute(statement)
+            self._prune(time.time())  # Limits may have been lowered since the file was written
+
+    def add(self, url: str, title: str, content: str, fetched_at: Optional[float] = None):
+        """Insert or refresh one source"""
+        self.add_many([{"url": url, "title": title, "content": content, "fetched_at": fetched_at}])
+
+    def add_many(self, sources: Iterable[Dict]):
+        """Insert or refresh sources in one transaction (dicts with url, title, content, optional fetched_at)"""
+        now = time.time()
+        rows = [
+            (s["url"], s.get("title") or "", s.get("content") or "", s.get("fetched_at") or now)
+            for s in sources if s.get("url")
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(self._UPSERT, rows)
+                self._rows_since_prune += len(rows)
+                if self._rows_since_prune >= self.prune_every:
+                    self._prune(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _prune(self, now: float) -> int:
+        """Delete expired sources, then the oldest over max_docs (caller holds the lock); returns rows deleted"""
+        self._rows_since_prune = 0
+        deleted = 0
+        if self.retention_seconds:
+            deleted += self._conn.execute(self._PRUNE_EXPIRED, (now - self.retention_seconds,)).rowcount
+        if self.max_docs:
+            deleted += self._conn.execute(self._PRUNE_OLDEST, (self.max_docs,)).rowcount
+        return deleted
+
+    def prune(self) -> int:
+        """Apply the retention and size limits now; returns sources deleted"""
+        with self._lock:
+            return self._prune(time.time())
+
+    def _doc_frequency(self, term: str) -> int:
+        """Sources containing a term (caller holds the lock)"""
+        return self._conn.execute(self._DOC_FREQUENCY, (f'"{term}"',)).fetchone()[0]
+
+    def search(self, query: str, limit: int = 5, candidates: int = 50, min_coverage: float = 0.0) -> List[Dict]:
+        """
+        Rank sources for a query
+
+        Sources containing every term are tried first. If there are fewer
+        than `limit` of them, any source with at least one term qualifies;
+        with min_coverage set, only sources that can reach it are scored.
+
+        Args:
+            query: Free-text query
+            limit: Results to return
+            candidates: BM25 candidates re-ranked with freshness decay
+            min_coverage: Fraction of query terms a source must contain to be
+                worth ranking (0 ranks any source matching one term)
+
+        Returns:
+            Dicts with url, title, content, fetched_at, score and coverage
+            (fraction of query terms found in the source), best first
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        quoted = [f'"{term}"' for term in terms]
+        with self._lock:
+            rows = self._conn.execute(self._QUERY, (" AND ".join(quoted), max(limit, candidates))).fetchall()
+            if len(rows) < limit and len(terms) > 1:
+                match = " OR ".join(quoted)
+                required = max(1, math.ceil(min_coverage * len(terms) - 1e-9))
+                if required > 1:
+                    # A source with `required` of n terms must contain one of
+                    # the n - required + 1 rarest, so requiring one of those
+                    # skips scoring the (many) sources that only share common terms
+                    rarest = sorted(terms, key=self._doc_frequency)[:len(terms) - required + 1]
+                    match = "(" + " OR ".join(f'"{term}"' for term in rarest) + f") AND ({match})"
+                rows = self._conn.execute(self._QUERY, (match, max(limit, candidates))).fetchall()
+
+        now = time.time()
+        results = []
+        for url, title, content, fetched_at, score in rows:
+            decay = 0.5 ** (max(0.0, now - fetched_at) / self.half_life_seconds)
+            words = {_stem(word) for word in _TOKEN.findall(f"{title} {content}".lower())}
+            coverage = sum(1 for term in terms if _stem(term) in words) / len(terms)
+            results.append({
+                "url": url,
+                "title": title,
+                "content": content,
+                "fetched_at": fetched_at,
+                "score": score * decay,
+                "coverage": coverage,
+            })
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:limit]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM source_docs").fetchone()[0]
+
+    def optimize(self):
+        """Merge FTS segments (worth running after large bulk loads)"""
+        with self._lock:
+            self._conn.execute("INSERT INTO source_fts(source_fts) VALUES ('optimize')")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def is_sufficient(results: List[Dict], min_results: int, min_coverage: float, max_age_hours: float) -> bool:
+    """
+    Whether local results are good enough to skip a web search
+
+    Requires at least `min_results` sources that each contain `min_coverage`
+    of the query terms and were fetched within `max_age_hours`.
+    """
+    cutoff = time.time() - max_age_hours * 3600
+    good = [r for r in results if r["coverage"] >= min_coverage and r["fetched_at"] >= cutoff]
+    return len(good) >= max(1, min_results)
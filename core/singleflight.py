@@ -0,0 +1,72 @@
+# Single-flight - coalesce identical in-flight async calls
+
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+from core.metrics import counter
+
+SINGLEFLIGHT_COALESCED = counter(
+    "singleflight_coalesced_total", "Calls that joined an identical in-flight upstream call", ["call"]
+)
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time; concurrent callers share its result
+
+    - A failure of the shared call is raised to every waiter.
+    - Cancelling one waiter (e.g. its client disconnected) only affects that
+      waiter; the shared call keeps running for the others.
+    - When the last waiter goes away, the shared call is cancelled.
+    - If the shared call itself is cancelled, every waiter sees CancelledError.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def _forget(self, key: Hashable, call: _Call, task: asyncio.Task):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every waiter left
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn(), or join an identical call already in flight
+
+        Args:
+            key: Identity of the call; equal keys share one upstream call
+            fn: Zero-argument coroutine factory, only invoked by the leader
+
+        Returns:
+            The shared result
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._forget(key, call, task))
+        else:
+            SINGLEFLIGHT_COALESCED.inc(call=self.name)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody is waiting any more; new callers start a fresh call
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
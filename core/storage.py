@@ -0,0 +1,310 @@
+# Profile storage backends
+# UserProfileCache (core/cache.py) delegates persistence to one of these
+
+from typing import Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from threading import Lock
+import json
+import os
+import queue
+import sqlite3
+import struct
+
+try:
+    import fcntl
+    import mmap
+except ImportError:  # Not available in every runtime (e.g. Workers); coherence is then off
+    fcntl = mmap = None
+from core.profile_record import pack, unpack
+
+
+class ProfileStore:
+    """Storage backend interface for user profiles"""
+
+    def save(self, profile_data: dict) -> int:
+        """Store a new profile and return its user_id"""
+        raise NotImplementedError
+
+    def save_many(self, profiles: List[dict]) -> List[int]:
+        """Store several new profiles at once and return their user_ids in order"""
+        return [self.save(profile_data) for profile_data in profiles]
+
+    def get(self, user_id: int) -> Optional[dict]:
+        """Return a profile or None if it does not exist"""
+        raise NotImplementedError
+
+    def get_versioned(self, user_id: int) -> Optional[Tuple[dict, int]]:
+        """Return (profile, version) or None; versions start at 1 and every update adds 1"""
+        raise NotImplementedError
+
+    def get_record_versioned(self, user_id: int) -> Optional[Tuple[object, int]]:
+        """Return (packed record, version) or None; see core/profile_record.py"""
+        versioned = self.get_versioned(user_id)
+        return (pack(versioned[0]), versioned[1]) if versioned is not None else None
+
+    def generation(self, user_id: int) -> int:
+        """
+        Counter that changes whenever user_id may have been updated by any
+        process sharing this store; in-process caches compare it before
+        serving a cached copy. Single-process backends never change it.
+        """
+        return 0
+
+    def update(self, user_id: int, profile_data: dict) -> bool:
+        """Replace an existing profile and bump its version; return False if it does not exist"""
+        raise NotImplementedError
+
+    def all(self) -> Dict[int, dict]:
+        """Return every stored profile"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Delete all profiles; IDs already handed out are not allocated again"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend"""
+
+
+class MemoryProfileStore(ProfileStore):
+    """Process-local storage of compact records (lost on restart)"""
+
+    def __init__(self):
+        self._profiles: Dict[int, Tuple[object, int]] = {}  # user_id -> (CompactProfile, version)
+        self._lock = Lock()
+        self._next_id = 1
+
+    def save(self, profile_data: dict) -> int:
+        record = pack(profile_data)
+        with self._lock:
+            user_id = self._next_id
+            self._profiles[user_id] = (record, 1)
+            self._next_id += 1
+            return user_id
+
+    def save_many(self, profiles: List[dict]) -> List[int]:
+        records = [pack(profile_data) for profile_data in profiles]
+        with self._lock:
+            first_id = self._next_id
+            for offset, record in enumerate(records):
+                self._profiles[first_id + offset] = (record, 1)
+            self._next_id += len(records)
+            return list(range(first_id, self._next_id))
+
+    def get(self, user_id: int) -> Optional[dict]:
+        versioned = self.get_versioned(user_id)
+        return versioned[0] if versioned is not None else None
+
+    def get_versioned(self, user_id: int) -> Optional[Tuple[dict, int]]:
+        entry = self._profiles.get(user_id)  # Single dict lookup: atomic, no lock needed
+        return (unpack(entry[0]), entry[1]) if entry is not None else None
+
+    def get_record_versioned(self, user_id: int) -> Optional[Tuple[object, int]]:
+        return self._profiles.get(user_id)  # Records are never mutated: shared as they are
+
+    def update(self, user_id: int, profile_data: dict) -> bool:
+        record = pack(profile_data)
+        with self._lock:
+            entry = self._profiles.get(user_id)
+            if entry is not None:
+                self._profiles[user_id] = (record, entry[1] + 1)
+                return True
+            return False
+
+    def all(self) -> Dict[int, dict]:
+        with self._lock:
+            entries = list(self._profiles.items())  # Copy references only; expand outside the lock
+        return {user_id: unpack(record) for user_id, (record, _) in entries}
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+class SharedGenerations:
+    """
+    Update counters shared by every process that opens the same file
+
+    The file holds `stripes` 64-bit counters and is mapped into memory:
+    reading a counter is a plain memory read with no lock or syscall, and
+    bumping one takes an exclusive flock (updates are rare).
+    """
+
+    _SLOT = struct.Struct("<Q")
+
+    def __init__(self, path: str, stripes: int = 256):
+        self.stripes = stripes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = stripes * self._SLOT.size
+        if os.fstat(self._fd).st_size < size:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size < size:
+                    os.ftruncate(self._fd, size)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    def current(self, key: int) -> int:
+        return self._SLOT.unpack_from(self._map, (key % self.stripes) * self._SLOT.size)[0]
+
+    def bump(self, key: int):
+        offset = (key % self.stripes) * self._SLOT.size
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            self._SLOT.pack_into(self._map, offset, self._SLOT.unpack_from(self._map, offset)[0] + 1)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+class SQLiteProfileStore(ProfileStore):
+    """
+    SQLite storage in WAL mode
+
+    Connections are pooled and reused; the SQL below is constant so
+    sqlite3's per-connection statement cache keeps every statement
+    prepared after first use. IDs come from AUTOINCREMENT, so they are
+    never reused, even across restarts.
+
+    Several worker processes can open the same file: inserts are
+    serialized by SQLite, so IDs are unique across processes, and WAL
+    readers never wait for writers. Updates bump a counter in a shared
+    `<path>-gen` file so other processes' read caches drop their copy.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS profiles (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 1
+        )
+    """
+    _INSERT = "INSERT INTO profiles (data) VALUES (?)"
+    _SELECT = "SELECT data, version FROM profiles WHERE user_id = ?"
+    _UPDATE = "UPDATE profiles SET data = ?, version = version + 1 WHERE user_id = ?"
+    _SELECT_ALL = "SELECT user_id, data FROM profiles"
+
+    def __init__(self, path: str, pool_size: int = 4, busy_timeout_ms: int = 5000):
+        self.path = path
+        self._busy_timeout_ms = busy_timeout_ms
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._connections = []
+        for _ in range(pool_size):
+            conn = self._connect()
+            self._connections.append(conn)
+            self._pool.put(conn)
+        with self._connection() as conn:
+            conn.execute(self._SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(profiles)")}
+            if "version" not in columns:  # Files created before profiles were versioned
+                try:
+                    conn.execute("ALTER TABLE profiles ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+                except sqlite3.OperationalError as e:
+                    if "duplicate column" not in str(e):  # Another worker migrated it first
+                        raise
+        self._generations = SharedGenerations(path + "-gen") if fcntl is not None and path != ":memory:" else None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            isolation_level=None,  # Autocommit; explicit BEGIN for multi-statement work
+            check_same_thread=False,  # Pooled across threads, one user at a time
+            cached_statements=64,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={self._busy_timeout_ms}")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def save(self, profile_data: dict) -> int:
+        payload = json.dumps(profile_data, default=str)
+        with self._connection() as conn:
+            return conn.execute(self._INSERT, (payload,)).lastrowid
+
+    def save_many(self, profiles: List[dict]) -> List[int]:
+        """All rows in one transaction: one WAL commit instead of one per profile"""
+        payloads = [json.dumps(profile_data, default=str) for profile_data in profiles]
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                user_ids = [conn.execute(self._INSERT, (payload,)).lastrowid for payload in payloads]
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        return user_ids
+
+    def get(self, user_id: int) -> Optional[dict]:
+        versioned = self.get_versioned(user_id)
+        return versioned[0] if versioned is not None else None
+
+    def get_versioned(self, user_id: int) -> Optional[Tuple[dict, int]]:
+        with self._connection() as conn:
+            row = conn.execute(self._SELECT, (user_id,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def update(self, user_id: int, profile_data: dict) -> bool:
+        payload = json.dumps(profile_data, default=str)
+        with self._connection() as conn:
+            updated = conn.execute(self._UPDATE, (payload, user_id)).rowcount > 0
+        if updated and self._generations is not None:
+            self._generations.bump(user_id)
+        return updated
+
+    def generation(self, user_id: int) -> int:
+        return self._generations.current(user_id) if self._generations is not None else 0
+
+    def all(self) -> Dict[int, dict]:
+        with self._connection() as conn:
+            rows = conn.execute(self._SELECT_ALL).fetchall()
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM profiles")  # sqlite_sequence is kept: IDs stay unique
+            conn.execute("COMMIT")
+        if self._generations is not None:
+            for stripe in range(self._generations.stripes):
+                self._generations.bump(stripe)
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+        self._connections.clear()
+        if self._generations is not None:
+            self._generations.close()
+            self._generations = None
+
+
+def create_profile_store(database_url: str) -> ProfileStore:
+    """
+    Build a storage backend from a URL
+
+    Args:
+        database_url: "memory://" or "sqlite:///path/to/file.db"
+
+    Returns:
+        A ProfileStore instance
+    """
+    if database_url.startswith("memory://"):
+        return MemoryProfileStore()
+    if database_url.startswith("sqlite:///"):
+        path = database_url[len("sqlite:///"):]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return SQLiteProfileStore(path)
+    raise ValueError(f"Unsupported database_url: {database_url}")
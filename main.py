@@ -1,15 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from api.v1.api import router as api_v1_router
+from core.clients import upstream
+from core.metrics import REGISTRY, CONTENT_TYPE
+from services.job_service import job_queue
+from services.prefetch_service import search_prefetcher
+from services.resume_service import shutdown_resume_workers
 from workers import WorkerEntrypoint
 import asgi
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Upstream clients, the PDF workers and the chat job workers start on
+    # first use (keeps cold starts light); release whatever was started at shutdown
+    try:
+        yield
+    finally:
+        await job_queue.aclose()
+        await search_prefetcher.aclose()
+        await upstream.aclose()
+        shutdown_resume_workers()
+
 app = FastAPI(
     title="StudyAbroadAi - Your AI Big Bro for Studying Abroad",
     description="A personalized AI advisor for Bangladeshi and global students planning to study abroad.",
     version="0.1.0",
     contact={"name": "StudyAbroadAi Team"},
     license_info={"name": "MIT"},
+    lifespan=lifespan,
 )
 
 # CORS Configuration
@@ -42,6 +62,11 @@ def home():
 def health_check():
     return {"status": "healthy", "service": "StudyAbroadAi backend"}
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics():
+    # Prometheus text format: per-stage latency, errors, tokens, cache stats
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 # ---------------------------------------------------------------------------
 # CLOUDFLARE WORKER ENTRYPOINT
 # 
@@ -14,6 +14,10 @@ PHONE_COUNTRY_CODES = [
     "+966", "+971", "+974", "+90", "+39", "+48", "+46", "+358", "+31", "+33"
 ]
 
+# Constant-time membership checks for validation
+COUNTRY_SET = frozenset(COUNTRIES)
+PHONE_COUNTRY_CODE_SET = frozenset(PHONE_COUNTRY_CODES)
+
 CURRENCY_CHOICES = Literal["BDT", "USD", "INR", "EUR", "MYR", "AUD", "CAD", "GBP"]
 
 class EducationEntry(BaseModel):
@@ -1,74 +1,31 @@
 # Chat Service - Multi-Agent Orchestration
 
-from typing import Dict
-# Using GitHub Models (o4-mini)
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import time
+# Using GitHub Models (o4-mini) through the shared client in core/clients.py
+from core.admission import Overloaded, llm_limiter
+from core.clients import get_llm
 from core.config import settings
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from services.profile_service import get_user_profile, format_profile_for_ai
-from services.search_service import search_web, format_search_results
-
-# Initialize GitHub Model
-try:
-    llm = ChatOpenAI(
-        model="gpt-4o-mini",
-        api_key=settings.github_token,
-        base_url="https://models.inference.ai.azure.com",
-        temperature=0.7,
-        max_tokens=None,
-        timeout=None,
-        max_retries=2,
-    )
-except Exception as e:
-    print(f"Warning: GitHub Model initialization failed: {e}")
-    llm = None
+from core.deadline import Deadline
+from core.metrics import CHAT_ROUTE_SECONDS, CHAT_STAGE_SECONDS, record_stage_error, record_token_usage, stage_timer
+from core.singleflight import SingleFlight
+from services.profile_service import get_user_profile_view, get_profile_context
+from services.prompt_service import assemble_user_prompt
+from services.routing_service import route_question
+from services.search_service import search_web, format_search_results, normalize_query
+from services.session_service import ChatSession, record_turn
+from services.usage_service import is_truncated, length_instruction, output_token_budget, record_usage
 
+SearchFn = Callable[..., Awaitable[Dict]]
 
-def generate_ai_response(prompt: str, system_instruction: str = None, max_tokens: int = 1000) -> str:
-    """
-    Call GitHub Model (o4-mini) for text generation
-    """
-    if not llm:
-        return "Error: GitHub Token not configured. Please add GITHUB_TOKEN to your .env file."
 
-    try:
-        messages = []
-        if system_instruction:
-            messages.append(SystemMessage(content=system_instruction))
-        
-        messages.append(HumanMessage(content=prompt))
-        
-        response = llm.invoke(messages)
-        return response.content
+# Identical concurrent prompts (same profile, search context and question) share one LLM call
+llm_flight = SingleFlight("llm")
 
-    except Exception as e:
-        return f"Error generating response: {str(e)}"
 
-
-def chat_with_multi_agent(user_id: int, question: str) -> Dict:
-    """
-    Multi-Agent Chat Orchestration
-    """
-    
-    # AGENT 1: Profile Agent - Get user context
-    profile = get_user_profile(user_id)
-    if not profile:
-        return {
-            "error": f"Profile not found for user_id: {user_id}. Please submit your profile first.",
-            "response": None,
-            "profile_used": None,
-            "search_results": None
-        }
-    
-    profile_context = format_profile_for_ai(profile)
-    
-    # AGENT 2: Search Agent - Web search for current information
-    search_query = f"study abroad {question} {' '.join(profile.get('preferred_countries', []))}"
-    search_data = search_web(search_query, max_results=5)
-    search_context = format_search_results(search_data)
-    
-    # AGENT 3: Response Agent - Build "Perfect Prompt"
-    system_prompt = """You are an elite Study Abroad Consultant and Career Strategist. Your goal is to provide highly personalized, data-driven, and actionable advice to students aspiring to study overseas. 
+SYSTEM_PROMPT = """You are an elite Study Abroad Consultant and Career Strategist. Your goal is to provide highly personalized, data-driven, and actionable advice to students aspiring to study overseas.
 
 You have access to the student's full academic profile, financial constraints, and resume details. You also have real-time web search results to supplement your knowledge.
 
@@ -86,32 +43,352 @@ You have access to the student's full academic profile, financial constraints, a
 - Use headers to structure the advice.
 """
 
-    user_prompt = f"""
-Student Profile Context:
-{profile_context}
 
-Latest Web Search Intelligence:
-{search_context}
+def _build_messages(prompt: str, system_instruction: str = None) -> List:
+    # Imported on first use: langchain stays off the cold-start path
+    from langchain_core.messages import HumanMessage, SystemMessage
 
-Student's Inquiry:
-{question}
+    messages = []
+    if system_instruction:
+        messages.append(SystemMessage(content=system_instruction))
+    messages.append(HumanMessage(content=prompt))
+    return messages
+
+
+async def generate_ai_response(prompt: str, system_instruction: str = None, max_tokens: int = 1000, timeout: Optional[float] = None,
+                               user_id: Optional[int] = None, endpoint: str = "ask") -> str:
+    """
+    Call GitHub Model (o4-mini) for text generation without blocking the event loop
+
+    Args:
+        max_tokens: Longest answer the model may generate
+        timeout: Seconds the call may take (None = client default)
+        user_id: Whose usage the call is accounted to
+        endpoint: Label for budget and truncation metrics
+
+    Raises:
+        Overloaded: Every LLM slot is busy and the wait queue is full or too slow
+    """
+    llm = get_llm()
+    if not llm:
+        return "Error: GitHub Token not configured. Please add GITHUB_TOKEN to your .env file."
+
+    try:
+        messages = _build_messages(prompt, system_instruction)
+        prompt_chars = len(prompt) + len(system_instruction or "")
+
+        async def invoke():
+            async with llm_limiter.slot():
+                started = time.monotonic()
+                response = await llm.ainvoke(messages, max_tokens=max_tokens,
+                                             on_hedge=lambda: record_usage(user_id, endpoint, None, prompt_chars, 0))
+                seconds = time.monotonic() - started
+            # Upstream totals, speed and truncation: once per upstream call, not once per coalesced caller
+            usage = getattr(response, "usage_metadata", None)
+            record_token_usage(usage, prompt_chars)
+            record_usage(None, endpoint, usage, prompt_chars, len(response.content), seconds, is_truncated(response))
+            return response
+
+        key = hashlib.sha256(f"{system_instruction}\0{prompt}\0{max_tokens}".encode()).digest()
+        with CHAT_STAGE_SECONDS.time(stage="llm"):
+            response = await asyncio.wait_for(llm_flight.do(key, invoke), timeout=timeout)
+        # Every caller, leader or coalesced, is charged for the answer it received
+        record_usage(user_id, endpoint, getattr(response, "usage_metadata", None), prompt_chars, len(response.content))
+        return response.content
+
+    except asyncio.TimeoutError:
+        record_stage_error("llm", "DeadlineExceeded")
+        return "Error generating response: the AI model did not answer in time. Please try again."
+    except Overloaded:
+        record_stage_error("llm", "Overloaded")
+        raise
+    except Exception as e:
+        record_stage_error("llm", e)
+        return f"Error generating response: {str(e)}"
+
+
+async def stream_ai_response(prompt: str, system_instruction: str = None, max_tokens: Optional[int] = None,
+                             user_id: Optional[int] = None, endpoint: str = "stream") -> AsyncIterator[str]:
+    """
+    Stream GitHub Model output token by token
+
+    Closing this generator (e.g. when the client disconnects) closes the
+    upstream stream, so abandoned requests stop consuming tokens.
+
+    Args:
+        max_tokens: Longest answer the model may generate (None = model default)
+        user_id: Whose usage the stream is accounted to
+
+    Yields:
+        Text chunks as they arrive from the model
+    """
+    llm = get_llm()
+    if not llm:
+        raise RuntimeError("GitHub Token not configured. Please add GITHUB_TOKEN to your .env file.")
+
+    prompt_chars = len(prompt) + len(system_instruction or "")
+    stream = llm.astream(_build_messages(prompt, system_instruction), max_tokens=max_tokens,
+                         on_hedge=lambda: record_usage(user_id, endpoint, None, prompt_chars, 0))
+    usage = None
+    truncated = False
+    completion_chars = 0
+    try:
+        with stage_timer("llm"):
+            async for chunk in stream:
+                if chunk.usage_metadata:
+                    usage = chunk.usage_metadata
+                truncated = truncated or is_truncated(chunk)
+                if chunk.content:
+                    completion_chars += len(chunk.content)
+                    yield chunk.content
+        record_token_usage(usage, prompt_chars)
+        # No generation speed sample: the stream's duration depends on how fast the client reads
+        record_usage(user_id, endpoint, usage, prompt_chars, completion_chars, truncated=truncated)
+    finally:
+        await stream.aclose()
+
+
+async def prepare_chat_context(user_id: int, question: str, deadline: Optional[Deadline] = None,
+                               search_fn: Optional[SearchFn] = None, session: Optional[ChatSession] = None) -> Dict:
+    """
+    Run the Profile and Search agents and build the prompts for the Response agent
+
+    The routing service decides whether the question needs a web search
+    and at what depth. Search may use `settings.search_budget_fraction` of
+    the deadline. If it runs over, the prompt is built from the profile
+    context alone.
+
+    Args:
+        user_id: The unique identifier
+        question: The student's question
+        deadline: Request deadline (defaults to settings.chat_deadline_seconds from now)
+        search_fn: Replacement for search_web (e.g. one shared across a batch)
+        session: Conversation whose summary and recent turns are added to the prompt
+
+    Returns:
+        Dictionary with prompts and metadata, or with "error" set if the profile is missing
+    """
+
+    # AGENT 1: Profile Agent - Get user context
+    with stage_timer("profile"):
+        profile = get_user_profile_view(user_id)
+        if not profile:
+            record_stage_error("profile", "ProfileNotFound")
+            return {
+                "error": f"Profile not found for user_id: {user_id}. Please submit your profile first.",
+            }
+
+        profile_context, resume_context = get_profile_context(user_id, profile)
+    deadline = deadline or Deadline(settings.chat_deadline_seconds)
+
+    # AGENT 2: Search Agent - Web search for current information, only as deep as the question needs
+    route = route_question(question)["route"]
+    search_query = f"study abroad {question} {' '.join(profile.get('preferred_countries', []))}"
+    search_timed_out = False
+    search_data = {"answer": "", "sources": []}
+    if route != "none":
+        try:
+            with stage_timer("search"):
+                search_data = await asyncio.wait_for(
+                    (search_fn or search_web)(search_query, max_results=5, search_depth=route),
+                    timeout=deadline.share(settings.search_budget_fraction),
+                )
+        except asyncio.TimeoutError:
+            # Out of search budget: answer from the profile alone
+            search_timed_out = True
+        except Overloaded:
+            # Search capacity exhausted: same fallback, without spending quota
+            record_stage_error("search", "Overloaded")
+            search_timed_out = True
+    if route == "none":
+        search_context = "Not needed for this question; answer from the student's profile and your expertise."
+    else:
+        search_context = format_search_results(search_data, question, profile.get("preferred_countries") or [])
+
+    # AGENT 3: Response Agent - Build "Perfect Prompt" within the token budget
+    history_context = session.history_context() if session else ""
+    user_prompt = assemble_user_prompt(profile_context, resume_context, search_context, question,
+                                       history_context=history_context,
+                                       fit_history=session.history_context if session else None)
 
-Based on the above, provide your expert consultation.
-"""
-    
-    # Generate AI response
-    ai_response = generate_ai_response(user_prompt, system_instruction=system_prompt, max_tokens=1000)
-    
     return {
-        "response": ai_response,
+        "system_prompt": SYSTEM_PROMPT,
+        "user_prompt": user_prompt,
+        "user_id": user_id,
+        "question": question,
+        "session": session,
+        "deadline": deadline,
+        "route": route,
         "profile_used": {
             "name": profile.get("full_name"),
             "preferred_countries": profile.get("preferred_countries"),
-            "budget_range": f"{profile.get('budget_min_bdt', 0):,} - {profile.get('budget_max_bdt', 0):,} BDT"
+            "budget_range": f"{profile.get('budget_min_bdt') or 0:,} - {profile.get('budget_max_bdt') or 0:,} BDT"
         },
         "search_results": {
             "query": search_query,
             "answer": search_data.get("answer", ""),
-            "sources_count": len(search_data.get("sources", []))
+            "sources_count": len(search_data.get("sources", [])),
+            "timed_out": search_timed_out,
+            "route": route
+        }
+    }
+
+
+async def chat_with_multi_agent(user_id: int, question: str, search_fn: Optional[SearchFn] = None,
+                                session: Optional[ChatSession] = None, endpoint: str = "ask") -> Dict:
+    """
+    Multi-Agent Chat Orchestration
+
+    Every upstream call is awaited, so a single worker can keep many
+    slow chat requests in flight at once. The whole pipeline shares one
+    deadline; the LLM gets whatever the search stage left over, and an
+    answer length budget for the endpoint that fits in that time.
+
+    Args:
+        endpoint: ask, batch or job; selects the output token budget
+    """
+    context = await prepare_chat_context(user_id, question, search_fn=search_fn, session=session)
+    if context.get("error"):
+        return {
+            "error": context["error"],
+            "response": None,
+            "profile_used": None,
+            "search_results": None
         }
+
+    # Generate AI response
+    seconds_left = context["deadline"].remaining()
+    max_tokens = output_token_budget(endpoint, user_id, seconds_left)
+    ai_response = await generate_ai_response(
+        context["user_prompt"],
+        system_instruction=context["system_prompt"] + length_instruction(max_tokens),
+        max_tokens=max_tokens,
+        timeout=seconds_left,
+        user_id=user_id,
+        endpoint=endpoint,
+    )
+    if session and not ai_response.startswith("Error"):
+        record_turn(session, question, ai_response)
+    CHAT_ROUTE_SECONDS.observe(context["deadline"].elapsed(), route=context["route"])
+
+    return {
+        "response": ai_response,
+        "profile_used": context["profile_used"],
+        "search_results": context["search_results"]
     }
+
+
+async def chat_batch(items: List[Tuple[int, str]], concurrency: int = None) -> AsyncIterator[Dict]:
+    """
+    Batch Multi-Agent Chat Orchestration
+
+    Runs many (user_id, question) pairs with at most `concurrency` in flight.
+    Each distinct search query is fetched once and shared by every item
+    that needs it. A failing item yields an error result and does not stop
+    the batch. Closing the generator cancels outstanding work.
+
+    Args:
+        items: (user_id, question) pairs
+        concurrency: Max items in flight (defaults to settings.batch_max_concurrency)
+
+    Yields:
+        One result per item, in completion order, tagged with its input index
+    """
+    concurrency = max(1, concurrency or settings.batch_max_concurrency)
+    shared_searches: Dict[Tuple[str, int, str], asyncio.Future] = {}
+
+    async def shared_search(query: str, max_results: int = 5, search_depth: str = "advanced") -> Dict:
+        key = (normalize_query(query), max_results, search_depth)
+        future = shared_searches.get(key)
+        if future is None:
+            future = shared_searches[key] = asyncio.ensure_future(
+                search_web(query, max_results=max_results, search_depth=search_depth)
+            )
+        # Shielded: one item running out of search budget must not cancel it for the others
+        return await asyncio.shield(future)
+
+    async def run_item(index: int, user_id: int, question: str) -> Dict:
+        failed = {"response": None, "profile_used": None, "search_results": None}
+        if not question or not question.strip():
+            result = {**failed, "error": "Question cannot be empty"}
+        else:
+            try:
+                result = await chat_with_multi_agent(user_id, question.strip(), search_fn=shared_search, endpoint="batch")
+            except Exception as e:
+                result = {**failed, "error": f"Error processing item: {str(e)}"}
+        return {"index": index, "user_id": user_id, "question": question, **result}
+
+    results: "asyncio.Queue[Dict]" = asyncio.Queue()
+    pending = iter(enumerate(items))
+
+    async def worker():
+        for index, (user_id, question) in pending:
+            await results.put(await run_item(index, user_id, question))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(concurrency, len(items)))]
+    try:
+        for _ in range(len(items)):
+            yield await results.get()
+    finally:
+        for task in workers + list(shared_searches.values()):
+            task.cancel()
+
+
+async def stream_chat_with_multi_agent(context: Dict) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Streaming Multi-Agent Chat Orchestration
+
+    The stream shares the request deadline: each chunk must arrive
+    before it expires, so a stalled upstream ends in an "error" event
+    instead of holding the connection and its LLM slot.
+
+    Args:
+        context: Output of prepare_chat_context() for a profile that exists
+
+    Yields:
+        (event, data) pairs: one "metadata" event, then "token" events,
+        then a final "done" or "error" event
+
+    Raises:
+        Overloaded: Before the first event, if no LLM slot is available
+    """
+    deadline = context["deadline"]
+    # The slot is held until the stream ends; taking it before the first
+    # event lets callers turn an overload into an HTTP error up front
+    async with llm_limiter.slot():
+        yield "metadata", {
+            "profile_used": context["profile_used"],
+            "search_results": context["search_results"]
+        }
+
+        max_tokens = output_token_budget("stream", context["user_id"], deadline.remaining())
+        tokens = stream_ai_response(
+            context["user_prompt"],
+            system_instruction=context["system_prompt"] + length_instruction(max_tokens),
+            max_tokens=max_tokens,
+            user_id=context["user_id"],
+        )
+        answer = []
+        try:
+            while True:
+                try:
+                    token = await asyncio.wait_for(tokens.__anext__(), timeout=deadline.remaining())
+                except StopAsyncIteration:
+                    break
+                answer.append(token)
+                yield "token", {"content": token}
+        except asyncio.TimeoutError:
+            record_stage_error("llm", "DeadlineExceeded")
+            yield "error", {"error": "Error generating response: the AI model did not answer in time. Please try again."}
+            return
+        except Exception as e:
+            yield "error", {"error": f"Error generating response: {str(e)}"}
+            return
+        finally:
+            # Propagate early close (client disconnect) to the upstream stream
+            await tokens.aclose()
+
+    if context.get("session"):
+        record_turn(context["session"], context["question"], "".join(answer))
+    CHAT_ROUTE_SECONDS.observe(context["deadline"].elapsed(), route=context["route"])
+    yield "done", {}
@@ -0,0 +1,210 @@
+# Job Service - chat questions answered in the background, results fetched by long-polling
+# POST /chat/jobs returns at once; a bounded pool of in-process workers runs
+# chat_with_multi_agent, so no client connection is held open for the whole
+# search + LLM round trip.
+
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+import asyncio
+import secrets
+import time
+from core.admission import Overloaded
+from core.config import settings
+from core.metrics import counter, gauge, histogram
+from services.chat_service import chat_with_multi_agent
+from services.session_service import ChatSession
+
+CHAT_JOBS = counter("chat_jobs_total", "Chat jobs by outcome", ["outcome"])
+CHAT_JOB_WAIT_SECONDS = histogram("chat_job_wait_seconds", "Time a chat job spent queued before a worker picked it up")
+CHAT_JOB_RUN_SECONDS = histogram("chat_job_run_seconds", "Time a worker spent answering a chat job")
+
+
+class ChatJob:
+    """One queued question and, once finished, its result (status: queued, running, done or failed)"""
+
+    __slots__ = ("job_id", "user_id", "question", "session", "idempotency_key", "status", "result", "error",
+                 "created_at", "started_at", "finished_at", "finished")
+
+    def __init__(self, user_id: int, question: str, session: Optional[ChatSession], idempotency_key: Optional[str]):
+        self.job_id = secrets.token_urlsafe(16)
+        self.user_id = user_id
+        self.question = question
+        self.session = session
+        self.idempotency_key = idempotency_key
+        self.status = "queued"
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.finished = asyncio.Event()
+
+    def describe(self) -> Dict:
+        """Public view of the job"""
+        now = time.monotonic()
+        started = self.started_at or now
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "wait_seconds": round(started - self.created_at, 3),
+            "run_seconds": round((self.finished_at or now) - self.started_at, 3) if self.started_at else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class ChatJobQueue:
+    """
+    Bounded FIFO of chat jobs served by `workers` asyncio tasks
+
+    - At most `max_queued` jobs wait; beyond that submit() raises Overloaded.
+    - A (user_id, idempotency key) pair maps to one job for as long as the
+      job is kept, so a retried submit returns the original job.
+    - Finished jobs are kept for `result_ttl` seconds, then dropped.
+
+    Workers are started on the first submit, inside the running event loop.
+    """
+
+    def __init__(self, workers: int, max_queued: int, result_ttl: float):
+        self.workers = max(1, workers)
+        self.max_queued = max(1, max_queued)
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, ChatJob] = {}
+        self._by_key: Dict[Tuple[int, str], str] = {}
+        self._finished: Deque[ChatJob] = deque()  # In finishing order, for expiry
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks = []
+        self.running = 0
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    def _expire(self, now: float):
+        """Drop finished jobs older than the TTL"""
+        while self._finished and now - self._finished[0].finished_at > self.result_ttl:
+            job = self._finished.popleft()
+            self._jobs.pop(job.job_id, None)
+            if job.idempotency_key is not None:
+                self._by_key.pop((job.user_id, job.idempotency_key), None)
+
+    def find(self, user_id: int, idempotency_key: str) -> Optional[ChatJob]:
+        """The job already submitted under this user's idempotency key, if it is still kept"""
+        self._expire(time.monotonic())
+        job = self._jobs.get(self._by_key.get((user_id, idempotency_key)))
+        if job is not None:
+            CHAT_JOBS.inc(outcome="deduplicated")
+        return job
+
+    def submit(self, user_id: int, question: str, session: Optional[ChatSession] = None,
+               idempotency_key: Optional[str] = None) -> Tuple[ChatJob, bool]:
+        """
+        Queue a question
+
+        Returns:
+            (job, created) - created is False when the idempotency key
+            matched an existing job
+
+        Raises:
+            Overloaded: If the queue is full
+        """
+        self._start()
+        self._expire(time.monotonic())  # Jobs nobody polls still have to go
+        if idempotency_key is not None:
+            existing = self.find(user_id, idempotency_key)
+            if existing is not None:
+                return existing, False
+        if self.queue_depth() >= self.max_queued:
+            CHAT_JOBS.inc(outcome="rejected")
+            raise Overloaded("Chat job queue is full", self.retry_after())
+
+        job = ChatJob(user_id, question, session, idempotency_key)
+        self._jobs[job.job_id] = job
+        if idempotency_key is not None:
+            self._by_key[(user_id, idempotency_key)] = job.job_id
+        self._queue.put_nowait(job)
+        return job, True
+
+    def retry_after(self) -> float:
+        """Rough seconds until a queued job would start"""
+        return settings.chat_deadline_seconds * (self.queue_depth() + 1) / self.workers / 2
+
+    def get(self, job_id: str) -> Optional[ChatJob]:
+        self._expire(time.monotonic())
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: ChatJob, timeout: float) -> ChatJob:
+        """Long-poll: return once the job has finished or `timeout` seconds passed"""
+        if timeout > 0 and not job.finished.is_set():
+            try:
+                await asyncio.wait_for(job.finished.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.monotonic()
+            CHAT_JOB_WAIT_SECONDS.observe(job.started_at - job.created_at)
+            self.running += 1
+            try:
+                result = await chat_with_multi_agent(job.user_id, job.question, session=job.session, endpoint="job")
+                if result.get("error"):
+                    job.status, job.error = "failed", result["error"]
+                else:
+                    job.status, job.result = "done", result
+            except Overloaded as e:
+                job.status, job.error = "failed", f"{e}; retry in {e.retry_after}s"
+            except asyncio.CancelledError:
+                job.status, job.error = "failed", "Server shutting down"
+                raise
+            except Exception as e:
+                job.status, job.error = "failed", f"Error: {e}"
+            finally:
+                self.running -= 1
+                CHAT_JOB_RUN_SECONDS.observe(time.monotonic() - job.started_at)
+                CHAT_JOBS.inc(outcome="succeeded" if job.status == "done" else "failed")
+                self._finish(job)
+
+    def _finish(self, job: ChatJob):
+        job.finished_at = time.monotonic()
+        job.session = None  # Nothing else needs it; let the session be evicted normally
+        self._expire(job.finished_at)
+        self._finished.append(job)
+        job.finished.set()
+
+    async def aclose(self):
+        """Stop the workers; jobs still queued or running end as failed"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for job in list(self._jobs.values()):
+            if job.status == "queued":
+                job.status, job.error = "failed", "Server shutting down"
+                self._finish(job)
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+
+    def stats(self) -> Dict:
+        return {"queued": self.queue_depth(), "running": self.running, "kept": len(self._jobs)}
+
+
+# Singleton instance
+job_queue = ChatJobQueue(
+    workers=settings.chat_job_workers,
+    max_queued=settings.chat_job_max_queue,
+    result_ttl=settings.chat_job_result_ttl_seconds,
+)
+
+gauge("chat_job_queue_depth", "Chat jobs waiting for a worker", function=job_queue.queue_depth)
+gauge("chat_jobs_running", "Chat jobs being answered", function=lambda: job_queue.running)
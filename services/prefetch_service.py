@@ -0,0 +1,176 @@
+# Prefetch Service - speculative web searches when a profile is submitted
+# A new student's first questions are predictable (costs, scholarships, visas,
+# universities for their preferred countries), so their searches are run in
+# the background ahead of time. Results land in the search cache and the
+# local source index, where the first /chat/ask finds them.
+
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+import asyncio
+import time
+from core.admission import Overloaded, RateLimited, UserRateLimiter, search_limiter
+from core.config import settings
+from core.metrics import counter, gauge
+from services.search_service import PREFETCH_LIVE_LOOKUPS, get_source_index, normalize_query, prefetch_search
+
+PREFETCH_QUERIES = counter("search_prefetch_queries_total", "Prefetch queries by outcome", ["outcome"])
+
+# Budget bands on budget_max_bdt: (upper bound, phrase used in the templates)
+BUDGET_BANDS = ((1_000_000, "affordable"), (3_000_000, "mid-range"), (float("inf"), ""))
+
+
+def budget_band(profile: dict) -> str:
+    budget = profile.get("budget_max_bdt") or profile.get("budget_min_bdt")
+    if not budget:
+        return ""
+    return next(phrase for limit, phrase in BUDGET_BANDS if budget < limit)
+
+
+def field_of_study(profile: dict) -> str:
+    """Field of the most recent education entry that has one"""
+    for entry in reversed(profile.get("education") or []):
+        field = entry.get("field") if isinstance(entry, dict) else None
+        if field:
+            return field
+    return ""
+
+
+def prefetch_queries(profile: dict) -> List[str]:
+    """Template queries for a profile, one set per (country, field, budget band)"""
+    templates = [t.strip() for t in settings.search_prefetch_templates.split("|") if t.strip()]
+    field = field_of_study(profile)
+    budget = budget_band(profile)
+    queries = []
+    for country in (profile.get("preferred_countries") or [])[:settings.search_prefetch_max_countries]:
+        for template in templates:
+            query = template.format(country=country, field=field, budget=budget)
+            queries.append(" ".join(query.split()))
+    return queries
+
+
+class SearchPrefetcher:
+    """
+    Background queue of speculative searches
+
+    - A query (after normalization) is fetched at most once per
+      `dedupe_seconds`, however many students would trigger it.
+    - One worker drains the queue, and only while live searches leave
+      spare capacity: fewer than `max_share` of the search slots in use and
+      nobody queued for one. It also paces itself with its own token
+      bucket of `rate_per_minute` upstream calls; a rate of 0 or less
+      turns prefetching off.
+    - At most `max_pending` queries wait; the rest are dropped.
+    """
+
+    def __init__(self, rate_per_minute: float, max_share: float, max_pending: int, dedupe_seconds: float):
+        self.rate_per_minute = rate_per_minute
+        self.max_share = max_share
+        self.max_pending = max_pending
+        self.dedupe_seconds = dedupe_seconds
+        self._bucket = UserRateLimiter(rate_per_minute, burst=1, max_keys=1)
+        self._pending: Deque[str] = deque()
+        self._seen: "OrderedDict[str, float]" = OrderedDict()  # Normalized query -> time queued
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.counts: Dict[str, int] = {"queued": 0, "deduplicated": 0, "dropped": 0, "fetched": 0, "already_known": 0, "failed": 0}
+
+    def _count(self, outcome: str):
+        self.counts[outcome] += 1
+        PREFETCH_QUERIES.inc(outcome=outcome)
+
+    def schedule(self, profile: dict) -> int:
+        """Queue the profile's template queries; returns how many were new"""
+        if not settings.search_prefetch_enabled or self.rate_per_minute <= 0 or not settings.search_index_path:
+            return 0  # Without the local index, prefetched results would rarely match a live question
+        now = time.monotonic()
+        while self._seen and now - next(iter(self._seen.values())) > self.dedupe_seconds:
+            self._seen.popitem(last=False)
+
+        added = 0
+        for query in prefetch_queries(profile):
+            key = normalize_query(query)
+            if key in self._seen:
+                self._count("deduplicated")
+                continue
+            if len(self._pending) >= self.max_pending:
+                self._count("dropped")
+                continue
+            self._seen[key] = now
+            self._pending.append(query)
+            self._count("queued")
+            added += 1
+        if added:
+            self._ensure_worker()
+            self._wakeup.set()
+        return added
+
+    def _ensure_worker(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._worker())
+
+    def _has_spare_capacity(self) -> bool:
+        return (
+            search_limiter.queue_depth() == 0
+            and search_limiter.in_flight < search_limiter.max_concurrency * self.max_share
+        )
+
+    async def _worker(self):
+        # The first open creates the SQLite index file: keep it off the event loop
+        if await asyncio.to_thread(get_source_index) is None:
+            while self._pending:
+                self._pending.popleft()
+                self._count("dropped")
+            return
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if not self._has_spare_capacity():
+                await asyncio.sleep(settings.search_prefetch_idle_poll_seconds)
+                continue
+            try:
+                self._bucket.check("prefetch")
+            except RateLimited as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+
+            query = self._pending.popleft()
+            try:
+                fetched = await prefetch_search(query, settings.search_prefetch_max_results, settings.search_prefetch_depth)
+                self._count("fetched" if fetched else "already_known")
+            except Overloaded as e:
+                self._pending.appendleft(query)  # Live traffic took the slots; try again later
+                await asyncio.sleep(e.retry_after)
+            except Exception:
+                self._count("failed")
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict:
+        """Prefetch outcomes plus how often live searches were answered by prefetched sources"""
+        hits = int(PREFETCH_LIVE_LOOKUPS.value(result="hit"))
+        misses = int(PREFETCH_LIVE_LOOKUPS.value(result="miss"))
+        return {
+            **self.counts,
+            "pending": len(self._pending),
+            "live_hits": hits,
+            "live_misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        }
+
+
+# Singleton instance
+search_prefetcher = SearchPrefetcher(
+    rate_per_minute=settings.search_prefetch_rate_per_minute,
+    max_share=settings.search_prefetch_max_search_share,
+    max_pending=settings.search_prefetch_max_pending,
+    dedupe_seconds=settings.search_prefetch_dedupe_hours * 3600,
+)
+
+gauge("search_prefetch_pending", "Prefetch queries waiting for spare search capacity", function=lambda: search_prefetcher.stats()["pending"])
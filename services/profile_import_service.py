@@ -0,0 +1,226 @@
+# Profile Import Service - Bulk profile import from an NDJSON stream
+# Each line is one profile with the same fields as the /profile/submit form.
+# Lines are validated and saved in batches (one store transaction per batch),
+# and the per-line results are yielded as soon as their batch is saved, so
+# memory stays bounded by the batch size whatever the upload size.
+
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import json
+from pydantic import ValidationError
+from core.config import settings
+from schemas.profile import UserInfoCreate, COUNTRY_SET, PHONE_COUNTRY_CODE_SET
+from services.profile_service import format_name, save_user_profiles
+
+
+class RecordError(ValueError):
+    """A line that cannot be imported; the message is reported for that line"""
+
+
+@lru_cache(maxsize=4096)
+def _normalize_country(raw: str) -> Optional[str]:
+    """Canonical country name, or None if it is not in COUNTRIES (memoized: imports repeat a few values)"""
+    name = raw.strip().title()
+    return name if name in COUNTRY_SET else None
+
+
+def _countries(value, field: str, default: Optional[List[str]] = None) -> List[str]:
+    """Comma-separated string or list -> validated country names"""
+    if isinstance(value, str):
+        items = value.split(",")
+    elif isinstance(value, list):
+        items = value
+    elif value is None:
+        items = []
+    else:
+        raise RecordError(f"{field} must be a string or a list")
+    countries = []
+    invalid = []
+    for item in items:
+        if not isinstance(item, str):
+            raise RecordError(f"{field} must contain strings")
+        if not item.strip():
+            continue
+        country = _normalize_country(item)
+        if country is None:
+            invalid.append(item.strip().title())
+        else:
+            countries.append(country)
+    if invalid:
+        raise RecordError(f"Invalid countries: {', '.join(invalid)}")
+    return countries or list(default or [])
+
+
+def _text(record: dict, field: str) -> Optional[str]:
+    value = record.get(field)
+    if value is not None and not isinstance(value, str):
+        raise RecordError(f"{field} must be a string")
+    return value
+
+
+def validate_record(record) -> dict:
+    """
+    Validate one import line the way /profile/submit validates its form
+
+    Args:
+        record: Parsed JSON object with the submit form's field names
+            (countries may be lists or comma-separated strings; `education`
+            may be a list or `education_json` a JSON string)
+
+    Returns:
+        Profile dictionary ready to be stored
+
+    Raises:
+        RecordError: With the message reported for this line
+    """
+    if not isinstance(record, dict):
+        raise RecordError("Each line must be a JSON object")
+
+    full_name_raw = _text(record, "full_name_raw")
+    email = _text(record, "email")
+    if not full_name_raw or not email:
+        raise RecordError("full_name_raw and email are required")
+
+    preferred_countries = _countries(record.get("preferred_countries"), "preferred_countries")
+    if not preferred_countries:
+        raise RecordError("At least one preferred country is required")
+    nationality = _countries(record.get("nationality"), "nationality", ["Bangladesh"])
+    current_living_country = _countries(record.get("current_living_country"), "current_living_country", ["Bangladesh"])
+
+    phone_country_code = _text(record, "phone_country_code") if "phone_country_code" in record else "+880"
+    if phone_country_code and phone_country_code not in PHONE_COUNTRY_CODE_SET:
+        raise RecordError("Invalid phone country code")
+    phone_number = _text(record, "phone_number")
+    phone_number = phone_number.strip() if phone_number else None
+
+    education = record.get("education")
+    if education is None:
+        education_json = _text(record, "education_json") or ""
+        try:
+            education = json.loads(education_json) if education_json.strip() else []
+        except json.JSONDecodeError:
+            raise RecordError("Invalid education JSON")
+
+    try:
+        profile = UserInfoCreate(
+            full_name=format_name(full_name_raw),
+            father_name=format_name(_text(record, "father_name_raw")),
+            mother_name=format_name(_text(record, "mother_name_raw")),
+            email=email.lower().strip(),
+            phone_country_code=phone_country_code,
+            phone_number=phone_number,
+            full_phone=f"{phone_country_code}{phone_number}" if phone_country_code and phone_number else None,
+            nationality=nationality,
+            current_living_country=current_living_country,
+            education=education,
+            preferred_countries=preferred_countries,
+            budget_min_bdt=record.get("budget_min_bdt"),
+            budget_max_bdt=record.get("budget_max_bdt"),
+            preferred_currency=record.get("preferred_currency") or "BDT",
+            preferred_intake=record.get("preferred_intake"),
+            resume_filename=record.get("resume_filename"),
+            resume_text=record.get("resume_text"),
+        )
+    except ValidationError as e:
+        raise RecordError("; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+        ))
+    return profile.dict()
+
+
+def _import_batch(lines: List[Tuple[int, Optional[bytes]]]) -> List[Dict]:
+    """Validate a batch and save the valid profiles in one transaction"""
+    results: List[Dict] = []
+    valid: List[dict] = []
+    for line_number, raw in lines:
+        try:
+            if raw is None:
+                raise RecordError(f"Line longer than {settings.profile_bulk_max_line_bytes} bytes")
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                raise RecordError("Invalid JSON")
+            valid.append(validate_record(record))
+            results.append({"line": line_number})
+        except RecordError as e:
+            results.append({"line": line_number, "error": str(e)})
+
+    user_ids = iter(save_user_profiles(valid)) if valid else iter(())
+    for result in results:
+        if "error" not in result:
+            result["user_id"] = next(user_ids)
+    return results
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a byte stream into numbered non-blank lines
+
+    At most `max_line_bytes` of a line are buffered; a longer line is
+    skipped and yielded as None so it can be reported.
+    """
+    buffer = b""
+    line_number = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline < 0:
+                if not oversized:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        buffer, oversized = b"", True
+                break
+            line_number += 1
+            if oversized:
+                oversized = False
+                yield line_number, None
+            else:
+                line = buffer + chunk[start:newline]
+                buffer = b""
+                if len(line) > max_line_bytes:
+                    yield line_number, None
+                elif line.strip():
+                    yield line_number, line
+            start = newline + 1
+    if oversized or buffer.strip():
+        line_number += 1
+        yield line_number, None if oversized else buffer
+
+
+async def import_profiles(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict]:
+    """
+    Import profiles from an NDJSON byte stream
+
+    Args:
+        chunks: Request body chunks
+
+    Yields:
+        {"line", "user_id"} or {"line", "error"} per non-blank line, in
+        order, then a final {"done", "imported", "failed"} summary
+    """
+    imported = failed = 0
+    batch: List[Tuple[int, Optional[bytes]]] = []
+
+    async def flush():
+        nonlocal imported, failed
+        results = await asyncio.to_thread(_import_batch, batch)
+        batch.clear()
+        for result in results:
+            if "error" in result:
+                failed += 1
+            else:
+                imported += 1
+        return results
+
+    async for line in iter_lines(chunks, settings.profile_bulk_max_line_bytes):
+        batch.append(line)
+        if len(batch) >= settings.profile_bulk_batch_size:
+            for result in await flush():
+                yield result
+    if batch:
+        for result in await flush():
+            yield result
+    yield {"done": True, "imported": imported, "failed": failed}
@@ -1,8 +1,59 @@
 # Profile Service - Manages user profile storage and retrieval
 
-from typing import Optional
-from core.cache import profile_cache
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from threading import Lock
+import hashlib
+import json
+from core.cache import TTLCache, profile_cache
+from core.config import settings
+from core.profile_record import RESUME_DIGEST_KEY
 from schemas.profile import UserInfoCreate
+from services.prompt_service import summarize_resume
+
+# user_id -> (profile dict it was rendered from, rendered context)
+_PROFILE_CONTEXT_CACHE_SIZE = 1024
+_profile_contexts: "OrderedDict[int, Tuple[dict, str]]" = OrderedDict()
+_profile_contexts_lock = Lock()
+
+# Digest key used before the digest became internal; still present in older stores
+_LEGACY_DIGEST_KEY = "resume_digest"
+
+# (store epoch, user_id, version, fields) -> serialized /profile/get body; a new version is a new key
+_profile_bodies = TTLCache(
+    ttl=settings.profile_body_cache_ttl_seconds,
+    max_entries=settings.profile_body_cache_size,
+    max_bytes=settings.profile_body_cache_max_bytes,
+)
+
+
+def _clear_derived_caches():
+    _profile_bodies.clear()
+    with _profile_contexts_lock:
+        _profile_contexts.clear()
+
+
+profile_cache.on_clear(_clear_derived_caches)
+
+
+def format_name(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return name
+    name = name.strip().lower()
+    prefixes = ["md.", "mr.", "mrs.", "dr.", "prof."]
+    for prefix in prefixes:
+        name = name.replace(prefix.replace(".", ""), prefix)
+    name = name.title()
+    name = name.replace("Md.", "Md. ").replace("Mr.", "Mr. ").replace("Mrs.", "Mrs. ")
+    return name.strip()
+
+
+def normalize_country_input(value: str) -> List[str]:
+    """Handle comma-separated or single country input"""
+    if not value:
+        return []
+    items = [item.strip().title() for item in value.split(",") if item.strip()]
+    return items
 
 
 def save_user_profile(profile: UserInfoCreate) -> int:
@@ -16,10 +67,28 @@ def save_user_profile(profile: UserInfoCreate) -> int:
         user_id: Unique identifier for this profile
     """
     profile_data = profile.dict()
+    # Compact resume digest, computed once and reused on every chat turn;
+    # stored under a private key so /profile/get never returns it
+    profile_data[RESUME_DIGEST_KEY] = summarize_resume(profile_data.get("resume_text"))
     user_id = profile_cache.save_profile(profile_data)
     return user_id
 
 
+def save_user_profiles(profiles: List[dict]) -> List[int]:
+    """
+    Save many validated profiles in one store transaction (bulk import)
+    
+    Args:
+        profiles: Profile dictionaries, as produced by UserInfoCreate
+        
+    Returns:
+        user_ids in the same order
+    """
+    for profile_data in profiles:
+        profile_data[RESUME_DIGEST_KEY] = summarize_resume(profile_data.get("resume_text"))
+    return profile_cache.save_profiles(profiles)
+
+
 def get_user_profile(user_id: int) -> Optional[dict]:
     """
     Retrieve a user profile by ID
@@ -33,6 +102,69 @@ def get_user_profile(user_id: int) -> Optional[dict]:
     return profile_cache.get_profile(user_id)
 
 
+def get_user_profile_view(user_id: int):
+    """
+    Read-only view of a user profile for prompt building
+
+    Supports .get() and [] like the dict from get_user_profile(), but
+    only expands the fields that are read (a stored resume stays
+    compressed unless resume_text is asked for). Must not be mutated.
+
+    Args:
+        user_id: The unique identifier
+
+    Returns:
+        The view, or None if not found
+    """
+    return profile_cache.get_profile_record(user_id)
+
+
+def _is_internal(key: str) -> bool:
+    """Keys the service stores alongside a profile but never returns"""
+    return key.startswith("_") or key == _LEGACY_DIGEST_KEY
+
+
+def render_user_profile(user_id: int, fields: Optional[Tuple[str, ...]] = None) -> Optional[Tuple[str, bytes]]:
+    """
+    Serialized /profile/get body for a profile, cached per profile version
+
+    The ETag is a hash of the body, so it stays valid across restarts and
+    store resets: an ID handed out again after a reset cannot match the
+    previous owner's ETag.
+    
+    Args:
+        user_id: The unique identifier
+        fields: Sorted profile keys to include, or None for all of them
+        
+    Returns:
+        (ETag, JSON body) or None if not found
+        
+    Raises:
+        ValueError: If a requested field does not exist
+    """
+    epoch = profile_cache.epoch  # Read before the profile, so a racing clear() cannot file it under the new epoch
+    versioned = profile_cache.get_profile_versioned(user_id)
+    if versioned is None:
+        return None
+    profile, version = versioned
+
+    key = (epoch, user_id, version, fields)
+    body, _ = _profile_bodies.get(key)
+    if body is None:
+        profile = {key: value for key, value in profile.items() if not _is_internal(key)}
+        if fields is not None:
+            unknown = [field for field in fields if field not in profile]
+            if unknown:
+                raise ValueError(f"Unknown profile fields: {', '.join(unknown)}")
+            profile = {key: value for key, value in profile.items() if key in fields}
+        body = json.dumps(
+            {"user_id": user_id, "profile": profile},
+            ensure_ascii=False, separators=(",", ":"), default=str,
+        ).encode("utf-8")
+        _profile_bodies.set(key, body)
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"', body
+
+
 def format_profile_for_ai(profile: dict) -> str:
     """
     Format user profile data for AI consumption
@@ -55,8 +187,8 @@ def format_profile_for_ai(profile: dict) -> str:
     
     budget_info = ""
     if profile.get('budget_min_bdt') or profile.get('budget_max_bdt'):
-        min_budget = profile.get('budget_min_bdt', 0)
-        max_budget = profile.get('budget_max_bdt', 0)
+        min_budget = profile.get('budget_min_bdt') or 0
+        max_budget = profile.get('budget_max_bdt') or 0
         budget_info = f"\n- Budget Range: {min_budget:,} - {max_budget:,} BDT/year"
     
     profile_context = f"""
@@ -69,8 +201,55 @@ Student Profile:
 {budget_info}
 - Preferred Study Destinations: {', '.join(profile.get('preferred_countries', ['N/A']))}
 - Preferred Intake: {profile.get('preferred_intake', 'Flexible')}
-
-Resume Context:
-{profile.get('resume_text', 'No resume provided.')}
 """
     return profile_context.strip()
+
+
+def format_resume_for_ai(profile: dict) -> str:
+    """
+    Compact resume context for AI consumption
+
+    Uses the digest stored at save time; profiles saved before digests
+    existed are summarized on the fly.
+
+    Args:
+        profile: Profile dictionary
+
+    Returns:
+        Resume digest, or "" if no resume was uploaded
+    """
+    digest = profile.get(RESUME_DIGEST_KEY)
+    if digest is None:
+        digest = profile.get(_LEGACY_DIGEST_KEY)
+    if digest is None:
+        digest = summarize_resume(profile.get('resume_text'))
+    return digest
+
+
+def get_profile_context(user_id: int, profile: dict) -> Tuple[str, str]:
+    """
+    Rendered (profile, resume) context for a profile, memoized per user
+
+    The memo is keyed on the profile object itself, so an updated profile
+    (a new record in the cache) is re-rendered automatically.
+
+    Args:
+        user_id: The unique identifier
+        profile: View returned by get_user_profile_view() (or a profile dict)
+
+    Returns:
+        (profile context, resume context)
+    """
+    with _profile_contexts_lock:
+        cached = _profile_contexts.get(user_id)
+        if cached is not None and cached[0] is profile:
+            _profile_contexts.move_to_end(user_id)
+            return cached[1]
+
+    rendered = (format_profile_for_ai(profile), format_resume_for_ai(profile))
+    with _profile_contexts_lock:
+        _profile_contexts[user_id] = (profile, rendered)
+        _profile_contexts.move_to_end(user_id)
+        while len(_profile_contexts) > _PROFILE_CONTEXT_CACHE_SIZE:
+            _profile_contexts.popitem(last=False)
+    return rendered
@@ -0,0 +1,176 @@
+# Prompt Service - token-budgeted prompt assembly
+
+from typing import Callable, Dict, List, Optional
+import re
+from core.config import settings
+
+# Rough size of one token in characters for English prose (no tokenizer dependency)
+CHARS_PER_TOKEN = 4
+
+_SECTION_HINTS = re.compile(
+    r"\b(education|experience|skills?|projects?|publications?|research|awards?|honou?rs?|certifications?|"
+    r"gpa|cgpa|ielts|toefl|gre|gmat|sat|internship|volunteer|languages?|achievements?|leadership)\b",
+    re.IGNORECASE,
+)
+_NOISE_LINE = re.compile(r"^(page\s*\d+(\s*of\s*\d+)?|[\W_]+|\d+)$", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a string"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens, preferring a line or word boundary"""
+    max_chars = max(0, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    boundary = max(cut.rfind("\n"), cut.rfind(" "))
+    if boundary > max_chars // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + " ..."
+
+
+def summarize_resume(resume_text: str, max_tokens: int = None) -> str:
+    """
+    Build a compact resume digest (computed once when a profile is saved)
+
+    Collapses whitespace, drops page numbers and duplicate lines, then keeps
+    the most informative lines (section headers, lines with dates, scores or
+    resume keywords) in their original order until the token budget is met.
+
+    Args:
+        resume_text: Raw text extracted from the PDF
+        max_tokens: Digest size (defaults to settings.resume_digest_tokens)
+
+    Returns:
+        The digest, or "" if there is no resume
+    """
+    if not resume_text:
+        return ""
+    max_tokens = max_tokens or settings.resume_digest_tokens
+
+    lines: List[str] = []
+    seen = set()
+    for raw in resume_text.splitlines():
+        line = " ".join(raw.split())
+        key = line.lower()
+        if len(line) < 3 or _NOISE_LINE.match(line) or key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+
+    if estimate_tokens("\n".join(lines)) <= max_tokens:
+        return "\n".join(lines)
+
+    def score(line: str) -> float:
+        value = 0.0
+        if _SECTION_HINTS.search(line):
+            value += 3
+        if re.search(r"\d", line):
+            value += 1.5  # Dates, GPAs, test scores
+        if len(line) < 40 and line[:1].isupper():
+            value += 1  # Likely a heading or a title line
+        return value + min(len(line), 200) / 200
+
+    ranked = sorted(range(len(lines)), key=lambda i: score(lines[i]), reverse=True)
+    budget = max_tokens * CHARS_PER_TOKEN
+    keep = set()
+    for i in ranked:
+        cost = len(lines[i]) + 1
+        if cost > budget:
+            continue
+        keep.add(i)
+        budget -= cost
+    return "\n".join(lines[i] for i in sorted(keep))
+
+
+def allocate_budget(sections: Dict[str, str], shares: Dict[str, float], total_tokens: int,
+                    fitters: Optional[Dict[str, Callable[[int], str]]] = None) -> Dict[str, str]:
+    """
+    Fit named sections into a total token budget
+
+    Each section is guaranteed its share of the budget; whatever a section
+    does not use is handed to the sections that still need more, in the
+    order they were given.
+
+    Args:
+        sections: Section name -> text
+        shares: Section name -> fraction of the budget
+        total_tokens: Budget for all sections together
+        fitters: Section name -> fit(max_tokens), used instead of cutting
+            the text's tail when that section is over its allocation
+
+    Returns:
+        Section name -> text truncated to its allocation
+    """
+    sizes = {name: estimate_tokens(text) for name, text in sections.items()}
+    allocation = {name: min(sizes[name], int(total_tokens * shares.get(name, 0))) for name in sections}
+    spare = total_tokens - sum(allocation.values())
+    for name in sections:
+        if spare <= 0:
+            break
+        extra = min(spare, sizes[name] - allocation[name])
+        allocation[name] += extra
+        spare -= extra
+    fitters = fitters or {}
+    return {
+        name: fitters[name](allocation[name]) if name in fitters and sizes[name] > allocation[name]
+        else truncate_to_tokens(text, allocation[name])
+        for name, text in sections.items()
+    }
+
+
+def assemble_user_prompt(profile_context: str, resume_context: str, search_context: str, question: str,
+                         token_budget: int = None, history_context: str = "",
+                         fit_history: Optional[Callable[[int], str]] = None) -> str:
+    """
+    Build the user prompt within a token budget
+
+    The question is always kept whole; the profile, resume, search and
+    conversation history sections share the rest according to the
+    prompt_*_share settings.
+
+    Args:
+        fit_history: Renders the history within a token budget (e.g.
+            ChatSession.history_context), so an over-budget history loses
+            its oldest turns rather than its newest
+
+    Returns:
+        The user prompt
+    """
+    token_budget = token_budget or settings.prompt_token_budget
+    fixed = estimate_tokens(question) + 60  # Headings and instructions
+    fitted = allocate_budget(
+        {"profile": profile_context, "resume": resume_context, "search": search_context, "history": history_context},
+        {
+            "profile": settings.prompt_profile_share,
+            "resume": settings.prompt_resume_share,
+            "search": settings.prompt_search_share,
+            "history": settings.prompt_history_share,
+        },
+        max(0, token_budget - fixed),
+        fitters={"history": fit_history} if fit_history else None,
+    )
+
+    history = f"""
+Conversation So Far:
+{fitted["history"]}
+""" if fitted["history"] else ""
+
+    return f"""
+Student Profile Context:
+{fitted["profile"]}
+
+Resume Context:
+{fitted["resume"] or "No resume provided."}
+
+Latest Web Search Intelligence:
+{fitted["search"]}
+{history}
+Student's Inquiry:
+{question}
+
+Based on the above, provide your expert consultation.
+"""
@@ -1,39 +1,129 @@
 from fastapi import UploadFile, HTTPException
-import fitz  # PyMuPDF
-import io
+from typing import TYPE_CHECKING, Optional
+import asyncio
+import sys
+from core.config import settings
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+_READ_CHUNK_BYTES = 64 * 1024
+
+# PDF extraction is CPU-bound and holds the GIL, so it runs in worker processes
+_executor: Optional["Executor"] = None
+
+
+def _get_executor() -> "Executor":
+    """
+    Worker pool for PDF extraction, created on first upload
+
+    Worker processes are started with forkserver (or spawn where that is
+    missing), never fork: forking a server that already runs threads can
+    copy locks held by other threads. Where processes are unavailable
+    (e.g. the Workers runtime) extraction falls back to a thread pool.
+    """
+    global _executor
+    if _executor is None:
+        # Only needed once a resume is uploaded
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+        try:
+            if sys.platform == "emscripten":
+                raise NotImplementedError("no subprocesses in this runtime")
+            import multiprocessing
+
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _executor = ProcessPoolExecutor(max_workers=settings.resume_parse_workers, mp_context=context)
+        except (ImportError, NotImplementedError, OSError, ValueError):
+            _executor = ThreadPoolExecutor(max_workers=settings.resume_parse_workers, thread_name_prefix="resume")
+    return _executor
+
+
+def shutdown_resume_workers():
+    """Stop the worker pool (called at application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def extract_pdf_text(content: bytes, max_pages: int) -> str:
+    """
+    Extract text from PDF bytes, page by page (runs in a worker process)
+
+    Args:
+        content: Raw PDF bytes
+        max_pages: Pages after this one are ignored
+
+    Returns:
+        Extracted text (may be empty for image-only PDFs)
+    """
+    import fitz  # PyMuPDF
+
+    pages = []
+    with fitz.open(stream=content, filetype="pdf") as pdf_document:
+        for page_num in range(min(pdf_document.page_count, max_pages)):
+            extracted = pdf_document[page_num].get_text()
+            if extracted:
+                pages.append(extracted)
+    return "\n".join(pages).strip()
+
+
+def format_size(num_bytes: int) -> str:
+    """Human-readable size, e.g. 5 MB, 1.5 MB or 512 KB"""
+    if num_bytes >= 1024 * 1024:
+        return f"{num_bytes / (1024 * 1024):.3g} MB"
+    if num_bytes >= 1024:
+        return f"{num_bytes / 1024:.3g} KB"
+    return f"{num_bytes} bytes"
+
+
+def upload_too_large(max_bytes: int) -> HTTPException:
+    """413 for a resume (or the form carrying it) over the size cap"""
+    return HTTPException(status_code=413, detail=f"Resume is too large. Maximum size is {format_size(max_bytes)}.")
+
+
+async def _read_capped(file: UploadFile, max_bytes: int) -> bytes:
+    """Read an upload in chunks, rejecting it as soon as it exceeds max_bytes"""
+    chunks = []
+    total = 0
+    while True:
+        chunk = await file.read(_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise upload_too_large(max_bytes)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
 
 async def parse_resume(file: UploadFile) -> str:
     """
     Parse text from a PDF resume using PyMuPDF (edge-compatible).
-    
+
+    The upload is size-capped and only the first `resume_max_pages` pages
+    are read. Extraction runs in a worker pool, off the event loop.
+
     Args:
         file: The uploaded PDF file.
-        
+
     Returns:
         Extracted text from the PDF.
     """
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a PDF.")
-    
+
+    content = await _read_capped(file, settings.resume_max_bytes)
+
     try:
-        content = await file.read()
-        text = ""
-        
-        # Open PDF with PyMuPDF (fitz)
-        pdf_document = fitz.open(stream=content, filetype="pdf")
-        
-        for page_num in range(pdf_document.page_count):
-            page = pdf_document[page_num]
-            extracted = page.get_text()
-            if extracted:
-                text += extracted + "\n"
-        
-        pdf_document.close()
-                    
-        if not text.strip():
-             raise HTTPException(status_code=400, detail="Could not extract text from the PDF. It might be an image-based PDF.")
-             
-        return text.strip()
-        
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(_get_executor(), extract_pdf_text, content, settings.resume_max_pages)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error parsing resume: {str(e)}")
+
+    if not text:
+        raise HTTPException(status_code=400, detail="Could not extract text from the PDF. It might be an image-based PDF.")
+
+    return text
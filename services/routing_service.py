@@ -0,0 +1,74 @@
+# Routing Service - decide how much web search a question needs
+# A keyword-weighted scorer: no model, no network, microseconds per question.
+
+from typing import Dict, List, Tuple
+import re
+from core.config import settings
+
+ROUTES = ("none", "basic", "advanced")
+
+# (pattern, weight): positive weights point at facts that live on the web and
+# change over time, negative ones at questions the profile alone can answer
+_SIGNALS: List[Tuple[re.Pattern, float]] = [(re.compile(p, re.IGNORECASE), w) for p, w in (
+    # Time-sensitive or numeric facts
+    (r"\b(deadlines?|intakes?|application (window|date)s?|last date)\b", 2.0),
+    (r"\b(tuition|fees?|costs?|affordable|cheap\w*|expensive|living expenses?|rent|salary|salaries|stipends?|blocked account)\b", 1.5),
+    (r"\b(scholarships?|funding|grants?|assistantships?|daad|erasmus|chevening|fulbright)\b", 1.5),
+    (r"\b(visas?|permits?|immigration|embassy|biometrics|sevis|i-20|post[- ]study work|psw|part[- ]time|graduate route|dependants?)\b", 1.5),
+    (r"\b(rankings?|ranked|acceptance rate|admission rates?|qs|times higher)\b", 1.5),
+    (r"\b(requirements?|eligib(le|ility)|minimum|cut-?off|ielts|toefl|gre|gmat|duolingo|pte)\b", 1.0),
+    (r"\b(latest|current(ly)?|new|recent(ly)?|this year|next year|now|update[sd]?|chang(e|es|ed)|news|polic(y|ies)|rules?|caps?)\b", 1.0),
+    (r"\b20\d\d\b", 1.5),
+    # Asking for specific options to be listed or compared
+    (r"\b(which|list|best|top|compare|comparison|vs\.?|versus|options|programs?|programmes?|mba|universit(y|ies)|colleges?)\b", 0.75),
+    # "US" only in capitals, so the pronoun "us" does not count as a country
+    (r"\b(usa|uk|canad\w*|german\w*|australia\w*|france|french|ital\w*|netherlands|dutch|swed\w*|finland|finnish|japan\w*|korea\w*|malaysia\w*|ireland|irish|new zealand)\b"
+     r"|\bu\.s\.(a\.?)?|(?-i:\bUS\b)", 0.5),
+    # Advice about the student's own materials and plans
+    (r"\b(sop|statement of purpose|personal statement|motivation letter|essays?|cover letter)\b", -2.5),
+    (r"\b(resume|cv|lor|recommendation letters?|letters? of recommendation|portfolio)\b", -2.0),
+    (r"\b(improve|strengthen|polish|write|draft|structure|review|feedback|prepare|practice|interview)\b", -1.0),
+    (r"\b(my (profile|background|chances|gpa|cgpa|experience|strengths?|weakness(es)?)|am i|should i)\b", -0.75),
+    (r"\b(motivat\w*|stress|confiden\w*|homesick\w*|time management|study habits?)\b", -1.5),
+)]
+
+
+def score_question(question: str) -> Tuple[float, List[str]]:
+    """
+    How strongly a question depends on current web information
+
+    Returns:
+        (score, matched signal words)
+    """
+    score = 0.0
+    matched = []
+    for pattern, weight in _SIGNALS:
+        # Each distinct word counts, up to twice per signal group
+        found = list(dict.fromkeys(m.group(0).lower() for m in pattern.finditer(question)))[:2]
+        score += weight * len(found)
+        matched.extend(found)
+    return score, matched
+
+
+def route_question(question: str) -> Dict:
+    """
+    Pick a search route for a question
+
+    Below settings.search_route_basic_threshold the question is answered
+    from the profile alone; at or above search_route_advanced_threshold it
+    gets an advanced-depth search; in between, a basic-depth search.
+
+    Args:
+        question: The student's question
+
+    Returns:
+        Dictionary with route ("none", "basic" or "advanced"), score and signals
+    """
+    score, signals = score_question(question)
+    if not settings.search_routing_enabled or score >= settings.search_route_advanced_threshold:
+        route = "advanced"
+    elif score >= settings.search_route_basic_threshold:
+        route = "basic"
+    else:
+        route = "none"
+    return {"route": route, "score": round(score, 2), "signals": signals}
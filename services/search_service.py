@@ -1,86 +1,445 @@
 # Search Service - Tavily web search integration
 
-from typing import List, Dict
+from collections import Counter, OrderedDict
+from typing import Iterable, List, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import asyncio
+import math
+import re
+import time
+from core.admission import Overloaded, search_limiter
+from core.cache import TTLCache
+from core.clients import get_search_client
 from core.config import settings
+from core.metrics import counter, gauge, record_stage_error
+from core.search_index import SourceIndex, is_sufficient, query_terms, stemmed_words
+from core.singleflight import SingleFlight
 
+# Search result cache (fresh for TTL, then served stale while one refresh runs)
+search_cache = TTLCache(
+    ttl=settings.search_cache_ttl_seconds,
+    stale_ttl=settings.search_cache_stale_seconds,
+    max_entries=settings.search_cache_max_entries,
+    max_bytes=settings.search_cache_max_bytes,
+)
 
-def search_web(query: str, max_results: int = 5) -> Dict:
+# Every fetched source is kept in a local BM25 index, searched before Tavily
+# (opened on first search, not at import)
+_source_index: Optional[SourceIndex] = None
+SEARCH_INDEX_LOOKUPS = counter("search_index_lookups_total", "Local index lookups by outcome", ["result"])
+
+# Identical concurrent searches share one upstream call
+search_flight = SingleFlight("search")
+
+# Keys currently being refreshed in the background, and the tasks doing it
+_refreshing: Set[Tuple[str, int, str]] = set()
+_refresh_tasks: Set[asyncio.Task] = set()
+
+# Upstream latency accounting, used to estimate time saved by the cache
+_upstream_calls = 0
+_upstream_seconds = 0.0
+
+# URLs fetched by speculative prefetch (services/prefetch_service.py), to
+# tell whether live searches are being answered with prefetched sources
+_PREFETCHED_URLS_MAX = 50000
+_prefetched_urls: "OrderedDict[str, None]" = OrderedDict()
+PREFETCH_LIVE_LOOKUPS = counter(
+    "search_prefetch_live_lookups_total", "Live searches by whether prefetched sources answered them", ["result"]
+)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so equivalent queries share a cache entry"""
+    return " ".join(re.sub(r"[^\w\s+#.-]", " ", query.lower()).split())
+
+
+async def _search_tavily(query: str, max_results: int, search_depth: str) -> Dict:
+    """Call Tavily and reshape the response; raises on any failure"""
+    global _upstream_calls, _upstream_seconds
+    client = get_search_client()
+
+    # Perform search on the shared keep-alive connection pool
+    async with search_limiter.slot():
+        started = time.perf_counter()
+        response = await client.search(
+            query=query,
+            search_depth=search_depth,  # "basic" is faster, "advanced" more thorough
+            max_results=max_results,
+            include_answer=True,  # Get a summarized answer
+            include_raw_content=False  # Don't need full page content
+        )
+    _upstream_calls += 1
+    _upstream_seconds += time.perf_counter() - started
+
+    # Extract relevant information
+    results = {
+        "answer": response.get("answer", ""),
+        "sources": []
+    }
+
+    # Format sources
+    for result in response.get("results", []):
+        results["sources"].append({
+            "title": result.get("title", ""),
+            "url": result.get("url", ""),
+            "snippet": result.get("content", "")
+        })
+
+    source_index = get_source_index()
+    if source_index is not None and results["sources"]:
+        sources = [{"url": s["url"], "title": s["title"], "content": s["snippet"]} for s in results["sources"]]
+        await asyncio.to_thread(source_index.add_many, sources)
+
+    return results
+
+
+def get_source_index() -> Optional[SourceIndex]:
+    """The local source index, or None when disabled"""
+    global _source_index
+    if _source_index is None and settings.search_index_path:
+        _source_index = SourceIndex(
+            settings.search_index_path,
+            half_life_hours=settings.search_index_half_life_hours,
+            retention_hours=settings.search_index_retention_hours,
+            max_docs=settings.search_index_max_docs,
+        )
+    return _source_index
+
+
+async def _search_local(query: str, max_results: int) -> Optional[Dict]:
+    """Answer from the local index if it has enough fresh, relevant sources"""
+    source_index = get_source_index()
+    if source_index is None:
+        return None
+    hits = await asyncio.to_thread(
+        source_index.search, query, max_results, min_coverage=settings.search_index_min_coverage
+    )
+    if not is_sufficient(
+        hits,
+        min_results=min(settings.search_index_min_results, max_results),
+        min_coverage=settings.search_index_min_coverage,
+        max_age_hours=settings.search_index_max_age_hours,
+    ):
+        SEARCH_INDEX_LOOKUPS.inc(result="miss")
+        return None
+    SEARCH_INDEX_LOOKUPS.inc(result="hit")
+    return {
+        "answer": "",
+        "sources": [{"title": h["title"], "url": h["url"], "snippet": h["content"]} for h in hits],
+        "origin": "local",
+    }
+
+
+async def _refresh(key: Tuple[str, int, str], query: str, max_results: int, search_depth: str):
+    try:
+        search_cache.set(key, await search_flight.do(key, lambda: _search_tavily(query, max_results, search_depth)))
+    except Exception:
+        pass  # Keep serving the stale entry until it expires
+    finally:
+        _refreshing.discard(key)
+
+
+def _schedule_refresh(key: Tuple[str, int, str], query: str, max_results: int, search_depth: str):
+    """Start one background refresh per key"""
+    if key in _refreshing:
+        return
+    _refreshing.add(key)
+    task = asyncio.create_task(_refresh(key, query, max_results, search_depth))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def search_web(query: str, max_results: int = 5, search_depth: str = "advanced") -> Dict:
     """
-    Search the web using Tavily API
-    
+    Search the web using Tavily API (non-blocking, cached)
+
+    Lookup order: result cache, then the local source index, then Tavily.
+
     Args:
         query: Search query string
         max_results: Maximum number of results to return
-        
+        search_depth: Tavily depth, "basic" or "advanced"
+
     Returns:
         Dictionary with search results and sources
+
+    Raises:
+        Overloaded: Tavily capacity is exhausted (other failures are returned as a search error)
     """
+    key = (normalize_query(query), max_results, search_depth)
+    cached, state = search_cache.get(key)
+    if state == "stale":
+        _schedule_refresh(key, query, max_results, search_depth)
+    if cached is not None:
+        _count_prefetch_use(cached)
+        return cached
+
     try:
-        from tavily import TavilyClient
-        
-        # Initialize Tavily client
-        client = TavilyClient(api_key=settings.tavily_api_key)
-        
-        # Perform search
-        response = client.search(
-            query=query,
-            search_depth="advanced",  # or "basic" for faster results
-            max_results=max_results,
-            include_answer=True,  # Get a summarized answer
-            include_raw_content=False  # Don't need full page content
-        )
-        
-        # Extract relevant information
-        results = {
-            "answer": response.get("answer", ""),
-            "sources": []
-        }
-        
-        # Format sources
-        for result in response.get("results", []):
-            results["sources"].append({
-                "title": result.get("title", ""),
-                "url": result.get("url", ""),
-                "snippet": result.get("content", "")
-            })
-        
+        local = await _search_local(query, max_results)
+        if local is not None:
+            _count_prefetch_use(local)
+            return local
+        results = await search_flight.do(key, lambda: _search_tavily(query, max_results, search_depth))
+        search_cache.set(key, results)
+        _count_prefetch_use(None)
         return results
-        
-    except ImportError:
-        # Fallback if tavily-python not installed
-        return {
-            "answer": "Tavily search not available. Please install: pip install tavily-python",
-            "sources": []
-        }
+
+    except Overloaded:
+        raise
     except Exception as e:
+        record_stage_error("search", e)
         return {
             "answer": f"Search error: {str(e)}",
             "sources": []
         }
 
 
-def format_search_results(search_data: Dict) -> str:
+def _count_prefetch_use(results: Optional[Dict]):
+    """Count a live search as a prefetch hit if any source it returned was prefetched"""
+    if not _prefetched_urls:
+        return
+    hit = results is not None and any(source.get("url") in _prefetched_urls for source in results.get("sources", []))
+    PREFETCH_LIVE_LOOKUPS.inc(result="hit" if hit else "miss")
+
+
+async def prefetch_search(query: str, max_results: int, search_depth: str) -> bool:
+    """
+    Warm the result cache and the local index for a query nobody has asked yet
+
+    Skips the upstream call when the cache or the local index can already
+    answer it. Failures propagate (Overloaded included) so the caller can
+    back off; nothing is recorded as a search stage error.
+
+    Returns:
+        True if Tavily was called
+    """
+    key = (normalize_query(query), max_results, search_depth)
+    cached, _ = search_cache.get(key)
+    if cached is not None or await _search_local(query, max_results) is not None:
+        return False
+    results = await search_flight.do(key, lambda: _search_tavily(query, max_results, search_depth))
+    search_cache.set(key, results)
+    for source in results["sources"]:
+        _prefetched_urls[source["url"]] = None
+        _prefetched_urls.move_to_end(source["url"])
+    while len(_prefetched_urls) > _PREFETCHED_URLS_MAX:
+        _prefetched_urls.popitem(last=False)
+    return True
+
+
+def search_cache_stats() -> Dict:
+    """
+    Search cache counters plus an estimate of upstream time saved
+
+    Returns:
+        Dictionary with hit/miss/eviction counts and latency figures
+    """
+    stats = search_cache.stats()
+    avg_upstream = _upstream_seconds / _upstream_calls if _upstream_calls else 0.0
+    stats["upstream_calls"] = _upstream_calls
+    stats["avg_upstream_seconds"] = round(avg_upstream, 3)
+    stats["estimated_seconds_saved"] = round((stats["hits"] + stats["stale_hits"]) * avg_upstream, 3)
+    stats["refreshes_in_flight"] = len(_refreshing)
+    return stats
+
+
+gauge("search_cache_entries", "Entries in the search result cache", function=lambda: search_cache.stats()["entries"])
+gauge("search_cache_bytes", "Approximate size of the search result cache", function=lambda: search_cache.stats()["bytes"])
+counter(
+    "search_cache_lookups_total", "Search cache lookups by result", ["result"],
+    function=lambda: {(result,): search_cache.stats()[key] for result, key in (("hit", "hits"), ("stale", "stale_hits"), ("miss", "misses"))},
+)
+counter("search_cache_evictions_total", "Search cache LRU evictions", function=lambda: search_cache.stats()["evictions"])
+
+
+# Query parameters that only track the click, not what the page shows
+_TRACKING_PARAMS = frozenset(("fbclid", "gclid", "msclkid", "ref", "ref_src", "source", "mc_cid", "mc_eid"))
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_SHINGLE_WORDS = 3
+_MAX_SENTENCE_CHARS = 300  # Longer "sentences" (unpunctuated page text) are cut at a word boundary
+
+SEARCH_CONTEXT_SOURCES = counter(
+    "search_context_sources_total", "Search sources kept, dropped as duplicates or dropped as less relevant", ["outcome"]
+)
+
+
+def canonical_url(url: str) -> str:
+    """
+    URL with presentation-only differences removed, for spotting the same page twice
+
+    Drops the scheme, "www.", the fragment, tracking parameters and a
+    trailing slash, and sorts the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in _TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return f"{host}{path}" + (f"?{urlencode(query)}" if query else "")
+
+
+def _split_sentences(text: str) -> List[str]:
+    sentences = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if len(sentence) > _MAX_SENTENCE_CHARS:
+            sentence = sentence[:_MAX_SENTENCE_CHARS].rsplit(" ", 1)[0] + "..."
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _shingles(words: List[str]) -> Set[tuple]:
+    """Word 3-grams; empty for texts shorter than one, which are too short to call near-duplicates"""
+    return set(zip(*(words[i:] for i in range(_SHINGLE_WORDS))))
+
+
+def _relevance_terms(question: str, countries: Iterable[str]) -> Dict[str, float]:
+    """Stemmed question terms (weight 1) and country terms (settings.search_country_weight)"""
+    weights = {}
+    for country in countries:
+        for term in stemmed_words(" ".join(query_terms(country))):
+            weights[term] = settings.search_country_weight
+    for term in stemmed_words(" ".join(query_terms(question))):
+        weights[term] = 1.0
+    return weights
+
+
+def _score(words: List[str], weights: Dict[str, float], idf: Dict[str, float]) -> float:
+    """Saturating term-frequency overlap, so one repeated word cannot dominate"""
+    counts = Counter(word for word in words if word in weights)
+    return sum(weights[term] * idf[term] * count / (count + 1.0) for term, count in counts.items())
+
+
+def process_search_results(search_data: Dict, question: str, countries: Iterable[str] = (),
+                           max_chars: int = None, max_sources: int = None) -> Dict:
+    """
+    Deduplicate, rank and compress search sources for the prompt
+
+    1. Sources whose canonical URL was already seen, or whose word shingles
+       overlap an earlier source by settings.search_dedupe_similarity or
+       more, are dropped (the earlier, higher-ranked one is kept).
+    2. The rest are scored by overlap with the question and the preferred
+       countries, terms weighted by how few sources contain them; sources
+       with no overlap are dropped unless nothing overlaps at all.
+    3. Sentences are picked across the best `max_sources` sources, most
+       relevant first, until `max_chars` is used, and shown in their
+       original order within each source.
+
+    Args:
+        search_data: Dictionary from search_web()
+        question: The student's question
+        countries: The student's preferred countries
+        max_chars: Character budget for extracted text (defaults to settings.search_context_max_chars)
+        max_sources: Sources kept at most (defaults to settings.search_context_max_sources)
+
+    Returns:
+        search_data with "sources" replaced: each kept source's "snippet"
+        holds its extracted sentences
+    """
+    max_chars = max_chars or settings.search_context_max_chars
+    max_sources = max_sources or settings.search_context_max_sources
+    sources = search_data.get("sources") or []
+
+    # 1. Near-duplicates
+    unique = []  # (source, sentences, stemmed words per sentence, stemmed title words)
+    seen_urls, seen_shingles = set(), []
+    for source in sources:
+        url = canonical_url(source.get("url", ""))
+        sentences = _split_sentences(source.get("snippet", ""))
+        sentence_words = [stemmed_words(sentence) for sentence in sentences]
+        title_words = stemmed_words(source.get("title", ""))
+        shingles = _shingles(title_words + [word for words in sentence_words for word in words])
+        # Without shingles only the canonical URL can mark a source as a repeat
+        if (url and url in seen_urls) or shingles and any(
+            len(shingles & other) >= settings.search_dedupe_similarity * len(shingles | other)
+            for other in seen_shingles
+        ):
+            SEARCH_CONTEXT_SOURCES.inc(outcome="duplicate")
+            continue
+        seen_urls.add(url)
+        if shingles:
+            seen_shingles.append(shingles)
+        unique.append((source, sentences, sentence_words, title_words))
+
+    # 2. Rank by relevance; terms found in fewer sources count for more
+    weights = _relevance_terms(question, countries)
+    document_frequency = Counter()
+    for _, _, sentence_words, title_words in unique:
+        document_frequency.update(weights.keys() & set(title_words).union(*sentence_words))
+    idf = {term: math.log(1 + len(unique) / (1 + document_frequency[term])) + 0.1 for term in weights}
+    ranked = []
+    for rank, (source, sentences, sentence_words, title_words) in enumerate(unique):
+        words = title_words + [word for words in sentence_words for word in words]
+        ranked.append((_score(words, weights, idf), rank, source, sentences, sentence_words))
+    ranked.sort(key=lambda item: (-item[0], item[1]))
+    relevant = [item for item in ranked if item[0] > 0] or ranked  # Nothing overlaps: keep search order
+    kept = relevant[:max_sources]
+
+    # 3. Sentences within the character budget, best first across the kept sources
+    candidates = []
+    for position, (_, _, _, _, sentence_words) in enumerate(kept):
+        for index, words in enumerate(sentence_words):
+            candidates.append((_score(words, weights, idf), position, index))
+    candidates.sort(key=lambda item: (-item[0], item[1], item[2]))
+    any_relevant = bool(candidates) and candidates[0][0] > 0
+    chosen: Dict[int, List[int]] = {}
+    used = 0
+    for score, position, index in candidates:
+        if score <= 0 and any_relevant:
+            break  # Off-topic sentences only fill the budget when nothing else was found
+        length = len(kept[position][3][index]) + 1
+        if used + length <= max_chars:
+            chosen.setdefault(position, []).append(index)
+            used += length
+
+    processed = [
+        {**source, "snippet": " ".join(sentences[index] for index in sorted(chosen[position]))}
+        for position, (_, _, source, sentences, _) in enumerate(kept) if position in chosen
+    ]
+    SEARCH_CONTEXT_SOURCES.inc(len(processed), outcome="kept")
+    SEARCH_CONTEXT_SOURCES.inc(len(ranked) - len(processed), outcome="less_relevant")
+    return {**search_data, "sources": processed}
+
+
+def format_search_results(search_data: Dict, question: str = None, countries: Iterable[str] = ()) -> str:
     """
     Format search results into a readable string for AI
-    
+
     Args:
         search_data: Dictionary from search_web()
-        
+        question: The student's question; when given, sources are
+            deduplicated, ranked and cut to their most relevant sentences
+            (see process_search_results)
+        countries: The student's preferred countries, for ranking
+
     Returns:
         Formatted string with search context
     """
-    if not search_data.get("sources"):
+    if question and search_data.get("sources"):
+        search_data = process_search_results(search_data, question, countries)
+    if not search_data.get("sources") and not search_data.get("answer"):
         return "No relevant search results found."
-    
+
     formatted = "Web Search Results:\n\n"
-    
+
     if search_data.get("answer"):
         formatted += f"Summary: {search_data['answer']}\n\n"
-    
+    if not search_data.get("sources"):
+        # No source had a usable sentence; Tavily's answer still helps
+        return formatted.strip()
+
     formatted += "Sources:\n"
     for idx, source in enumerate(search_data["sources"], 1):
         formatted += f"{idx}. {source['title']}\n"
-        formatted += f"   {source['snippet'][:200]}...\n"
+        if question:
+            formatted += f"   {source['snippet']}\n"
+        else:
+            formatted += f"   {source['snippet'][:200]}...\n"
         formatted += f"   URL: {source['url']}\n\n"
-    
+
     return formatted.strip()
@@ -0,0 +1,250 @@
+# Session Service - multi-turn conversations with rolling summaries
+
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+from threading import Lock
+import asyncio
+import secrets
+import time
+from core.admission import llm_limiter
+from core.clients import get_llm
+from core.config import settings
+from core.metrics import gauge, record_stage_error, record_token_usage
+from services.prompt_service import estimate_tokens, truncate_to_tokens
+from services.usage_service import is_truncated, output_token_budget, record_usage
+
+SUMMARY_INSTRUCTION = (
+    "You maintain a running summary of a study-abroad counseling conversation. "
+    "Merge the new turns into the existing summary. Keep decisions, preferences, "
+    "facts the student shared and advice already given. Be terse; plain sentences, no headings."
+)
+
+
+class ChatSession:
+    """One conversation: a rolling summary plus a short window of recent turns"""
+
+    __slots__ = ("session_id", "user_id", "summary", "recent", "unsummarized", "last_active", "summarizing", "turns")
+
+    def __init__(self, session_id: str, user_id: int):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.summary = ""
+        self.recent: Deque[Tuple[str, str]] = deque()
+        self.unsummarized: List[Tuple[str, str]] = []  # Pushed out of `recent`, not folded yet
+        self.last_active = time.monotonic()
+        self.summarizing = False
+        self.turns = 0
+
+    def size(self) -> int:
+        """Approximate memory footprint in characters"""
+        return len(self.summary) + sum(len(q) + len(a) for q, a in self.recent) + sum(
+            len(q) + len(a) for q, a in self.unsummarized
+        )
+
+    def history_context(self, max_tokens: Optional[int] = None) -> str:
+        """
+        Conversation history for the prompt: summary, pending turns, recent turns
+
+        With `max_tokens`, history is trimmed from the oldest end: the newest
+        turn is kept first, then the head of the summary, then older turns
+        from newest to oldest while they fit.
+        """
+        summary = self.summary
+        turns = [f"Student: {q}\nAdvisor: {a}" for q, a in self.unsummarized + list(self.recent)]
+        if max_tokens is not None:
+            budget = max_tokens - 16  # Headings
+            newest = [truncate_to_tokens(turns[-1], budget)] if turns and budget > 0 else []
+            budget -= sum(estimate_tokens(turn) for turn in newest)
+            summary = truncate_to_tokens(summary, budget) if summary and budget > 0 else ""
+            budget -= estimate_tokens(summary)
+            older = []
+            for turn in reversed(turns[:-1]):
+                cost = estimate_tokens(turn) + 1
+                if cost > budget:
+                    break
+                older.append(turn)
+                budget -= cost
+            turns = older[::-1] + newest
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation:\n{summary}")
+        if turns:
+            parts.append("Recent turns:\n" + "\n".join(turns))
+        return "\n\n".join(parts)
+
+
+class SessionStore:
+    """Thread-safe session storage with idle-time and memory-cap eviction (least recently active first)"""
+
+    def __init__(self, ttl: float, max_sessions: int, max_chars: int):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_chars = max_chars
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._chars = 0
+        self._lock = Lock()
+        self.evictions = 0
+
+    def _evict(self, now: float):
+        """Drop idle sessions, then the least recently active ones until within limits (caller holds the lock)"""
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            over_limit = len(self._sessions) > self.max_sessions or self._chars > self.max_chars
+            if not over_limit and now - session.last_active <= self.ttl:
+                break
+            del self._sessions[session_id]
+            self._chars -= session.size()
+            self.evictions += 1
+
+    def create(self, user_id: int) -> ChatSession:
+        session = ChatSession(secrets.token_urlsafe(16), user_id)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._evict(session.last_active)
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_active = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            self._chars -= session.size()
+            return True
+
+    def resize(self, session: ChatSession, before: int):
+        """Account for a session's size change and enforce the memory cap"""
+        with self._lock:
+            if self._sessions.get(session.session_id) is not session:
+                return
+            self._chars += session.size() - before
+            self._evict(time.monotonic())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._sessions), "chars": self._chars, "evictions": self.evictions}
+
+
+# Singleton instance
+session_store = SessionStore(
+    ttl=settings.session_ttl_seconds,
+    max_sessions=settings.session_max_sessions,
+    max_chars=settings.session_max_chars,
+)
+
+gauge("chat_sessions", "Active chat sessions", function=lambda: session_store.stats()["sessions"])
+gauge("chat_sessions_chars", "Characters held by chat sessions", function=lambda: session_store.stats()["chars"])
+
+# Background summarization tasks (kept referenced until done)
+_summary_tasks = set()
+
+
+def _fallback_summary(summary: str, turns: List[Tuple[str, str]]) -> str:
+    """Extractive summary used when the LLM is unavailable"""
+    lines = [summary] if summary else []
+    lines += [f"Student asked: {q} Advisor said: {a[:200]}" for q, a in turns]
+    return truncate_to_tokens(" ".join(lines), settings.session_summary_tokens)
+
+
+async def _summarize(summary: str, turns: List[Tuple[str, str]], user_id: Optional[int] = None) -> str:
+    """Fold turns into the summary with the LLM; the call is accounted to user_id like a chat answer"""
+    llm = get_llm()
+    if not llm:
+        return _fallback_summary(summary, turns)
+    from langchain_core.messages import HumanMessage, SystemMessage  # Loaded with the LLM, not at startup
+
+    transcript = "\n".join(f"Student: {q}\nAdvisor: {a}" for q, a in turns)
+    messages = [
+        SystemMessage(content=SUMMARY_INSTRUCTION),
+        HumanMessage(content=f"Existing summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"),
+    ]
+    max_tokens = output_token_budget("summary", user_id)
+    try:
+        async with llm_limiter.slot():
+            started = time.monotonic()
+            response = await asyncio.wait_for(
+                llm.ainvoke(messages, max_tokens=max_tokens),
+                timeout=settings.chat_deadline_seconds,
+            )
+            seconds = time.monotonic() - started
+        usage = getattr(response, "usage_metadata", None)
+        prompt_chars = len(SUMMARY_INSTRUCTION) + len(messages[1].content)
+        record_token_usage(usage, prompt_chars)
+        record_usage(user_id, "summary", usage, prompt_chars, len(response.content), seconds, is_truncated(response))
+        return truncate_to_tokens(response.content.strip(), settings.session_summary_tokens)
+    except Exception as e:
+        record_stage_error("summary", e)
+        return _fallback_summary(summary, turns)
+
+
+async def _fold(session: ChatSession):
+    """Fold pending turns into the rolling summary until none are left"""
+    try:
+        while session.unsummarized:
+            batch = list(session.unsummarized)
+            new_summary = await _summarize(session.summary, batch, session.user_id)
+            before = session.size()
+            session.summary = new_summary
+            del session.unsummarized[:len(batch)]
+            session_store.resize(session, before)
+    finally:
+        session.summarizing = False
+
+
+def record_turn(session: ChatSession, question: str, answer: str):
+    """
+    Append a turn; turns falling out of the recent window are summarized in the background
+
+    Args:
+        session: The conversation
+        question: What the student asked
+        answer: The advisor's answer (stored trimmed)
+    """
+    before = session.size()
+    session.recent.append((question, answer[:settings.session_answer_chars]))
+    session.turns += 1
+    while len(session.recent) > settings.session_recent_turns:
+        session.unsummarized.append(session.recent.popleft())
+    session_store.resize(session, before)
+
+    if session.unsummarized and not session.summarizing:
+        session.summarizing = True
+        task = asyncio.ensure_future(_fold(session))
+        _summary_tasks.add(task)
+        task.add_done_callback(_summary_tasks.discard)
+
+
+def create_session(user_id: int) -> ChatSession:
+    """Start a new conversation for a user"""
+    return session_store.create(user_id)
+
+
+def get_session(session_id: str) -> Optional[ChatSession]:
+    """Look up a conversation (refreshes its idle timer)"""
+    return session_store.get(session_id)
+
+
+def delete_session(session_id: str) -> bool:
+    """End a conversation"""
+    return session_store.delete(session_id)
+
+
+def describe_session(session: ChatSession) -> Dict:
+    """Public view of a session"""
+    return {
+        "session_id": session.session_id,
+        "user_id": session.user_id,
+        "turns": session.turns,
+        "summary": session.summary,
+        "recent_turns": [{"question": q, "answer": a} for q, a in session.unsummarized + list(session.recent)],
+    }
@@ -0,0 +1,212 @@
+# Usage Service - output token budgets and per-user token accounting
+# Output length dominates LLM latency, so every call gets a max_tokens budget
+# chosen by endpoint and user tier, and shrunk further when the request's
+# deadline would not leave time to generate that many tokens. Prompt and
+# completion tokens are added up per user_id in a rolling window.
+
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, Optional
+import time
+from core.config import settings
+from core.metrics import counter, gauge, histogram
+from services.prompt_service import CHARS_PER_TOKEN
+
+LLM_OUTPUT_BUDGET = histogram(
+    "llm_output_token_budget", "max_tokens sent per LLM call", ["endpoint"],
+    buckets=(64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 4096),
+)
+LLM_TRUNCATED = counter("llm_answers_truncated_total", "Answers cut off by their max_tokens budget", ["endpoint"])
+
+
+@lru_cache(maxsize=16)
+def _parse_pairs(spec: str) -> Dict[str, str]:
+    """"a=1,b=2" -> {"a": "1", "b": "2"} (blank entries ignored)"""
+    pairs = {}
+    for item in spec.split(","):
+        key, _, value = item.partition("=")
+        if key.strip() and value.strip():
+            pairs[key.strip()] = value.strip()
+    return pairs
+
+
+def user_tier(user_id: Optional[int]) -> str:
+    """Tier from settings.llm_user_tiers, else settings.llm_default_tier"""
+    if user_id is None:
+        return settings.llm_default_tier
+    return _parse_pairs(settings.llm_user_tiers).get(str(user_id), settings.llm_default_tier)
+
+
+class OutputRate:
+    """Moving average of LLM generation speed, for sizing budgets to a deadline"""
+
+    def __init__(self, min_samples: int = 10):
+        self.min_samples = min_samples
+        self.samples = 0
+        self.seconds_per_token = 0.0
+
+    def record(self, completion_tokens: int, seconds: float):
+        if completion_tokens <= 0 or seconds <= 0:
+            return
+        # Includes time to first token, so it overestimates per-token time: budgets err on the short side
+        observed = seconds / completion_tokens
+        self.samples += 1
+        if self.samples == 1:
+            self.seconds_per_token = observed
+        else:
+            self.seconds_per_token = 0.9 * self.seconds_per_token + 0.1 * observed
+
+    def tokens_within(self, seconds: float) -> Optional[int]:
+        """Tokens that fit in `seconds`, or None until enough calls were seen"""
+        if self.samples < self.min_samples or self.seconds_per_token <= 0:
+            return None
+        return int(seconds / self.seconds_per_token)
+
+
+def output_token_budget(endpoint: str, user_id: Optional[int] = None, seconds_left: Optional[float] = None) -> int:
+    """
+    max_tokens for one LLM call
+
+    The endpoint budget (settings.llm_output_tokens) is scaled by the user's
+    tier multiplier (settings.llm_output_token_tiers). With `seconds_left`,
+    it is also cut to what the model usually generates in
+    llm_output_deadline_share of that time, rounded down to a multiple of
+    llm_output_tokens_step so that identical questions asked moments apart
+    get the same budget (and still share one LLM call). The
+    result is clamped to [llm_output_tokens_min, llm_output_tokens_max].
+
+    Args:
+        endpoint: ask, stream, batch or job (unknown endpoints use "ask")
+        user_id: Whose question it is, for the tier
+        seconds_left: Time the caller can still wait for the answer
+    """
+    budgets = _parse_pairs(settings.llm_output_tokens)
+    base = int(budgets.get(endpoint) or budgets.get("ask") or settings.llm_output_tokens_max)
+    multiplier = float(_parse_pairs(settings.llm_output_token_tiers).get(user_tier(user_id), 1.0))
+    budget = int(base * multiplier)
+    if seconds_left is not None:
+        fits = output_rate.tokens_within(seconds_left * settings.llm_output_deadline_share)
+        if fits is not None and fits < budget:
+            step = max(1, settings.llm_output_tokens_step)
+            budget = fits // step * step
+    budget = max(settings.llm_output_tokens_min, min(settings.llm_output_tokens_max, budget))
+    LLM_OUTPUT_BUDGET.observe(budget, endpoint=endpoint)
+    return budget
+
+
+def length_instruction(max_tokens: int) -> str:
+    """System prompt line that lets the model plan an answer that fits its budget"""
+    words = max_tokens * CHARS_PER_TOKEN // 6  # About 6 characters per English word, with the space
+    return f"\n**Length**: Keep the whole answer under about {words} words; prioritise the most useful points."
+
+
+def is_truncated(response) -> bool:
+    """Whether a langchain response stopped at max_tokens"""
+    metadata = getattr(response, "response_metadata", None) or {}
+    return metadata.get("finish_reason") == "length"
+
+
+class UsageLedger:
+    """
+    Rolling per-user token totals
+
+    Each user has one array of `buckets` slots per counter (prompt tokens,
+    completion tokens, calls), each slot covering `bucket_seconds`. Slots
+    are reused as the window moves, so a user costs a fixed few hundred
+    bytes however much they ask. At most `max_users` users are kept,
+    least recently active dropped first.
+    """
+
+    _FIELDS = ("prompt_tokens", "completion_tokens", "calls")
+
+    def __init__(self, bucket_seconds: float, buckets: int, max_users: int):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = max(1, buckets)
+        self.max_users = max_users
+        self._users: "OrderedDict[int, list]" = OrderedDict()  # user_id -> [newest bucket number, counts]
+        self._lock = Lock()
+
+    def _advance(self, entry: list, bucket: int):
+        """Zero the slots between the user's newest bucket and `bucket`"""
+        newest, counts = entry
+        for skipped in range(newest + 1, min(bucket, newest + self.buckets) + 1):
+            slot = skipped % self.buckets * 3
+            counts[slot] = counts[slot + 1] = counts[slot + 2] = 0
+        entry[0] = max(newest, bucket)
+
+    def record(self, user_id: int, prompt_tokens: int, completion_tokens: int, now: Optional[float] = None):
+        bucket = int((time.time() if now is None else now) // self.bucket_seconds)
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                entry = self._users[user_id] = [bucket, array("I", bytes(self.buckets * 3 * 4))]
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+            else:
+                self._users.move_to_end(user_id)
+                self._advance(entry, bucket)
+            slot = bucket % self.buckets * 3
+            counts = entry[1]
+            counts[slot] += max(0, prompt_tokens)
+            counts[slot + 1] += max(0, completion_tokens)
+            counts[slot + 2] += 1
+
+    def usage(self, user_id: int, now: Optional[float] = None) -> Dict:
+        """Totals over the window plus one row per bucket that saw calls (oldest first)"""
+        bucket = int((time.time() if now is None else now) // self.bucket_seconds)
+        totals = dict.fromkeys(self._FIELDS, 0)
+        rows = []
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                self._advance(entry, bucket)
+                counts = entry[1]
+                for number in range(bucket - self.buckets + 1, bucket + 1):
+                    slot = number % self.buckets * 3
+                    if counts[slot + 2]:
+                        row = dict(zip(self._FIELDS, counts[slot:slot + 3]))
+                        for key, value in row.items():
+                            totals[key] += value
+                        rows.append({"start": int(number * self.bucket_seconds), **row})
+        return {
+            "user_id": user_id,
+            "window_seconds": int(self.bucket_seconds * self.buckets),
+            **totals,
+            "buckets": rows,
+        }
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+def record_usage(user_id: Optional[int], endpoint: str, usage: Optional[dict], prompt_chars: int,
+                 completion_chars: int, seconds: Optional[float] = None, truncated: bool = False):
+    """
+    Account one LLM call to a user (langchain usage_metadata)
+
+    When the provider reports no usage, tokens are estimated from the
+    prompt and answer length.
+    """
+    if usage:
+        prompt_tokens, completion_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    else:
+        prompt_tokens, completion_tokens = prompt_chars // CHARS_PER_TOKEN, completion_chars // CHARS_PER_TOKEN
+    if seconds is not None:
+        output_rate.record(completion_tokens, seconds)
+    if truncated:
+        LLM_TRUNCATED.inc(endpoint=endpoint)
+    if user_id is not None:
+        usage_ledger.record(user_id, prompt_tokens, completion_tokens)
+
+
+# Singleton instances
+output_rate = OutputRate()
+usage_ledger = UsageLedger(
+    bucket_seconds=settings.usage_bucket_seconds,
+    buckets=settings.usage_buckets,
+    max_users=settings.usage_max_users,
+)
+
+gauge("usage_ledger_users", "Users with token usage in the rolling window", function=lambda: len(usage_ledger))